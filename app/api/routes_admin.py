@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.database import pool, shop_registry
+from app.core.executor import db_executor, cpu_executor, fanout_executor, run_query
+from app.core.hasher import password_hasher
+from app.core.jobs import job_engine
+from app.core.leader import leadership
+from app.core.live import live_hub
+from app.core.metrics import registry
+from app.core.provisioning import provisioner
+from app.core.report_cache import report_cache
+from app.core.result_cache import result_cache
+from app.core.schema_catalog import schema_catalog
+from app.core.write_behind import write_behind
+from app.utils.jwt_auth import require_admin, token_cache
+
+# Every /admin route needs a token with the admin role (see ADMIN_USERS)
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+# Served at the conventional scrape path rather than under /admin
+metrics_router = APIRouter()
+
+EXECUTORS = {"db": db_executor, "cpu": cpu_executor, "fanout": fanout_executor}
+
+def _pool_gauges(field: str):
+    return lambda: {(db,): s[field] for db, s in pool.stats()["databases"].items()}
+
+def _executor_gauges(field: str):
+    return lambda: {(name,): e.stats()[field] for name, e in EXECUTORS.items()}
+
+registry.gauge_callback("smart_ledger_db_pool_open", "Open pooled connections", ("shop",), _pool_gauges("open"))
+registry.gauge_callback("smart_ledger_db_pool_in_use", "Checked-out pooled connections", ("shop",), _pool_gauges("in_use"))
+registry.gauge_callback("smart_ledger_result_cache_bytes", "Memory held by cached results", (), lambda: {(): result_cache.stats()["bytes"]})
+registry.gauge_callback("smart_ledger_result_cache_hits", "Result cache hits", (), lambda: {(): result_cache.stats()["hits"]})
+registry.gauge_callback("smart_ledger_result_cache_coalesced", "Requests that joined an in-flight load", (), lambda: {(): result_cache.stats()["coalesced"]})
+registry.gauge_callback("smart_ledger_live_subscribers", "Open /live streams", ("shop",), lambda: {(shop,): n for shop, n in live_hub.stats()["shops"].items()})
+registry.gauge_callback("smart_ledger_live_resyncs", "Slow /live clients whose backlog was dropped", (), lambda: {(): live_hub.resyncs})
+registry.gauge_callback("smart_ledger_write_behind_pending", "Journaled orders not yet committed to the database", (), lambda: {(): write_behind.stats()["pending"]})
+registry.gauge_callback("smart_ledger_executor_running", "Tasks running per executor", ("executor",), _executor_gauges("running"))
+registry.gauge_callback("smart_ledger_executor_queue_depth", "Tasks queued per executor", ("executor",), _executor_gauges("queue_depth"))
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/pool-stats")
+async def pool_stats():
+    return pool.stats()
+
+@router.get("/executor-stats")
+async def executor_stats():
+    return {name: executor.stats() for name, executor in EXECUTORS.items()}
+
+@router.get("/report-cache-stats")
+async def report_cache_stats():
+    return report_cache.stats()
+
+@router.get("/result-cache-stats")
+async def result_cache_stats():
+    return result_cache.stats()
+
+@router.get("/live-stats")
+async def live_stats():
+    return live_hub.stats()
+
+@router.get("/write-behind-stats")
+async def write_behind_stats():
+    return write_behind.stats()
+
+@router.get("/shop-registry-stats")
+async def shop_registry_stats():
+    return shop_registry.stats()
+
+@router.post("/shop-registry/refresh")
+async def refresh_shop_registry():
+    shops = await run_query(shop_registry.refresh)
+    return {"status": "refreshed", "shops": len(shops)}
+
+@router.get("/provisioning-stats")
+async def provisioning_stats():
+    return provisioner.stats()
+
+@router.get("/password-hasher-stats")
+async def password_hasher_stats():
+    return password_hasher.stats()
+
+@router.get("/token-cache-stats")
+async def token_cache_stats():
+    return token_cache.stats()
+
+@router.get("/schema-catalog-stats")
+async def schema_catalog_stats():
+    return schema_catalog.stats()
+
+def _leader_jobs() -> dict:
+    # Jobs run on the leader worker; followers serve its latest snapshot
+    status = leadership.status()
+    return status["jobs"] if status else {"stats": {}, "history": {}}
+
+@router.get("/jobs")
+async def job_stats():
+    if leadership.is_leader:
+        return job_engine.stats()
+    return _leader_jobs()["stats"]
+
+@router.get("/jobs/{name}/history")
+async def job_history(name: str):
+    if name not in job_engine.names():
+        raise HTTPException(404, "Unknown job")
+    if leadership.is_leader:
+        return {"job": name, "runs": job_engine.history(name)}
+    return {"job": name, "runs": _leader_jobs()["history"].get(name, [])}
+
+@router.post("/jobs/{name}/run", status_code=202)
+async def run_job(name: str):
+    if name not in job_engine.names():
+        raise HTTPException(404, "Unknown job")
+    if not leadership.is_leader:
+        request_id = leadership.enqueue(name)
+        return {"status": "queued", "job": name, "request_id": request_id}
+    job_engine.trigger(name)
+    return {"status": "started", "job": name}
+
+@router.get("/leader")
+async def leader_stats():
+    return leadership.stats()
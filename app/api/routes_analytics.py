@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Depends
+from datetime import date, timedelta
+from typing import Literal, Optional
+
+from app.core.analytics import aggregate_arrays, load_order_arrays, series_sql
+from app.core.backends import backend
+from app.core.config import ANALYTICS_MAX_BUCKETS
+from app.core.database import PoolTimeout, get_selected_db, pool
+from app.core.executor import run_query, run_cpu
+
+router = APIRouter()
+
+# Rough upper bound on buckets per day of range, to refuse runaway series
+BUCKETS_PER_DAY = {"hour": 24, "day": 1, "week": 1 / 7, "month": 1 / 28}
+
+def _parse_percentiles(value: str):
+    try:
+        percentiles = tuple(float(p) for p in value.split(",") if p.strip())
+    except ValueError:
+        raise HTTPException(400, "percentiles must be numbers")
+    if not percentiles or any(not 0 <= p <= 100 for p in percentiles):
+        raise HTTPException(400, "percentiles must be between 0 and 100")
+    return percentiles
+
+# Each load checks out its own connection and returns it before any
+# aggregation, so CPU-pool time never holds a pooled connection
+def _load_arrays(db_name: str, from_date: date, to_date: date):
+    with pool.connection(db_name) as conn:
+        return load_order_arrays(conn, from_date, to_date)
+
+def _load_series(db_name: str, bucket: str, from_date: date, to_date: date, percentiles):
+    with pool.connection(db_name) as conn:
+        return series_sql(conn, bucket, from_date, to_date, percentiles)
+
+@router.get("/analytics/orders")
+async def order_analytics(
+    bucket: Literal["hour", "day", "week", "month"] = "day",
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    percentiles: str = "50,90,99",
+    engine: Literal["sql", "numpy"] = "sql",
+    db_name: str = Depends(get_selected_db)
+):
+    to_date = to_date or date.today()
+    from_date = from_date or to_date - timedelta(days=30)
+    if from_date > to_date:
+        raise HTTPException(400, "from_date must be <= to_date")
+    if ((to_date - from_date).days + 1) * BUCKETS_PER_DAY[bucket] > ANALYTICS_MAX_BUCKETS:
+        raise HTTPException(400, f"Range too long for {bucket} buckets (max {ANALYTICS_MAX_BUCKETS})")
+    pcts = _parse_percentiles(percentiles)
+
+    if not backend.window_percentiles:
+        # Only SQL Server has PERCENTILE_CONT as a window function
+        engine = "numpy"
+    try:
+        if engine == "numpy":
+            # Fetch on the DB pool, aggregate on the CPU pool
+            minutes, amounts, codes = await run_query(_load_arrays, db_name, from_date, to_date)
+            series = await run_cpu(aggregate_arrays, minutes, amounts, codes, bucket, pcts)
+        else:
+            series = await run_query(_load_series, db_name, bucket, from_date, to_date, pcts)
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    return {
+        "bucket": bucket,
+        "engine": engine,
+        "from_date": str(from_date),
+        "to_date": str(to_date),
+        "series": series
+    }
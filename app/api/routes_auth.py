@@ -1,104 +1,112 @@
-from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timedelta
-import pyodbc
-import bcrypt
+from typing import List
 import jwt
-from app.core.config import (
-    SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_MINUTES,
-    DB_DRIVER, DB_SERVER, DB_DATABASE_MASTER
-)
+from app.core.config import ADMIN_USERS, SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_MINUTES
+from app.core.database import pool, is_known_database, shop_registry
+from app.core.executor import run_query
+from app.core.hasher import hash_password_async, check_password_async
+from app.core.provisioning import ShopExists, provisioner, shop_db_name, INSERT_USER_SQL, USERS_TABLE_SQL
 from app.models.schemas import UserCreate, UserLogin
+from app.utils.jwt_auth import TokenClaims, require_admin, verify_token
 
 router = APIRouter()
 
-def build_conn_str(db_name: str) -> str:
-    return (
-        f"Driver={{{DB_DRIVER}}};"
-        f"Server={DB_SERVER};"
-        f"Database={db_name};"
-        "Trusted_Connection=yes;"
-    )
-
-@router.post("/register-shop")
-async def register_shop(user: UserCreate):
-    shop_name = user.username.lower().replace(" ", "_")
-    db_name = f"shop_{shop_name}"
-
-    # Step 1: Create the shop database
-    try:
-        with pyodbc.connect(build_conn_str(DB_DATABASE_MASTER), autocommit=True) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"CREATE DATABASE {db_name}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create DB: {e}")
+def _fetch_password_hash(db_name: str, username: str):
+    with pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
+        return row[0] if row else None
 
-    # Step 2: Create users table if not exists, and add admin user
-    password_hash = bcrypt.hashpw(user.password.encode(), bcrypt.gensalt()).decode()
-    try:
-        with pyodbc.connect(build_conn_str(db_name)) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                IF NOT EXISTS (
-                    SELECT * FROM sysobjects 
-                    WHERE name='users' AND xtype='U'
-                )
-                CREATE TABLE users (
-                    id INT PRIMARY KEY IDENTITY(1,1),
-                    username NVARCHAR(100) UNIQUE NOT NULL,
-                    password_hash NVARCHAR(255) NOT NULL
-                )
-            """)
-            cursor.execute(
-                "INSERT INTO users (username, password_hash) VALUES (?, ?)",
-                (user.username, password_hash)
-            )
-            conn.commit()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating admin user: {e}")
+def _insert_user(db_name: str, username: str, password_hash: str) -> bool:
+    with pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute(USERS_TABLE_SQL)
+        cursor.execute(INSERT_USER_SQL, (username, password_hash, username))
+        created = cursor.rowcount == 1
+        conn.commit()
+        return created
 
-    # Step 3: Return token
+def _issue_token(db_name: str, username: str) -> str:
     payload = {
         "shop_name": db_name,
-        "username": user.username,
+        "username": username,
+        "role": "admin" if (db_name, username) in ADMIN_USERS else "shop",
         "exp": datetime.utcnow() + timedelta(minutes=JWT_EXPIRATION_MINUTES)
     }
-    token = jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
+    return jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+def _db_name(user: UserCreate) -> str:
+    try:
+        return shop_db_name(user.username)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _submit_provisioning(db_name: str, user: UserCreate):
+    try:
+        return await run_query(provisioner.submit, db_name, user.username, user.password)
+    except ShopExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/register-shop", status_code=202)
+async def register_shop(user: UserCreate):
+    # Database, tables, indexes and admin user are created in the background;
+    # poll status_url until the job reports "succeeded", then log in. No token
+    # before then: the admin user doesn't exist yet
+    job = await _submit_provisioning(_db_name(user), user)
     return {
-        "status": "shop created",
-        "database": db_name,
-        "access_token": token
+        "status": "provisioning",
+        "job_id": job.id,
+        "status_url": f"/register-shop/{job.id}",
+        "database": job.db_name,
+        "login_url": f"/login?shop_name={job.db_name}"
     }
 
+@router.post("/register-shops/bulk", status_code=202, dependencies=[Depends(require_admin)])
+async def register_shops_bulk(users: List[UserCreate]):
+    db_names = [_db_name(user) for user in users]
+    if len(set(db_names)) != len(db_names):
+        raise HTTPException(400, "Duplicate shop names")
+    # Check them all up front so a taken name doesn't leave half the batch queued
+    existing = [db_name for db_name in db_names if await run_query(shop_registry.contains, db_name)]
+    if existing:
+        raise HTTPException(409, f"Shops already exist: {', '.join(existing)}")
+    jobs = [await _submit_provisioning(db_name, user) for db_name, user in zip(db_names, users)]
+    return {"jobs": [{"job_id": job.id, "database": job.db_name} for job in jobs]}
+
+@router.get("/register-shop/{job_id}")
+async def provisioning_status(job_id: str):
+    job = provisioner.get(job_id)
+    if not job:
+        raise HTTPException(404, "Unknown provisioning job")
+    return job.to_dict()
+
+@router.post("/shops/{shop_name}/register-admin")
+async def register_admin(shop_name: str, user: UserCreate, claims: TokenClaims = Depends(verify_token)):
+    # Only the shop's own users (or an operator) may add users to it
+    if claims.shop_name != shop_name and claims.role != "admin":
+        raise HTTPException(403, "Not allowed to add users to this shop")
+    if not is_known_database(shop_name):
+        raise HTTPException(404, "Database not found")
+    password_hash = await hash_password_async(user.password, shop_name)
+    if not await run_query(_insert_user, shop_name, user.username, password_hash):
+        raise HTTPException(409, "User already exists")
+    return {"status": "admin created"}
+
 @router.post("/login")
 async def login(shop_name: str, creds: UserLogin):
-    with pyodbc.connect(build_conn_str(shop_name)) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT password_hash FROM users WHERE username = ?", (creds.username,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(401, "Invalid username or password")
-        password_hash = row[0]
-        if not bcrypt.checkpw(creds.password.encode(), password_hash.encode()):
-            raise HTTPException(401, "Invalid username or password")
-
-    payload = {
-        "shop_name": shop_name,
-        "username": creds.username,
-        "exp": datetime.utcnow() + timedelta(minutes=JWT_EXPIRATION_MINUTES)
-    }
-    token = jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return {"access_token": token}
+    # The token pins every later request to this shop, so it must be a real one
+    if not is_known_database(shop_name):
+        raise HTTPException(401, "Invalid username or password")
+    password_hash = await run_query(_fetch_password_hash, shop_name, creds.username)
+    if not password_hash:
+        raise HTTPException(401, "Invalid username or password")
+    if not await check_password_async(creds.password, password_hash, shop_name):
+        raise HTTPException(401, "Invalid username or password")
 
-def verify_token(authorization: str = Header(...)):
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise Exception()
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
-    except Exception:
-        raise HTTPException(401, "Invalid or expired token")
+    return {"access_token": _issue_token(shop_name, creds.username)}
 
 @router.get("/protected-resource")
-async def protected_route(user=Depends(verify_token)):
-    return {"message": "You are authenticated!"}
+async def protected_route(claims: TokenClaims = Depends(verify_token)):
+    return {"message": "You are authenticated!", "shop_name": claims.shop_name, "username": claims.username}
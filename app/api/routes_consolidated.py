@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from typing import Optional
+
+from app.models.schemas import SummaryRange
+from app.core.config import FANOUT_CONCURRENCY, FANOUT_TIMEOUT
+from app.core.database import shop_registry
+from app.core.executor import run_query
+from app.core.fanout import fan_out
+from app.core.rollups import ensure_rollups, fetch_summary, merge_summaries, summary_dates
+from app.utils.jwt_auth import TokenClaims, verify_token
+
+router = APIRouter(prefix="/consolidated")
+
+def _shop_summary(db_name: str, conn, from_date: date, to_date: Optional[date]):
+    ensure_rollups(db_name, conn)
+    return fetch_summary(conn, from_date, to_date)
+
+@router.get("/summary")
+async def consolidated_summary(
+    range: SummaryRange = Query("weekly"),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    shops: Optional[str] = None,
+    concurrency: int = Query(FANOUT_CONCURRENCY, gt=0, le=64),
+    timeout: float = Query(FANOUT_TIMEOUT, gt=0, le=60),
+    claims: TokenClaims = Depends(verify_token)
+):
+    today = date.today()
+    try:
+        from_date, to_date = summary_dates(range.value, from_date, to_date, today)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    known = set(await run_query(shop_registry.shops))
+    if shops:
+        requested = list(dict.fromkeys(s.strip() for s in shops.split(",") if s.strip()))
+    else:
+        requested = sorted(known)
+    # Shop tokens only see their own shop; all shops need the admin role
+    if claims.role != "admin":
+        if shops and set(requested) != {claims.shop_name}:
+            raise HTTPException(403, "Shop tokens can only summarize their own shop")
+        requested = [claims.shop_name]
+    unknown = [s for s in requested if s not in known]
+    targets = [s for s in requested if s in known]
+
+    results = await fan_out(targets, _shop_summary, from_date, to_date, concurrency=concurrency, timeout=timeout)
+    ok = [r for r in results if r.status == "ok"]
+
+    return {
+        "range": range,
+        "from_date": str(from_date),
+        "to_date": str(to_date or today),
+        "shops_requested": len(requested),
+        "shops_ok": len(ok),
+        **merge_summaries(r.value for r in ok),
+        "shops": [
+            {"database": r.db_name, "status": r.status, "elapsed": round(r.elapsed, 3), **(r.value or {})}
+            for r in ok
+        ],
+        "failed": [
+            {"database": r.db_name, "status": r.status, "error": r.error}
+            for r in results if r.status != "ok"
+        ] + [{"database": s, "status": "unknown", "error": "No such shop"} for s in unknown],
+        "slow": [r.db_name for r in results if r.slow],
+    }
@@ -1,22 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends
-import pyodbc
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Any, Dict, List, Optional
 import re
 
 from app.models.schemas import TableCreateRequest
-from app.core.config import DB_DATABASE_PRACTICE
-from app.core.database import build_conn_str
+from app.core.backends import backend
+from app.core.config import INGEST_MAX_BATCH_SIZE, ORDERS_PAGE_MAX
+from app.core.database import get_db_conn, get_selected_db
+from app.core.executor import run_query
+from app.core.orders import encode_cursor, decode_cursor
+from app.core.schema_catalog import schema_catalog, insert_rows, list_rows
 
-router = APIRouter()
+def _require_dynamic_tables():
+    if not backend.dynamic_tables:
+        raise HTTPException(501, f"Dynamic tables are not supported with DB_BACKEND={backend.name}")
 
-# Dependency to get selected DB name from frontend header
-def get_selected_db(x_database_name: str = None):
-    return x_database_name or DB_DATABASE_PRACTICE
+router = APIRouter(dependencies=[Depends(_require_dynamic_tables)])
+
+def _execute_ddl(conn, sql: str):
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    conn.commit()
 
 @router.post("/shops/{shop_name}/create-dynamic-table")
 async def create_dynamic_table(
     shop_name: str,
     request: TableCreateRequest,
-    db_name: str = Depends(get_selected_db)
+    db_name: str = Depends(get_selected_db),
+    conn=Depends(get_db_conn)
 ):
     # Validate table and column names
     if not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", request.table_name):
@@ -37,10 +47,88 @@ async def create_dynamic_table(
     )
     sql = f"CREATE TABLE {request.table_name} ({columns_sql})"
     try:
-        with pyodbc.connect(build_conn_str(db_name)) as conn:
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            conn.commit()
+        await run_query(_execute_ddl, conn, sql)
+        schema_catalog.invalidate(db_name, request.table_name)
         return {"status": "success", "sql": sql}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Table creation failed: {str(e)}")
+
+async def _table_schema(db_name: str, conn, table_name: str):
+    schema = await run_query(schema_catalog.get, db_name, conn, table_name)
+    if schema is None:
+        raise HTTPException(404, f"Table not found: {table_name}")
+    return schema
+
+@router.get("/shops/{shop_name}/tables")
+async def list_tables(shop_name: str, db_name: str = Depends(get_selected_db), conn=Depends(get_db_conn)):
+    return {"tables": await run_query(schema_catalog.tables, db_name, conn)}
+
+@router.get("/shops/{shop_name}/tables/{table_name}")
+async def describe_table(shop_name: str, table_name: str, db_name: str = Depends(get_selected_db), conn=Depends(get_db_conn)):
+    schema = await _table_schema(db_name, conn, table_name)
+    return {"table": schema.name, "columns": [vars(c) for c in schema.columns]}
+
+async def _insert(db_name: str, conn, table_name: str, rows: List[Dict[str, Any]]):
+    schema = await _table_schema(db_name, conn, table_name)
+    try:
+        inserted = await run_query(insert_rows, conn, schema, rows)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(400, f"Insert failed: {str(e)}")
+    return {"status": "success", "inserted": inserted}
+
+@router.post("/shops/{shop_name}/tables/{table_name}/rows")
+async def insert_row(
+    shop_name: str,
+    table_name: str,
+    row: Dict[str, Any],
+    db_name: str = Depends(get_selected_db),
+    conn=Depends(get_db_conn)
+):
+    return await _insert(db_name, conn, table_name, [row])
+
+@router.post("/shops/{shop_name}/tables/{table_name}/rows/bulk")
+async def insert_rows_bulk(
+    shop_name: str,
+    table_name: str,
+    rows: List[Dict[str, Any]],
+    db_name: str = Depends(get_selected_db),
+    conn=Depends(get_db_conn)
+):
+    if not rows:
+        raise HTTPException(400, "No rows given")
+    if len(rows) > INGEST_MAX_BATCH_SIZE:
+        raise HTTPException(413, f"At most {INGEST_MAX_BATCH_SIZE} rows per request")
+    return await _insert(db_name, conn, table_name, rows)
+
+@router.get("/shops/{shop_name}/tables/{table_name}/rows")
+async def get_rows(
+    shop_name: str,
+    table_name: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, gt=0, le=ORDERS_PAGE_MAX),
+    columns: Optional[str] = None,
+    db_name: str = Depends(get_selected_db),
+    conn=Depends(get_db_conn)
+):
+    schema = await _table_schema(db_name, conn, table_name)
+    selected = [c.name for c in schema.columns]
+    if columns:
+        selected = [c.strip() for c in columns.split(",") if c.strip()]
+        unknown = [c for c in selected if schema.column(c) is None]
+        if unknown or not selected:
+            raise HTTPException(400, f"Unknown columns: {', '.join(unknown)}")
+    cursor_value = None
+    if cursor:
+        try:
+            cursor_value = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+
+    data, next_value = await run_query(list_rows, conn, schema, selected, limit, cursor_value)
+    return {"data": data, "next_cursor": encode_cursor(next_value) if next_value is not None else None}
@@ -1,107 +1,277 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import FileResponse
-from datetime import date, timedelta
-from enum import Enum
-from pathlib import Path
-from fpdf import FPDF
-import pyodbc
-
-from app.models.schemas import OrderRequest
-from app.core.config import DB_DATABASE_PRACTICE
-from app.core.database import build_conn_str
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from datetime import date
+from typing import Literal, Optional
+
+from app.models.schemas import OrderRequest, SummaryRange
+from app.core.config import INGEST_BATCH_SIZE, INGEST_MAX_BATCH_SIZE, INGEST_MAX_ERRORS, ORDERS_PAGE_MAX
+from app.core.database import PoolTimeout, get_selected_db, pool
+from app.core.executor import run_query, run_cpu, stream_cpu
+from app.core.live import SubscriberLimit, live_hub
+from app.core.write_behind import write_behind
+from app.core.report_cache import report_cache
+from app.core.result_cache import result_cache
+from app.core.orders import ORDER_FIELDS, decode_cursor, list_orders, order_date_filter, orders_committed, where_sql
+from app.core.rollups import apply_deltas, ensure_rollups, fetch_summary, range_fingerprint, rollups_ready, summary_dates
+from app.utils.exporters import EXPORT_FORMATS, format_available, stream_orders_export
+from app.utils.pdf_report import report_range
+from app.utils.ingest import (
+    ORDER_COLUMNS, decode_line, iter_lines, parse_csv_header, parse_order_chunk, insert_order_batch
+)
 
 router = APIRouter()
 
-# Dependency to get selected DB name
-def get_selected_db(x_database_name: str = None):
-    return x_database_name or DB_DATABASE_PRACTICE
+
+def _insert_order(conn, data: OrderRequest):
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)",
+        (data.user_id, data.amount, data.status, data.order_date)
+    )
+    apply_deltas(cursor, [(data.order_date.date(), data.amount, data.status)])
+    conn.commit()
+
+def _add_order(db_name: str, data: OrderRequest):
+    with pool.connection(db_name) as conn:
+        if not rollups_ready(db_name):
+            ensure_rollups(db_name, conn)
+        _insert_order(conn, data)
 
 @router.post("/add-order")
 async def add_order(data: OrderRequest, db_name: str = Depends(get_selected_db)):
     try:
-        with pyodbc.connect(build_conn_str(db_name)) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)",
-                (data.user_id, data.amount, data.status, data.order_date)
-            )
-            conn.commit()
+        if write_behind.enabled:
+            # Durable in the local journal; reaches the database (and
+            # /summary, /data, /live) with the next batch
+            await write_behind.submit(db_name, data)
+            return {"status": "success", "queued": True}
+        await run_query(_add_order, db_name, data)
+        orders_committed(
+            db_name, [(data.order_date.date(), data.amount, data.status)],
+            single={"user_id": data.user_id, "amount": data.amount, "status": data.status, "order_date": data.order_date}
+        )
         return {"status": "success"}
+    except HTTPException:
+        raise
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _insert_order_batch(db_name: str, orders):
+    with pool.connection(db_name) as conn:
+        if not rollups_ready(db_name):
+            ensure_rollups(db_name, conn)
+        return insert_order_batch(conn, orders)
+
+@router.post("/add-orders/bulk")
+async def add_orders_bulk(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    batch_size: int = Query(INGEST_BATCH_SIZE, gt=0, le=INGEST_MAX_BATCH_SIZE),
+    db_name: str = Depends(get_selected_db)
+):
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    header = None
+    chunk = []
+    inserted = failed = 0
+    errors = []
+
+    # No connection is held while the client sends: each batch checks one
+    # out for its insert only
+    async def flush():
+        nonlocal inserted, failed
+        valid, chunk_errors = await run_cpu(parse_order_chunk, chunk, fmt, header)
+        try:
+            insert_errors = await run_query(_insert_order_batch, db_name, valid) if valid else []
+        except PoolTimeout as e:
+            # Earlier batches are committed; say which rows didn't make it
+            insert_errors = [{"row": row, "error": str(e)} for row, _ in valid]
+        chunk_errors += insert_errors
+        inserted += len(valid) - len(insert_errors)
+        failed += len(chunk_errors)
+        errors.extend(chunk_errors[:INGEST_MAX_ERRORS - len(errors)])
+        if len(insert_errors) < len(valid):
+            failed_rows = {e["row"] for e in insert_errors}
+            orders_committed(db_name, [
+                (order.order_date.date(), order.amount, order.status)
+                for row, order in valid if row not in failed_rows
+            ])
+
+    row = 0
+    async for line in iter_lines(request.stream()):
+        if line is not None and not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            try:
+                header = parse_csv_header(decode_line(line))
+            except ValueError as e:
+                raise HTTPException(400, f"Bad CSV header: {e}")
+            missing = set(ORDER_COLUMNS) - set(header)
+            if missing:
+                raise HTTPException(400, f"CSV header is missing columns: {', '.join(sorted(missing))}")
+            continue
+        row += 1
+        chunk.append((row, line))
+        if len(chunk) >= batch_size:
+            await flush()
+            chunk = []
+    if chunk:
+        await flush()
+
+    return {
+        "status": "success" if not failed else "partial",
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors)
+    }
+
+def _load_orders(db_name: str, *args):
+    with pool.connection(db_name) as conn:
+        return list_orders(conn, *args)
+
+def _load_summary(db_name: str, from_date: date, to_date: Optional[date]):
+    with pool.connection(db_name) as conn:
+        if not rollups_ready(db_name):
+            ensure_rollups(db_name, conn)
+        return fetch_summary(conn, from_date, to_date)
+
+async def _cached(db_name: str, endpoint: str, params: dict, loader):
+    # Loads check out their own connection, so cache hits never touch the pool
+    try:
+        return await result_cache.get_or_load(db_name, endpoint, params, loader)
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+@router.get("/live")
+async def live(db_name: str = Depends(get_selected_db)):
+    # Server-Sent Events: `order` and `summary` (per-day deltas) on every
+    # committed write, `resync` when this client fell behind
+    try:
+        stream = live_hub.subscribe(db_name)
+    except SubscriberLimit as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return StreamingResponse(
+        stream, media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/data")
-async def get_data(db_name: str = Depends(get_selected_db)):
-    with pyodbc.connect(build_conn_str(db_name)) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT TOP 5 * FROM orders ORDER BY id DESC")
-        rows = cursor.fetchall()
-        data = [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
-    return {"data": data}
+async def get_data(
+    cursor: Optional[str] = None,
+    limit: int = Query(5, gt=0, le=ORDERS_PAGE_MAX),
+    columns: Optional[str] = None,
+    status: Optional[Literal["pending", "completed", "cancelled"]] = None,
+    user_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    db_name: str = Depends(get_selected_db)
+):
+    selected = ORDER_FIELDS
+    if columns:
+        selected = tuple(c.strip() for c in columns.split(",") if c.strip())
+        unknown = set(selected) - set(ORDER_FIELDS)
+        if unknown or not selected:
+            raise HTTPException(400, f"Unknown columns: {', '.join(sorted(unknown))}")
+    before_id = None
+    if cursor:
+        try:
+            before_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+
+    # Dashboards poll this; identical requests share one cached query
+    params = {
+        "columns": ",".join(selected), "limit": limit, "before_id": before_id, "status": status,
+        "user_id": user_id, "from_date": from_date, "to_date": to_date,
+        "min_amount": min_amount, "max_amount": max_amount,
+    }
+    data, next_cursor = await _cached(db_name, "data", params, lambda: run_query(
+        _load_orders, db_name, selected, limit, before_id,
+        status, user_id, from_date, to_date, min_amount, max_amount
+    ))
+    return {"data": data, "next_cursor": next_cursor}
+
+def _report_fingerprint(db_name: str, from_date: Optional[date], to_date: Optional[date]):
+    with pool.connection(db_name) as conn:
+        if not rollups_ready(db_name):
+            ensure_rollups(db_name, conn)
+        return range_fingerprint(conn, from_date, to_date)
 
 @router.get("/export-report")
-async def export_report(type: str = "daily", db_name: str = Depends(get_selected_db)):
+async def export_report(
+    type: str = "daily",
+    format: str = "pdf",
+    columns: Optional[str] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    db_name: str = Depends(get_selected_db)
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(400, f"Unknown format: {format}")
+    if not format_available(format):
+        raise HTTPException(501, f"{format} export needs pyarrow installed on the server")
+    media_type, ext, _ = EXPORT_FORMATS[format]
+
+    selected = ORDER_FIELDS
+    if columns:
+        selected = tuple(c.strip() for c in columns.split(",") if c.strip())
+        unknown = set(selected) - set(ORDER_FIELDS)
+        if unknown or not selected:
+            raise HTTPException(400, f"Unknown columns: {', '.join(sorted(unknown))}")
+
     today = date.today()
-    if type == "daily":
-        condition = f"WHERE CAST(order_date AS DATE) = '{today}'"
-        filename = f"report_daily_{today}.pdf"
-    elif type == "monthly":
-        first_day = today.replace(day=1)
-        condition = f"WHERE order_date >= '{first_day}'"
-        filename = f"report_monthly_{today.strftime('%Y-%m')}.pdf"
+    if from_date or to_date:
+        report_type = "custom"
+        filename = f"report_{from_date or 'start'}_{to_date or today}.{ext}"
     else:
-        condition = ""
-        filename = f"report_all_{today}.pdf"
-
-    query = f"SELECT * FROM orders {condition}"
-
-    with pyodbc.connect(build_conn_str(db_name)) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        headers = [desc[0] for desc in cursor.description]
-
-    pdf = FPDF(orientation="P", unit="mm", format="A4")
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(200, 10, txt="Smart Ledger Report", ln=True, align="C")
-    pdf.set_font("Arial", size=10)
-    for row in rows:
-        line = ", ".join([f"{col}: {val}" for col, val in zip(headers, row)])
-        pdf.multi_cell(0, 8, line)
-
-    report_dir = Path("temp_reports")
-    report_dir.mkdir(exist_ok=True)
-    path = report_dir / filename
-    pdf.output(str(path))
-    return FileResponse(path, filename=filename, media_type="application/pdf")
-
-class SummaryRange(str, Enum):
-    weekly = "weekly"
-    monthly = "monthly"
+        report_type, from_date, to_date = report_range(type, today)
+        if report_type == "monthly":
+            filename = f"report_monthly_{today.strftime('%Y-%m')}.{ext}"
+        else:
+            filename = f"report_{report_type}_{today}.{ext}"
+    clauses, params = order_date_filter(from_date, to_date)
+    condition = where_sql(clauses)
+
+    fingerprint = await run_query(_report_fingerprint, db_name, from_date, to_date)
+    path = report_cache.path_for(db_name, report_type, from_date, to_date, (fingerprint, selected), ext)
+    if report_cache.get(path):
+        return FileResponse(path, filename=filename, media_type=media_type)
+
+    query = f"SELECT {', '.join(selected)} FROM orders {condition} ORDER BY id"
+    body = await stream_cpu(
+        report_cache.store(path, db_name, from_date, to_date, stream_orders_export(db_name, query, params, format))
+    )
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/summary")
-async def get_summary(range: SummaryRange = Query("weekly"), db_name: str = Depends(get_selected_db)):
+async def get_summary(
+    range: SummaryRange = Query("weekly"),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    db_name: str = Depends(get_selected_db)
+):
     today = date.today()
-    from_date = today - timedelta(days=7) if range == "weekly" else today.replace(day=1)
-
-    with pyodbc.connect(build_conn_str(db_name)) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(amount) as total_income,
-                COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_orders
-            FROM orders
-            WHERE order_date >= ?
-        """, (from_date,))
-        row = cursor.fetchone()
+    try:
+        from_date, to_date = summary_dates(range.value, from_date, to_date, today)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    summary = await _cached(
+        db_name, "summary", {"from_date": from_date, "to_date": to_date},
+        lambda: run_query(_load_summary, db_name, from_date, to_date)
+    )
 
     return {
         "range": range,
         "from_date": str(from_date),
-        "to_date": str(today),
-        "total_orders": row.total_orders or 0,
-        "total_income": float(row.total_income or 0),
-        "completed_orders": row.completed_orders or 0
+        "to_date": str(to_date or today),
+        **summary
     }
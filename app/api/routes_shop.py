@@ -1,31 +1,40 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import JSONResponse
-import pyodbc
 from app.models.schemas import ShopCreate
-from app.core.config import DB_DATABASE_MASTER
-from app.core.database import build_conn_str
+from app.core.database import is_known_database, shop_registry
+from app.core.executor import run_query
+from app.core.provisioning import ShopExists, provisioner, shop_db_name
+from app.utils.jwt_auth import require_admin
 
 router = APIRouter()
 
-@router.post("/shops")
+@router.post("/shops", status_code=202, dependencies=[Depends(require_admin)])
 async def create_shop(shop: ShopCreate):
-    db_name = f"shop_{shop.name.lower().replace(' ', '_')}"
+    # Same job as /register-shop, so the shop gets its users table and an
+    # admin (the owner) who can log in; poll status_url until it succeeds
     try:
-        with pyodbc.connect(build_conn_str(DB_DATABASE_MASTER), autocommit=True) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"CREATE DATABASE {db_name}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create DB: {e}")
-    return {"status": "success", "database": db_name}
+        db_name = shop_db_name(shop.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job = await run_query(provisioner.submit, db_name, shop.owner, shop.password)
+    except ShopExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "status": "provisioning",
+        "job_id": job.id,
+        "status_url": f"/register-shop/{job.id}",
+        "database": job.db_name,
+        "login_url": f"/login?shop_name={job.db_name}"
+    }
 
 @router.get("/shops")
 async def list_shops():
     try:
-        with pyodbc.connect(build_conn_str(DB_DATABASE_MASTER)) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sys.databases WHERE name LIKE 'shop_%'")
-            dbs = [row.name for row in cursor.fetchall()]
+        dbs = await run_query(shop_registry.shops)
         return {"shops": dbs}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching databases: {e}")
 
@@ -36,12 +45,11 @@ async def select_db(request: Request):
     if not db_name:
         raise HTTPException(status_code=400, detail="No database name provided.")
     try:
-        with pyodbc.connect(build_conn_str(DB_DATABASE_MASTER)) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sys.databases WHERE name = ?", (db_name,))
-            exists = cursor.fetchone()
-        if not exists:
-            raise HTTPException(status_code=404, detail="Database not found.")
+        exists = await run_query(is_known_database, db_name)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error validating database: {e}")
+    if not exists:
+        raise HTTPException(status_code=404, detail="Database not found.")
     return JSONResponse(content={"status": "selected", "database": db_name})
@@ -0,0 +1,159 @@
+from datetime import date, datetime
+from typing import List, Sequence
+
+import numpy as np
+
+from app.core.backends import backend
+from app.core.config import REPORT_FETCH_SIZE
+from app.core.orders import order_date_filter, where_sql
+from app.core.rollups import STATUSES
+
+# Time-bucketed order analytics. Two interchangeable engines:
+#   sql   - GROUP BY / PERCENTILE_CONT pushed down, one row per bucket comes back
+#   numpy - the (order_date, amount, status) slice is fetched as plain numbers
+#           and aggregated in one vectorized pass
+
+BUCKETS = ("hour", "day", "week", "month")
+ENGINES = ("sql", "numpy")
+
+# Bucket start as a DATETIME. 1900-01-01 (day 0) was a Monday, so weeks start on Mondays.
+BUCKET_SQL = {
+    "hour": "DATEADD(hour, DATEDIFF(hour, 0, order_date), 0)",
+    "day": "CAST(CAST(order_date AS DATE) AS DATETIME)",
+    "week": "DATEADD(week, DATEDIFF(day, 0, order_date) / 7, 0)",
+    "month": "DATEADD(month, DATEDIFF(month, 0, order_date), 0)",
+}
+
+STATUS_CODE_SQL = "CASE status " + " ".join(
+    f"WHEN '{status}' THEN {i}" for i, status in enumerate(STATUSES)
+) + f" ELSE {len(STATUSES)} END"
+
+def _series_row(bucket_start, count, revenue, status_counts, quantiles, percentiles) -> dict:
+    row = {
+        "bucket_start": bucket_start.isoformat(),
+        "order_count": int(count),
+        "revenue": float(revenue or 0),
+        "avg_ticket": float(revenue or 0) / count if count else 0.0,
+    }
+    for status, n in zip(STATUSES, status_counts):
+        row[status] = int(n or 0)
+    for p, value in zip(percentiles, quantiles):
+        row[f"p{p:g}"] = float(value) if value is not None else None
+    return row
+
+def series_sql(conn, bucket: str, from_date: date, to_date: date, percentiles: Sequence[float]) -> List[dict]:
+    clauses, params = order_date_filter(from_date, to_date)
+    pct_columns = "".join(
+        f", PERCENTILE_CONT({p / 100}) WITHIN GROUP (ORDER BY amount) OVER (PARTITION BY bucket)"
+        for p in percentiles
+    )
+    status_columns = "".join(
+        f", SUM(CASE WHEN status = '{status}' THEN 1 ELSE 0 END) OVER (PARTITION BY bucket)"
+        for status in STATUSES
+    )
+    # Percentiles only exist as window functions, so everything is computed
+    # per partition and DISTINCT collapses it to one row per bucket
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        WITH bucketed AS (
+            SELECT {BUCKET_SQL[bucket]} AS bucket, amount, status
+            FROM orders
+            {where_sql(clauses)}
+        )
+        SELECT DISTINCT
+            bucket,
+            COUNT(*) OVER (PARTITION BY bucket),
+            SUM(amount) OVER (PARTITION BY bucket)
+            {status_columns}
+            {pct_columns}
+        FROM bucketed
+        ORDER BY bucket
+    """, params)
+    n = len(STATUSES)
+    return [
+        _series_row(row[0], row[1], row[2], row[3:3 + n], row[3 + n:], percentiles)
+        for row in cursor.fetchall()
+    ]
+
+def load_order_arrays(conn, from_date: date, to_date: date, fetch_size: int = REPORT_FETCH_SIZE):
+    """
+    Fetch the filtered slice as (minutes since epoch, amount, status code)
+    arrays. Only numbers cross the driver, so no datetime objects are built.
+    """
+    clauses, params = order_date_filter(from_date, to_date)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {backend.epoch_minutes("order_date")}, amount, {STATUS_CODE_SQL}
+        FROM orders
+        {where_sql(clauses)}
+    """, params)
+    minutes, amounts, codes = [], [], []
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        chunk = np.array(rows, dtype=np.float64).reshape(len(rows), 3)
+        minutes.append(chunk[:, 0].astype(np.int64))
+        amounts.append(chunk[:, 1])
+        codes.append(chunk[:, 2].astype(np.int64))
+    if not minutes:
+        return np.empty(0, np.int64), np.empty(0, np.float64), np.empty(0, np.int64)
+    return np.concatenate(minutes), np.concatenate(amounts), np.concatenate(codes)
+
+def bucket_starts(minutes: np.ndarray, bucket: str) -> np.ndarray:
+    stamps = minutes.astype("datetime64[m]")
+    if bucket == "hour":
+        return stamps.astype("datetime64[h]").astype("datetime64[m]")
+    days = stamps.astype("datetime64[D]")
+    if bucket == "day":
+        return days.astype("datetime64[m]")
+    if bucket == "week":
+        # 1970-01-01 was a Thursday; step back to the Monday
+        offset = (days.astype(np.int64) + 3) % 7
+        return (days - offset).astype("datetime64[m]")
+    return stamps.astype("datetime64[M]").astype("datetime64[m]")
+
+def aggregate_arrays(minutes: np.ndarray, amounts: np.ndarray, codes: np.ndarray, bucket: str, percentiles: Sequence[float]) -> List[dict]:
+    if not len(minutes):
+        return []
+    # One sort by (bucket, amount) gives both the bucket runs and, within
+    # each run, the ordered amounts the percentiles interpolate over
+    # (an amount sort followed by a stable key sort beats np.lexsort here)
+    keys = bucket_starts(minutes, bucket)
+    by_amount = np.argsort(amounts)
+    order = by_amount[np.argsort(keys[by_amount], kind="stable")]
+    keys, ordered, codes = keys[order], amounts[order], codes[order]
+    offsets = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+    counts = np.diff(np.append(offsets, len(keys)))
+    n_buckets = len(offsets)
+    revenue = np.add.reduceat(ordered, offsets)
+    n_status = len(STATUSES) + 1
+    inverse = np.repeat(np.arange(n_buckets), counts)
+    by_status = np.bincount(inverse * n_status + codes, minlength=n_buckets * n_status).reshape(n_buckets, n_status)
+
+    # Linear interpolation between closest ranks, as PERCENTILE_CONT does
+    quantiles = []
+    for p in percentiles:
+        rank = (counts - 1) * (p / 100)
+        lower = np.floor(rank).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        frac = rank - lower
+        quantiles.append(
+            (ordered[offsets + lower] * (1 - frac) + ordered[offsets + upper] * frac).tolist()
+        )
+
+    starts = keys[offsets].astype(datetime).tolist()
+    counts, revenue, by_status = counts.tolist(), revenue.tolist(), by_status[:, :len(STATUSES)].tolist()
+    return [
+        _series_row(starts[i], counts[i], revenue[i], by_status[i], [q[i] for q in quantiles], percentiles)
+        for i in range(n_buckets)
+    ]
+
+def series_numpy(conn, bucket: str, from_date: date, to_date: date, percentiles: Sequence[float]) -> List[dict]:
+    minutes, amounts, codes = load_order_arrays(conn, from_date, to_date)
+    return aggregate_arrays(minutes, amounts, codes, bucket, percentiles)
+
+def order_series(conn, bucket: str, from_date: date, to_date: date, percentiles: Sequence[float] = (50, 90, 99), engine: str = "sql") -> List[dict]:
+    if engine == "numpy" or not backend.window_percentiles:
+        return series_numpy(conn, bucket, from_date, to_date, percentiles)
+    return series_sql(conn, bucket, from_date, to_date, percentiles)
@@ -0,0 +1,339 @@
+import sqlite3
+from typing import List, Sequence, Tuple
+
+from app.core.config import (
+    DB_BACKEND, DB_DRIVER, DB_SERVER, DB_PORT, DB_DATABASE_MASTER, DB_USER, DB_PASSWORD, SQLITE_DIR
+)
+
+try:
+    import pyodbc
+except ImportError:  # only needed for DB_BACKEND=mssql
+    pyodbc = None
+
+try:
+    import psycopg
+except ImportError:  # only needed for DB_BACKEND=postgres
+    psycopg = None
+
+# Everything that differs between database engines: connecting, creating
+# and listing databases, DDL and the few non-portable expressions the
+# queries use. Application SQL is written once with ? placeholders and
+# asks the backend for the dialect-specific pieces.
+
+class Backend:
+    name = ""
+    # DDL vocabulary; table definitions are templates over these names
+    types = {
+        "identity": "INT PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY",
+        "text": "VARCHAR",
+        "datetime": "TIMESTAMP",
+        "today": "CURRENT_DATE",
+    }
+    # Rollup deltas as INSERT ... ON CONFLICT DO UPDATE
+    on_conflict = True
+    # PERCENTILE_CONT as a window function (the SQL analytics engine)
+    window_percentiles = False
+    # Dynamic tables: the schema catalog's column query, [quoting] and paging
+    dynamic_tables = False
+
+    def connect(self, db_name: str, autocommit: bool = False):
+        raise NotImplementedError
+
+    def create_database(self, db_name: str, if_missing: bool = False):
+        raise NotImplementedError
+
+    def list_databases(self, pool, prefix: str) -> List[str]:
+        raise NotImplementedError
+
+    def quote_identifier(self, name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def create_table_sql(self, table: str, columns: str) -> str:
+        return f"CREATE TABLE IF NOT EXISTS {table} ({columns.format(**self.types)})"
+
+    def create_index_sql(self, name: str, table: str, columns: str, include: Sequence[str] = ()) -> str:
+        extra = f" INCLUDE ({', '.join(include)})" if include else ""
+        return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}){extra}"
+
+    def table_exists(self, cursor, table: str) -> bool:
+        raise NotImplementedError
+
+    def select_limit(self, columns: str, rest: str, params: Sequence, limit: int) -> Tuple[str, list]:
+        """SELECT {columns} {rest} capped at `limit` rows; returns (sql, params)."""
+        return f"SELECT {columns} {rest} LIMIT ?", [*params, limit]
+
+    def date_of(self, column: str) -> str:
+        return f"CAST({column} AS DATE)"
+
+    def epoch_minutes(self, column: str) -> str:
+        raise NotImplementedError
+
+    def set_timeout(self, conn, seconds: int):
+        """Server-side statement timeout for this connection; 0 turns it off."""
+
+    def lock_table(self, cursor, table: str):
+        """Block other writers to `table` (readers still run) until this transaction ends."""
+        cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+
+    # Row-by-row fallbacks bracket each statement with these. A failed
+    # statement leaves the transaction usable on SQL Server and SQLite, so
+    # only PostgreSQL needs real savepoints.
+    def savepoint(self, cursor):
+        pass
+
+    def release_savepoint(self, cursor):
+        pass
+
+    def rollback_to_savepoint(self, cursor):
+        pass
+
+class SqlServerBackend(Backend):
+    name = "mssql"
+    types = {
+        "identity": "INT PRIMARY KEY IDENTITY(1,1)",
+        "text": "NVARCHAR",
+        "datetime": "DATETIME",
+        "today": "GETDATE()",
+    }
+    on_conflict = False
+    window_percentiles = True
+    dynamic_tables = True
+
+    def conn_str(self, db_name: str) -> str:
+        if DB_USER:
+            # Braces quote the password; a literal } is doubled
+            password = (DB_PASSWORD or "").replace("}", "}}")
+            auth = f"UID={DB_USER};PWD={{{password}}};TrustServerCertificate=yes;"
+        else:
+            auth = "Trusted_Connection=yes;"
+        port = f",{DB_PORT}" if DB_PORT else ""
+        return (
+            f"Driver={{{DB_DRIVER}}};"
+            f"Server={DB_SERVER}{port};"
+            f"Database={db_name};"
+            f"{auth}"
+        )
+
+    def connect(self, db_name: str, autocommit: bool = False):
+        if pyodbc is None:
+            raise RuntimeError("DB_BACKEND=mssql needs pyodbc installed")
+        return pyodbc.connect(self.conn_str(db_name), autocommit=autocommit)
+
+    def quote_identifier(self, name: str) -> str:
+        return "[" + name.replace("]", "]]") + "]"
+
+    def create_database(self, db_name: str, if_missing: bool = False):
+        # DDL runs outside a transaction, so this bypasses the pool
+        sql = f"CREATE DATABASE {self.quote_identifier(db_name)}"
+        params = ()
+        if if_missing:
+            sql = f"IF DB_ID(?) IS NULL {sql}"
+            params = (db_name,)
+        conn = self.connect(DB_DATABASE_MASTER, autocommit=True)
+        try:
+            conn.cursor().execute(sql, params)
+        finally:
+            conn.close()
+
+    def list_databases(self, pool, prefix: str) -> List[str]:
+        with pool.connection(DB_DATABASE_MASTER) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sys.databases WHERE name LIKE ?", (prefix + "%",))
+            return [row[0] for row in cursor.fetchall()]
+
+    def create_table_sql(self, table: str, columns: str) -> str:
+        return f"IF OBJECT_ID('{table}', 'U') IS NULL CREATE TABLE {table} ({columns.format(**self.types)})"
+
+    def create_index_sql(self, name: str, table: str, columns: str, include: Sequence[str] = ()) -> str:
+        extra = f" INCLUDE ({', '.join(include)})" if include else ""
+        return f"""
+            IF NOT EXISTS (
+                SELECT 1 FROM sys.indexes
+                WHERE name = '{name}' AND object_id = OBJECT_ID('{table}')
+            )
+            CREATE INDEX {name} ON {table} ({columns}){extra}
+        """
+
+    def table_exists(self, cursor, table: str) -> bool:
+        cursor.execute("SELECT OBJECT_ID(?, 'U')", (table,))
+        return cursor.fetchone()[0] is not None
+
+    def select_limit(self, columns: str, rest: str, params: Sequence, limit: int) -> Tuple[str, list]:
+        return f"SELECT TOP (?) {columns} {rest}", [limit, *params]
+
+    def epoch_minutes(self, column: str) -> str:
+        return f"DATEDIFF(minute, '1970-01-01', {column})"
+
+    def set_timeout(self, conn, seconds: int):
+        conn.timeout = seconds
+
+    def lock_table(self, cursor, table: str):
+        # UPDLOCK rather than a shared lock: two lockers queue instead of deadlocking
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WITH (UPDLOCK, TABLOCK, HOLDLOCK)")
+        cursor.fetchall()
+
+def _qmark_to_format(sql: str) -> str:
+    # ? -> %s outside string literals, and literal % doubled
+    out, quoted = [], False
+    for ch in sql:
+        if ch == "'":
+            quoted = not quoted
+        if ch == "%":
+            out.append("%%")
+        elif ch == "?" and not quoted:
+            out.append("%s")
+        else:
+            out.append(ch)
+    return "".join(out)
+
+class _QmarkCursor:
+    """psycopg cursor accepting the ? placeholders the rest of the app writes."""
+
+    _cache = {}
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _sql(self, sql: str) -> str:
+        converted = self._cache.get(sql)
+        if converted is None:
+            if len(self._cache) > 4096:
+                self._cache.clear()
+            converted = self._cache[sql] = _qmark_to_format(sql)
+        return converted
+
+    def execute(self, sql, params=None):
+        # Without parameters psycopg sends the text untouched, % included
+        self._cursor.execute(self._sql(sql) if params is not None else sql, params)
+        return self
+
+    def executemany(self, sql, params_seq):
+        self._cursor.executemany(self._sql(sql), params_seq)
+        return self
+
+class _QmarkConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        return _QmarkCursor(self._conn.cursor())
+
+class PostgresBackend(Backend):
+    name = "postgres"
+
+    def connect(self, db_name: str, autocommit: bool = False):
+        if psycopg is None:
+            raise RuntimeError("DB_BACKEND=postgres needs psycopg installed")
+        conn = psycopg.connect(
+            host=DB_SERVER, port=DB_PORT, dbname=db_name, user=DB_USER, password=DB_PASSWORD,
+            autocommit=autocommit
+        )
+        return _QmarkConnection(conn)
+
+    def create_database(self, db_name: str, if_missing: bool = False):
+        conn = self.connect(DB_DATABASE_MASTER or "postgres", autocommit=True)
+        try:
+            cursor = conn.cursor()
+            if if_missing:
+                cursor.execute("SELECT 1 FROM pg_database WHERE datname = ?", (db_name,))
+                if cursor.fetchone():
+                    return
+            try:
+                cursor.execute(f"CREATE DATABASE {self.quote_identifier(db_name)}")
+            except psycopg.errors.DuplicateDatabase:
+                if not if_missing:
+                    raise
+        finally:
+            conn.close()
+
+    def list_databases(self, pool, prefix: str) -> List[str]:
+        with pool.connection(DB_DATABASE_MASTER or "postgres") as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT datname FROM pg_database WHERE datname LIKE ?", (prefix + "%",))
+            return [row[0] for row in cursor.fetchall()]
+
+    def table_exists(self, cursor, table: str) -> bool:
+        cursor.execute("SELECT to_regclass(?)", (table,))
+        return cursor.fetchone()[0] is not None
+
+    def epoch_minutes(self, column: str) -> str:
+        return f"CAST(FLOOR(EXTRACT(EPOCH FROM {column}) / 60) AS BIGINT)"
+
+    def set_timeout(self, conn, seconds: int):
+        conn.cursor().execute(f"SET statement_timeout = {int(seconds) * 1000}")
+
+    def savepoint(self, cursor):
+        cursor.execute("SAVEPOINT row_attempt")
+
+    def release_savepoint(self, cursor):
+        cursor.execute("RELEASE SAVEPOINT row_attempt")
+
+    def rollback_to_savepoint(self, cursor):
+        cursor.execute("ROLLBACK TO SAVEPOINT row_attempt")
+
+class SqliteBackend(Backend):
+    """One database file per shop under SQLITE_DIR; for local runs and benchmarks."""
+
+    name = "sqlite"
+    types = {
+        "identity": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "text": "VARCHAR",
+        # Declared as TIMESTAMP/DATE so PARSE_DECLTYPES hands back datetime objects
+        "datetime": "TIMESTAMP",
+        "today": "CURRENT_DATE",
+    }
+
+    def path(self, db_name: str):
+        return SQLITE_DIR / f"{db_name}.sqlite3"
+
+    def connect(self, db_name: str, autocommit: bool = False):
+        SQLITE_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path(db_name), timeout=30, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None if autocommit else ""
+        )
+        # Readers don't block the writer
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def create_database(self, db_name: str, if_missing: bool = False):
+        if self.path(db_name).exists():
+            if if_missing:
+                return
+            raise ValueError(f"Database {db_name} already exists")
+        self.connect(db_name).close()
+
+    def list_databases(self, pool, prefix: str) -> List[str]:
+        return sorted(p.stem for p in SQLITE_DIR.glob(f"{prefix}*.sqlite3"))
+
+    def create_index_sql(self, name: str, table: str, columns: str, include: Sequence[str] = ()) -> str:
+        # No covering indexes in SQLite
+        return super().create_index_sql(name, table, columns)
+
+    def table_exists(self, cursor, table: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return cursor.fetchone() is not None
+
+    def date_of(self, column: str) -> str:
+        return f"date({column})"
+
+    def lock_table(self, cursor, table: str):
+        # SQLite has one writer per database file: the transaction's first
+        # write takes it, and nobody else writes until commit
+        pass
+
+    def epoch_minutes(self, column: str) -> str:
+        return f"CAST(strftime('%s', {column}) AS INTEGER) / 60"
+
+BACKENDS = {"mssql": SqlServerBackend, "postgres": PostgresBackend, "sqlite": SqliteBackend}
+
+backend = BACKENDS[DB_BACKEND]()
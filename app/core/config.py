@@ -2,75 +2,184 @@ import os
 from dotenv import load_dotenv
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from contextlib import asynccontextmanager
 from pathlib import Path
-from fpdf import FPDF
-import pyodbc
-import datetime
 
 # Load from .env
 load_dotenv()
 
+# Database engine: mssql (default), postgres or sqlite
+DB_BACKEND = os.getenv("DB_BACKEND", "mssql")
 DB_DRIVER = os.getenv("DB_DRIVER")
 DB_SERVER = os.getenv("DB_SERVER")
+DB_PORT = os.getenv("DB_PORT")
 DB_DATABASE_MASTER = os.getenv("DB_DATABASE_MASTER")
 DB_DATABASE_PRACTICE = os.getenv("DB_DATABASE_PRACTICE")
+# SQL authentication (e.g. a local SQL Server container); Windows auth when unset
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+# One file per database with DB_BACKEND=sqlite
+SQLITE_DIR = Path(os.getenv("SQLITE_DIR", "data/sqlite"))
 SECRET_KEY = "your_super_secret_key"
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_MINUTES = 30
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))
+# Operators whose logins get an admin token (/admin/*, bulk registration):
+# comma-separated shop_database:username pairs
+ADMIN_USERS = frozenset(
+    tuple(u.strip().split(":", 1)) for u in os.getenv("ADMIN_USERS", "").split(",") if ":" in u
+)
+
+# Connection pool
+DB_POOL_SIZE_PER_DB = int(os.getenv("DB_POOL_SIZE_PER_DB", 5))
+DB_POOL_MAX_TOTAL = int(os.getenv("DB_POOL_MAX_TOTAL", 100))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", 10))
+
+# Shop directory cache
+SHOP_REGISTRY_TTL = float(os.getenv("SHOP_REGISTRY_TTL", 300))
+SHOP_REGISTRY_MISS_REFRESH = float(os.getenv("SHOP_REGISTRY_MISS_REFRESH", 5))
+
+# Shop provisioning
+PROVISION_CONCURRENCY = int(os.getenv("PROVISION_CONCURRENCY", 4))
+PROVISION_MAX_ATTEMPTS = int(os.getenv("PROVISION_MAX_ATTEMPTS", 3))
+PROVISION_RETRY_BACKOFF = float(os.getenv("PROVISION_RETRY_BACKOFF", 1))
+PROVISION_JOB_HISTORY = int(os.getenv("PROVISION_JOB_HISTORY", 1000))
+
+# Worker pools for blocking work
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", 16))
+DB_EXECUTOR_QUEUE = int(os.getenv("DB_EXECUTOR_QUEUE", 64))
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", os.cpu_count() or 2))
+CPU_EXECUTOR_QUEUE = int(os.getenv("CPU_EXECUTOR_QUEUE", 16))
+FANOUT_EXECUTOR_WORKERS = int(os.getenv("FANOUT_EXECUTOR_WORKERS", 16))
+FANOUT_EXECUTOR_QUEUE = int(os.getenv("FANOUT_EXECUTOR_QUEUE", 256))
+EXECUTOR_RETRY_AFTER = int(os.getenv("EXECUTOR_RETRY_AFTER", 2))
+
+# Cross-shop fan-out (per request)
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", 8))
+FANOUT_TIMEOUT = float(os.getenv("FANOUT_TIMEOUT", 10))
+FANOUT_SLOW_THRESHOLD = float(os.getenv("FANOUT_SLOW_THRESHOLD", 2))
+
+# Password hashing (bcrypt) process pool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 64))
+PASSWORD_HASH_PER_SHOP = int(os.getenv("PASSWORD_HASH_PER_SHOP", 8))
+
+# Bulk order ingestion
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 1000))
+INGEST_MAX_BATCH_SIZE = int(os.getenv("INGEST_MAX_BATCH_SIZE", 10000))
+INGEST_MAX_ERRORS = int(os.getenv("INGEST_MAX_ERRORS", 1000))
+# Longer lines are reported as failed rows instead of being buffered
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", 64 * 1024))
+
+# Write-behind /add-order: journal locally, commit to the shop DB in batches
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_DIR = Path(os.getenv("WRITE_BEHIND_DIR", "data/journal"))
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", 500))
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", 0.1))  # max seconds before a flush
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", 100000))
+WRITE_BEHIND_SEGMENT_BYTES = int(os.getenv("WRITE_BEHIND_SEGMENT_BYTES", 64 * 1024 * 1024))
+
+# Order listing
+ORDERS_PAGE_MAX = int(os.getenv("ORDERS_PAGE_MAX", 500))
+
+# Reports
+REPORT_FETCH_SIZE = int(os.getenv("REPORT_FETCH_SIZE", 1000))
+REPORT_CACHE_DIR = Path(os.getenv("REPORT_CACHE_DIR", "temp_reports/cache"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+REPORT_CACHE_MAX_AGE = float(os.getenv("REPORT_CACHE_MAX_AGE", 7 * 24 * 3600))
+
+# Read-through cache for /summary and /data
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 3))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 10000))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Live dashboard push (/live)
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", 2000))
+LIVE_MAX_PER_SHOP = int(os.getenv("LIVE_MAX_PER_SHOP", 100))
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 256))  # events buffered per slow client
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", 15))
+
+# Analytics
+ANALYTICS_MAX_BUCKETS = int(os.getenv("ANALYTICS_MAX_BUCKETS", 10000))
+
+# Scheduled jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 8))
+JOB_SHOP_PARALLELISM = int(os.getenv("JOB_SHOP_PARALLELISM", 4))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", 50))
+JOB_JITTER = int(os.getenv("JOB_JITTER", 600))
+BACKUP_BACKEND = os.getenv("BACKUP_BACKEND", "sqlserver")
+BACKUP_DIR = os.getenv("BACKUP_DIR", "/var/opt/mssql/backup")
+REPORT_DIR = os.getenv("REPORT_DIR", "temp_reports")
+# Nightly report batch (app/core/report_batch.py)
+REPORT_ARCHIVE_DIR = Path(os.getenv("REPORT_ARCHIVE_DIR", Path(REPORT_DIR) / "archive"))
+REPORT_BATCH_WORKERS = int(os.getenv("REPORT_BATCH_WORKERS", os.cpu_count() or 2))
+REPORT_BATCH_TYPES = tuple(t.strip() for t in os.getenv("REPORT_BATCH_TYPES", "daily,monthly").split(",") if t.strip())
+# Leader election between workers on one box (see app/core/leader.py)
+LEADER_DIR = Path(os.getenv("LEADER_DIR", "data/leader"))
+LEADER_POLL = float(os.getenv("LEADER_POLL", 2))
+
+# Metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 0))  # 0 disables the slow query log
+SLOW_QUERY_SQL_CHARS = int(os.getenv("SLOW_QUERY_SQL_CHARS", 2000))
+
+# Daily rollups
+ROLLUP_RECONCILE_DAYS = int(os.getenv("ROLLUP_RECONCILE_DAYS", 2))
+ROLLUP_RECONCILE_MINUTES = int(os.getenv("ROLLUP_RECONCILE_MINUTES", 15))
 
 # APScheduler
 scheduler = AsyncIOScheduler()
 
-def build_conn_str(db_name: str) -> str:
-    return (
-        f"Driver={{{DB_DRIVER}}};"
-        f"Server={DB_SERVER};"
-        f"Database={db_name};"
-        "Trusted_Connection=yes;"
-    )
-
-def backup_job():
-    print(f"[{datetime.datetime.now()}] Running DB backup job...")
-
-def daily_report_job():
-    print(f"[{datetime.datetime.now()}] Running daily report generation job...")
-    today = datetime.date.today()
-    condition = f"WHERE CAST(order_date AS DATE) = '{today}'"
-    filename = f"auto_report_daily_{today}.pdf"
-    query = f"SELECT * FROM orders {condition}"
-
-    with pyodbc.connect(build_conn_str(DB_DATABASE_PRACTICE)) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        headers = [desc[0] for desc in cursor.description]
-
-    pdf = FPDF(orientation="P", unit="mm", format="A4")
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(200, 10, txt="Smart Ledger Daily Auto Report", ln=True, align="C")
-    pdf.set_font("Arial", size=10)
-
-    for row in rows:
-        line = ", ".join([f"{col}: {val}" for col, val in zip(headers, row)])
-        pdf.multi_cell(0, 8, line)
-
-    report_dir = Path("temp_reports")
-    report_dir.mkdir(exist_ok=True)
-    path = report_dir / filename
-    pdf.output(str(path))
-
-def email_trigger_job():
-    print(f"[{datetime.datetime.now()}] Running email trigger job... (Not implemented yet)")
-
 @asynccontextmanager
 async def lifespan(app):
-    scheduler.add_job(backup_job, CronTrigger(hour=2, minute=0))
-    scheduler.add_job(daily_report_job, CronTrigger(hour=3, minute=0))
-    scheduler.add_job(email_trigger_job, CronTrigger(hour=4, minute=0))
+    from app.core.database import pool
+    from app.core.executor import db_executor, cpu_executor, fanout_executor
+    from app.core.report_cache import report_cache
+    from app.core.rollups import reconcile_recent
+    from app.core.orders import ensure_all_order_schemas
+    from app.core.provisioning import provisioner
+    from app.core.hasher import password_hasher
+    from app.core.jobs import job_engine
+    from app.core.write_behind import write_behind
+    from app.core.leader import leadership
+
+    def schedule_shared_jobs():
+        # Leader only: jobs that touch every shop or the shared temp_reports
+        # directory. Jittered so every instance (and every restart) doesn't
+        # hit the DB server at the same second; the engine itself skips a
+        # run that would overlap
+        for name, hour in (("backup", 2), ("daily_report", 3), ("email_trigger", 4)):
+            scheduler.add_job(
+                job_engine.run, CronTrigger(hour=hour, minute=0, jitter=JOB_JITTER),
+                args=[name], id=name, max_instances=1, coalesce=True
+            )
+        scheduler.add_job(report_cache.enforce_budget, IntervalTrigger(minutes=15))
+        # One-off run right after election, off the event loop
+        scheduler.add_job(ensure_all_order_schemas)
+
+    # Every worker: these look after the worker's own pool and the shops it
+    # has served
+    scheduler.add_job(pool.evict_idle, IntervalTrigger(seconds=60))
+    scheduler.add_job(reconcile_recent, IntervalTrigger(minutes=ROLLUP_RECONCILE_MINUTES))
     scheduler.start()
-    print("Scheduler started with 3 daily jobs.")
+    leadership.start(schedule_shared_jobs, job_engine.trigger, lambda: {
+        "stats": job_engine.stats(),
+        "history": {name: job_engine.history(name) for name in job_engine.names()},
+    })
+    print("Scheduler started; daily jobs run on the elected leader worker.")
+    # Replays journals left by a crash before taking new orders
+    await write_behind.start()
     yield
+    await write_behind.stop()
+    leadership.stop()
     scheduler.shutdown()
+    job_engine.shutdown()
+    provisioner.shutdown()
+    password_hasher.shutdown()
+    db_executor.shutdown()
+    cpu_executor.shutdown()
+    fanout_executor.shutdown()
+    pool.close_all()
     print("Scheduler shut down.")
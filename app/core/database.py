@@ -1,9 +1,369 @@
-from app.core.config import DB_DRIVER, DB_SERVER
-
-def build_conn_str(db_name: str) -> str:
-    return (
-        f"Driver={{{DB_DRIVER}}};"
-        f"Server={DB_SERVER};"
-        f"Database={db_name};"
-        "Trusted_Connection=yes;"
-    )
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Callable, Optional
+
+from fastapi import Depends, Header, HTTPException, Request
+
+from app.core.backends import backend
+from app.core.config import (
+    DB_DATABASE_PRACTICE,
+    DB_POOL_SIZE_PER_DB, DB_POOL_MAX_TOTAL, DB_POOL_IDLE_TIMEOUT, DB_POOL_CHECKOUT_TIMEOUT,
+    SHOP_REGISTRY_TTL, SHOP_REGISTRY_MISS_REFRESH
+)
+from app.core.metrics import db_checkout_seconds, db_connect_seconds, instrument_connection
+from app.utils.jwt_auth import TokenClaims, verify_token_optional
+
+def connect(db_name: str, autocommit: bool = False):
+    return backend.connect(db_name, autocommit=autocommit)
+
+def create_database(db_name: str, if_missing: bool = False):
+    backend.create_database(db_name, if_missing)
+
+def list_shop_databases():
+    return backend.list_databases(pool, "shop_")
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the timeout."""
+
+@dataclass
+class PoolStats:
+    hits: int = 0
+    misses: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+    open: int = 0
+    in_use: int = 0
+    health_check_failures: int = 0
+    evictions: int = 0
+
+class ConnectionPool:
+    """
+    Connection pools keyed by database name.
+
+    Each shop database gets at most `max_per_db` connections and all shops
+    together at most `max_total`. Idle connections are pinged on checkout and
+    closed once they sit unused for longer than `idle_timeout` seconds.
+    `connect` is any callable taking a database name and returning a DB-API
+    connection, so tests can plug in e.g. `sqlite3`.
+    """
+
+    def __init__(
+        self,
+        connect: Callable = connect,
+        max_per_db: int = DB_POOL_SIZE_PER_DB,
+        max_total: int = DB_POOL_MAX_TOTAL,
+        idle_timeout: float = DB_POOL_IDLE_TIMEOUT,
+        checkout_timeout: float = DB_POOL_CHECKOUT_TIMEOUT,
+    ):
+        self.connect = connect
+        self.max_per_db = max_per_db
+        self.max_total = max_total
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._cond = threading.Condition()
+        self._idle = {}   # db_name -> deque of (conn, last_used)
+        self._stats = {}  # db_name -> PoolStats
+        self._total = 0
+
+    def _stats_for(self, db_name: str) -> PoolStats:
+        if db_name not in self._stats:
+            self._stats[db_name] = PoolStats()
+        return self._stats[db_name]
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _ping(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _drop_idle_locked(self, db_name: str, count_eviction: bool = True):
+        # Close the least recently used idle connection of db_name
+        conn, _ = self._idle[db_name].popleft()
+        stats = self._stats_for(db_name)
+        stats.open -= 1
+        if count_eviction:
+            stats.evictions += 1
+        self._total -= 1
+        self._close(conn)
+
+    def _evict_expired_locked(self, now: float):
+        for db_name, idle in self._idle.items():
+            while idle and now - idle[0][1] > self.idle_timeout:
+                self._drop_idle_locked(db_name)
+
+    def _steal_idle_slot_locked(self, exclude: str) -> bool:
+        # Free a global slot by closing the stalest idle connection of another shop
+        oldest = None
+        for db_name, idle in self._idle.items():
+            if db_name != exclude and idle and (oldest is None or idle[0][1] < self._idle[oldest][0][1]):
+                oldest = db_name
+        if oldest is None:
+            return False
+        self._drop_idle_locked(oldest)
+        return True
+
+    def acquire(self, db_name: str):
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+        with self._cond:
+            stats = self._stats_for(db_name)
+            idle = self._idle.setdefault(db_name, deque())
+            while True:
+                self._evict_expired_locked(time.monotonic())
+                if idle:
+                    conn, _ = idle.pop()
+                    stats.in_use += 1
+                    reuse = True
+                    break
+                if stats.open < self.max_per_db and (
+                    self._total < self.max_total or self._steal_idle_slot_locked(db_name)
+                ):
+                    # Reserve the slot before connecting outside the lock
+                    stats.open += 1
+                    stats.in_use += 1
+                    self._total += 1
+                    reuse = False
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    stats.waits += 1
+                    stats.wait_time += time.monotonic() - start
+                    raise PoolTimeout(f"Timed out waiting for a connection to {db_name}")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                stats.waits += 1
+                stats.wait_time += time.monotonic() - start
+
+        if reuse:
+            if self._ping(conn):
+                with self._cond:
+                    stats.hits += 1
+                db_checkout_seconds.observe(time.monotonic() - start, db_name)
+                return conn
+            with self._cond:
+                stats.health_check_failures += 1
+            self._close(conn)
+
+        # New connection (or replacement for one that failed its health check)
+        try:
+            connect_start = time.monotonic()
+            conn = self.connect(db_name)
+            db_connect_seconds.observe(time.monotonic() - connect_start, db_name)
+        except Exception:
+            with self._cond:
+                stats.open -= 1
+                stats.in_use -= 1
+                self._total -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            stats.misses += 1
+        db_checkout_seconds.observe(time.monotonic() - start, db_name)
+        return conn
+
+    def release(self, db_name: str, conn, discard: bool = False):
+        if not discard:
+            try:
+                # Never hand the next caller a half-finished transaction
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            stats = self._stats_for(db_name)
+            stats.in_use -= 1
+            if discard:
+                stats.open -= 1
+                self._total -= 1
+            else:
+                self._idle.setdefault(db_name, deque()).append((conn, time.monotonic()))
+            self._cond.notify_all()
+        if discard:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self, db_name: str):
+        conn = self.acquire(db_name)
+        discard = False
+        try:
+            # Callers get a timing proxy; the raw connection goes back to the pool
+            yield instrument_connection(conn, db_name)
+        except Exception:
+            discard = not self._ping(conn)
+            raise
+        finally:
+            self.release(db_name, conn, discard=discard)
+
+    def evict_idle(self):
+        with self._cond:
+            self._evict_expired_locked(time.monotonic())
+            self._cond.notify_all()
+
+    def close_all(self):
+        with self._cond:
+            for db_name, idle in self._idle.items():
+                while idle:
+                    self._drop_idle_locked(db_name, count_eviction=False)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "total_open": self._total,
+                "max_total": self.max_total,
+                "max_per_db": self.max_per_db,
+                "databases": {
+                    db_name: {**asdict(s), "idle": len(self._idle.get(db_name, ()))}
+                    for db_name, s in self._stats.items()
+                },
+            }
+
+pool = ConnectionPool()
+
+class ShopRegistry:
+    """
+    In-process copy of the shop database list from the database server.
+
+    Lookups are set membership tests. The list is reloaded once `ttl`
+    seconds have passed, on an explicit refresh, and at most once per
+    `miss_refresh_interval` when a lookup misses (another worker may have
+    just created the shop). While one thread reloads, the others keep
+    answering from the previous snapshot.
+    """
+
+    def __init__(
+        self,
+        loader: Callable = list_shop_databases,
+        ttl: float = SHOP_REGISTRY_TTL,
+        miss_refresh_interval: float = SHOP_REGISTRY_MISS_REFRESH,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._shops = None
+        self._loaded_at = 0.0
+        self._last_miss_refresh = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_error = None
+
+    def refresh(self) -> frozenset:
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> frozenset:
+        try:
+            shops = frozenset(self.loader())
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+                self.last_error = str(e)
+                if self._shops is None:
+                    raise
+                # Keep serving the stale list rather than failing every request
+                return self._shops
+        with self._lock:
+            self._shops = shops
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+        return shops
+
+    def _snapshot(self) -> frozenset:
+        shops = self._shops
+        if shops is None:
+            return self.refresh()
+        if time.monotonic() - self._loaded_at > self.ttl and self._refresh_lock.acquire(blocking=False):
+            try:
+                return self._refresh_locked()
+            finally:
+                self._refresh_lock.release()
+        return shops
+
+    def shops(self) -> list:
+        return sorted(self._snapshot())
+
+    def contains(self, db_name: str) -> bool:
+        if db_name in self._snapshot():
+            with self._lock:
+                self.hits += 1
+            return True
+        with self._lock:
+            self.misses += 1
+            now = time.monotonic()
+            retry = now - self._last_miss_refresh > self.miss_refresh_interval
+            if retry:
+                self._last_miss_refresh = now
+        return retry and db_name in self.refresh()
+
+    def add(self, db_name: str):
+        # Called right after CREATE DATABASE so the new shop is usable at once
+        with self._lock:
+            if self._shops is not None:
+                self._shops = self._shops | {db_name}
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "shops": len(self._shops or ()),
+                "age_seconds": time.monotonic() - self._loaded_at if self._shops is not None else None,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "last_error": self.last_error,
+            }
+
+shop_registry = ShopRegistry()
+
+def is_known_database(db_name: str) -> bool:
+    return db_name == DB_DATABASE_PRACTICE or shop_registry.contains(db_name)
+
+# Dependency to get selected DB name from frontend header, validated
+# against the shop registry so unknown names never reach the pool
+def get_selected_db(
+    request: Request,
+    claims: Optional[TokenClaims] = Depends(verify_token_optional),
+    x_database_name: Optional[str] = Header(None)
+):
+    # A signed-in user only ever reaches their own shop; X-Database-Name is
+    # ignored then, and without a token only the practice DB is open
+    if claims is not None:
+        db_name = claims.shop_name
+    else:
+        db_name = x_database_name or DB_DATABASE_PRACTICE
+        if db_name != DB_DATABASE_PRACTICE:
+            raise HTTPException(status_code=401, detail="Sign in to use this database.")
+    if not is_known_database(db_name):
+        raise HTTPException(status_code=404, detail="Database not found.")
+    # Lets the metrics middleware tag the request with its shop
+    request.state.shop = db_name
+    return db_name
+
+# Dependency handing routes a pooled connection to the selected DB
+def get_db_conn(db_name: str = Depends(get_selected_db)):
+    try:
+        with pool.connection(db_name) as conn:
+            yield conn
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
@@ -0,0 +1,163 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.core.config import (
+    DB_EXECUTOR_WORKERS, DB_EXECUTOR_QUEUE,
+    CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_QUEUE,
+    FANOUT_EXECUTOR_WORKERS, FANOUT_EXECUTOR_QUEUE, EXECUTOR_RETRY_AFTER
+)
+
+class ExecutorSaturated(Exception):
+    """Raised when an executor's queue is full."""
+
+_DONE = object()
+
+class _LockedIterator:
+    # Serializes next() and close() so a generator is never closed mid-step
+    def __init__(self, iterator):
+        self._iterator = iterator
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            return next(self._iterator, _DONE)
+
+    def close(self):
+        with self._lock:
+            close = getattr(self._iterator, "close", None)
+            if close:
+                close()
+
+class BoundedExecutor:
+    """
+    Thread pool that refuses new work once `max_workers + max_queue` tasks are
+    pending, so a burst of slow requests turns into fast 503s instead of an
+    unbounded backlog.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queue_depth = 0
+        self._queue_wait = 0.0
+        self._run_time = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self._pending - self._running, 0)
+
+    def _call(self, fn, enqueued: float):
+        started = time.monotonic()
+        with self._lock:
+            self._running += 1
+            self._queue_wait += started - enqueued
+        failed = False
+        try:
+            return fn()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+                self._failed += failed
+                self._run_time += time.monotonic() - started
+
+    async def run(self, fn, *args, **kwargs):
+        return await self._submit(functools.partial(fn, *args, **kwargs), enforce_limit=True)
+
+    async def _submit(self, fn, enforce_limit: bool):
+        with self._lock:
+            if enforce_limit and self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor is saturated")
+            self._pending += 1
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, self.queue_depth)
+        call = functools.partial(self._call, fn, time.monotonic())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, call)
+
+    async def iterate(self, iterator):
+        """
+        Drive a blocking iterator on this pool. The first item is fetched
+        eagerly so saturation is reported before a response starts; once
+        admitted, a stream is never cut off halfway by backpressure.
+        """
+        iterator = _LockedIterator(iterator)
+        first = await self.run(iterator.next)
+
+        async def rest():
+            item = first
+            try:
+                while item is not _DONE:
+                    yield item
+                    item = await self._submit(iterator.next, enforce_limit=False)
+            finally:
+                # Don't await: the caller may be cancelled (client went away)
+                self._pool.submit(iterator.close)
+
+        return rest()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self._max_queue_depth,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_queue_wait": self._queue_wait / self._completed if self._completed else 0.0,
+                "avg_run_time": self._run_time / self._completed if self._completed else 0.0,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+db_executor = BoundedExecutor("db", DB_EXECUTOR_WORKERS, DB_EXECUTOR_QUEUE)
+cpu_executor = BoundedExecutor("cpu", CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_QUEUE)
+# Cross-shop queries get their own threads so a wide fan-out can't starve
+# ordinary per-shop requests on db_executor
+fanout_executor = BoundedExecutor("fanout", FANOUT_EXECUTOR_WORKERS, FANOUT_EXECUTOR_QUEUE)
+
+async def _run(submit, *args, **kwargs):
+    # `submit` is a bound BoundedExecutor.run/.iterate
+    try:
+        return await submit(*args, **kwargs)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=503, detail=str(e),
+            headers={"Retry-After": str(EXECUTOR_RETRY_AFTER)}
+        )
+
+# Blocking database work (pyodbc calls)
+async def run_query(fn, *args, **kwargs):
+    return await _run(db_executor.run, fn, *args, **kwargs)
+
+# CPU-heavy work (PDF rendering, parsing); passwords go to app.core.hasher
+async def run_cpu(fn, *args, **kwargs):
+    return await _run(cpu_executor.run, fn, *args, **kwargs)
+
+# Blocking generator producing a response body (e.g. a streamed report)
+async def stream_cpu(iterator):
+    return await _run(cpu_executor.iterate, iterator)
@@ -0,0 +1,61 @@
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence
+
+from app.core.config import FANOUT_CONCURRENCY, FANOUT_TIMEOUT, FANOUT_SLOW_THRESHOLD
+from app.core.backends import backend
+from app.core.database import pool
+from app.core.executor import fanout_executor
+
+@dataclass
+class ShopResult:
+    db_name: str
+    status: str  # "ok", "failed" or "timeout"
+    elapsed: float
+    value: Any = None
+    error: Optional[str] = None
+
+    @property
+    def slow(self) -> bool:
+        return self.elapsed > FANOUT_SLOW_THRESHOLD
+
+def _call_on_shop(db_name: str, timeout: float, fn: Callable, *args):
+    with pool.connection(db_name) as conn:
+        # Let the server cancel a runaway query too, so a timed-out shop
+        # doesn't keep a fan-out worker busy after we stopped waiting
+        backend.set_timeout(conn, max(math.ceil(timeout), 1))
+        try:
+            return fn(db_name, conn, *args)
+        finally:
+            backend.set_timeout(conn, 0)
+
+async def fan_out(
+    db_names: Sequence[str],
+    fn: Callable,
+    *args,
+    concurrency: int = FANOUT_CONCURRENCY,
+    timeout: float = FANOUT_TIMEOUT,
+) -> List[ShopResult]:
+    """
+    Run fn(db_name, conn, *args) against every shop, at most `concurrency`
+    at a time, each bounded by `timeout` seconds. Never raises for a single
+    shop; failures come back as ShopResults in input order.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(db_name: str) -> ShopResult:
+        async with limit:
+            start = time.monotonic()
+            try:
+                value = await asyncio.wait_for(
+                    fanout_executor.run(_call_on_shop, db_name, timeout, fn, *args), timeout
+                )
+                return ShopResult(db_name, "ok", time.monotonic() - start, value)
+            except asyncio.TimeoutError:
+                return ShopResult(db_name, "timeout", time.monotonic() - start, error=f"no answer within {timeout}s")
+            except Exception as e:
+                return ShopResult(db_name, "failed", time.monotonic() - start, error=str(e))
+
+    return await asyncio.gather(*(one(db_name) for db_name in db_names))
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from app.core.config import (
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, PASSWORD_HASH_PER_SHOP, EXECUTOR_RETRY_AFTER
+)
+from app.core.executor import ExecutorSaturated
+from app.utils.passwords import hash_password, check_password
+
+class ShopLimitExceeded(ExecutorSaturated):
+    """Raised when one shop already has its share of hashing slots."""
+
+def _timed(fn, *args):
+    # Runs in the worker process; wall clock so the parent can derive queue wait
+    started = time.time()
+    result = fn(*args)
+    return started, time.time() - started, result
+
+class PasswordHasher:
+    """
+    bcrypt on a process pool, so hashing never holds the GIL the event loop
+    needs. At most `max_workers + max_queue` calls are pending overall and
+    `per_shop` per shop, so a login storm at one shop can't starve the rest.
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_QUEUE, per_shop: int = PASSWORD_HASH_PER_SHOP):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.per_shop = per_shop
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._by_shop = defaultdict(int)
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._rejected_shop = 0
+        self._queue_wait = 0.0
+        self._hash_time = 0.0
+        self._max_hash_time = 0.0
+
+    def _submit(self, shop: str, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated("password hasher is saturated")
+            if self._by_shop[shop] >= self.per_shop:
+                self._rejected_shop += 1
+                raise ShopLimitExceeded(f"too many concurrent logins for {shop}")
+            self._pending += 1
+            self._by_shop[shop] += 1
+            self._submitted += 1
+        enqueued = time.time()
+        outer = Future()
+
+        def done(f: Future):
+            failed = f.cancelled() or f.exception() is not None
+            with self._lock:
+                self._release_locked(shop)
+                self._completed += 1
+                self._failed += failed
+                if not failed:
+                    started, elapsed, _ = f.result()
+                    self._queue_wait += max(started - enqueued, 0.0)
+                    self._hash_time += elapsed
+                    self._max_hash_time = max(self._max_hash_time, elapsed)
+            if f.cancelled():
+                outer.cancel()
+            elif failed:
+                outer.set_exception(f.exception())
+            else:
+                outer.set_result(f.result()[2])
+
+        try:
+            inner = self._pool.submit(_timed, fn, *args)
+        except Exception:
+            with self._lock:
+                self._release_locked(shop)
+            raise
+        inner.add_done_callback(done)
+        return outer
+
+    def _release_locked(self, shop: str):
+        self._pending -= 1
+        self._by_shop[shop] -= 1
+        if not self._by_shop[shop]:
+            del self._by_shop[shop]
+
+    async def hash(self, password: str, shop: str) -> str:
+        return await asyncio.wrap_future(self._submit(shop, hash_password, password))
+
+    async def check(self, password: str, password_hash: str, shop: str) -> bool:
+        return await asyncio.wrap_future(self._submit(shop, check_password, password, password_hash))
+
+    def hash_blocking(self, password: str, shop: str) -> str:
+        # For worker threads (e.g. provisioning) that are already off the event loop
+        return self._submit(shop, hash_password, password).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            succeeded = self._completed - self._failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "per_shop": self.per_shop,
+                "pending": self._pending,
+                "busiest_shops": sorted(self._by_shop.items(), key=lambda kv: -kv[1])[:5],
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "rejected_per_shop": self._rejected_shop,
+                "avg_queue_wait": self._queue_wait / succeeded if succeeded else 0.0,
+                "avg_hash_time": self._hash_time / succeeded if succeeded else 0.0,
+                "max_hash_time": self._max_hash_time,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher()
+
+async def _run(coro_fn, *args):
+    try:
+        return await coro_fn(*args)
+    except ShopLimitExceeded as e:
+        raise HTTPException(
+            status_code=429, detail=str(e),
+            headers={"Retry-After": str(EXECUTOR_RETRY_AFTER)}
+        )
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=503, detail=str(e),
+            headers={"Retry-After": str(EXECUTOR_RETRY_AFTER)}
+        )
+
+async def hash_password_async(password: str, shop: str) -> str:
+    return await _run(password_hasher.hash, password, shop)
+
+async def check_password_async(password: str, password_hash: str, shop: str) -> bool:
+    return await _run(password_hasher.check, password, password_hash, shop)
@@ -0,0 +1,211 @@
+import datetime
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, Optional
+
+from app.core.config import (
+    DB_DATABASE_MASTER, DB_DATABASE_PRACTICE,
+    JOB_WORKERS, JOB_SHOP_PARALLELISM, JOB_HISTORY,
+    BACKUP_BACKEND, BACKUP_DIR
+)
+from app.core.database import connect, shop_registry
+
+# ---------- Backups ----------
+
+class SqlServerBackup:
+    """BACKUP DATABASE to a directory on the SQL Server host."""
+
+    def __init__(self, directory: str = BACKUP_DIR):
+        self.directory = directory
+
+    def backup(self, db_name: str) -> str:
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        # The path is on the database server, which may well be Windows
+        sep = "\\" if "\\" in self.directory else "/"
+        path = f"{self.directory.rstrip(sep)}{sep}{db_name}_{stamp}.bak"
+        # BACKUP can't run in a transaction; COPY_ONLY keeps it out of any
+        # log backup chain the DBA manages
+        conn = connect(DB_DATABASE_MASTER, autocommit=True)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"DECLARE @path NVARCHAR(4000) = ?; "
+                f"BACKUP DATABASE [{db_name.replace(']', ']]')}] TO DISK = @path WITH COPY_ONLY, INIT, CHECKSUM",
+                (path,)
+            )
+            # The backup only finishes once every progress message is consumed
+            while cursor.nextset():
+                pass
+        finally:
+            conn.close()
+        return path
+
+class NoopBackup:
+    """Records what would have been backed up; for tests and local dev."""
+
+    def __init__(self):
+        self.calls = []
+
+    def backup(self, db_name: str) -> str:
+        self.calls.append((db_name, time.time()))
+        return f"noop://{db_name}"
+
+BACKUP_BACKENDS = {"sqlserver": SqlServerBackup, "noop": NoopBackup}
+
+backup_backend = BACKUP_BACKENDS[BACKUP_BACKEND]()
+
+def backup_shop(db_name: str):
+    return backup_backend.backup(db_name)
+
+# ---------- Daily reports ----------
+
+def daily_report_batch() -> dict:
+    # Every shop on a process pool; see app/core/report_batch.py
+    from app.core.report_batch import run_report_batch
+
+    return run_report_batch(all_databases())
+
+def email_trigger():
+    print(f"[{datetime.datetime.now()}] Running email trigger job... (Not implemented yet)")
+
+# ---------- Engine ----------
+
+def all_databases():
+    return [db for db in [DB_DATABASE_PRACTICE] if db] + shop_registry.shops()
+
+@dataclass
+class JobRun:
+    job: str
+    started_at: float
+    finished_at: Optional[float] = None
+    status: str = "running"  # running, succeeded, partial, failed, skipped
+    shops_ok: int = 0
+    shops_failed: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.finished_at - self.started_at if self.finished_at else None
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "duration": self.duration}
+
+@dataclass
+class Job:
+    name: str
+    fn: Callable
+    per_shop: bool
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    history: deque = field(default_factory=lambda: deque(maxlen=JOB_HISTORY))
+
+def _status(run: JobRun) -> str:
+    return "succeeded" if not run.shops_failed else ("partial" if run.shops_ok else "failed")
+
+class JobEngine:
+    """
+    Runs scheduled jobs off the event loop. A per-shop job calls fn(db_name)
+    for the practice DB and every shop, at most `shop_parallelism` at once,
+    and one shop failing doesn't stop the rest. A job that is still running
+    when its next trigger fires is skipped, not started twice.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, shop_parallelism: int = JOB_SHOP_PARALLELISM):
+        self.shop_parallelism = shop_parallelism
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+
+    def register(self, name: str, fn: Callable, per_shop: bool = True):
+        self._jobs[name] = Job(name, fn, per_shop)
+
+    def names(self):
+        return list(self._jobs)
+
+    def run(self, name: str) -> JobRun:
+        job = self._jobs[name]
+        run = JobRun(name, time.time())
+        if not job.lock.acquire(blocking=False):
+            run.status = "skipped"
+            run.finished_at = run.started_at
+            job.history.append(run)
+            return run
+        job.history.append(run)
+        try:
+            if job.per_shop:
+                self._run_per_shop(job, run)
+            else:
+                result = job.fn()
+                if isinstance(result, dict) and "shops_ok" in result:
+                    # Jobs that fan out over shops themselves report the same way
+                    run.shops_ok = result["shops_ok"]
+                    run.shops_failed = result["shops_failed"]
+                    run.errors.update(result["errors"])
+                    run.status = _status(run)
+                else:
+                    run.status = "succeeded"
+        except Exception as e:
+            run.errors["*"] = str(e)
+            run.status = "failed"
+        finally:
+            run.finished_at = time.time()
+            job.lock.release()
+            print(f"[{datetime.datetime.now()}] Job {name} {run.status} in {run.duration:.1f}s")
+        return run
+
+    def _run_per_shop(self, job: Job, run: JobRun):
+        databases = all_databases()
+        slots = threading.BoundedSemaphore(self.shop_parallelism)
+
+        def one(db_name: str):
+            try:
+                return job.fn(db_name)
+            finally:
+                slots.release()
+
+        futures = {}
+        for db_name in databases:
+            slots.acquire()
+            futures[self._pool.submit(one, db_name)] = db_name
+        for future in as_completed(futures):
+            try:
+                future.result()
+                run.shops_ok += 1
+            except Exception as e:
+                run.shops_failed += 1
+                run.errors[futures[future]] = str(e)
+        run.status = _status(run)
+
+    def trigger(self, name: str):
+        """Start a run in the background (e.g. from an admin endpoint)."""
+        if name not in self._jobs:
+            raise KeyError(name)
+        threading.Thread(target=self.run, args=(name,), name=f"job-{name}", daemon=True).start()
+
+    def history(self, name: str):
+        return [run.to_dict() for run in self._jobs[name].history]
+
+    def stats(self) -> dict:
+        stats = {}
+        for name, job in self._jobs.items():
+            runs = list(job.history)
+            finished = [r for r in runs if r.status != "skipped" and r.duration is not None]
+            last = runs[-1] if runs else None
+            stats[name] = {
+                "running": job.lock.locked(),
+                "runs": len(runs),
+                "failures": sum(r.status in ("failed", "partial") for r in runs),
+                "skipped": sum(r.status == "skipped" for r in runs),
+                "avg_duration": sum(r.duration for r in finished) / len(finished) if finished else None,
+                "last": last.to_dict() if last else None,
+            }
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+job_engine = JobEngine()
+job_engine.register("backup", backup_shop)
+job_engine.register("daily_report", daily_report_batch, per_shop=False)
+job_engine.register("email_trigger", email_trigger, per_shop=False)
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.core.config import LEADER_DIR, LEADER_POLL
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# With `uvicorn --workers N` every worker runs the lifespan, but scheduled
+# jobs must run once per box. Workers race for an exclusive lock on
+# LEADER_DIR/leader.lock; the holder is the leader and registers the jobs.
+# The OS drops the lock when the leader dies, and the next worker to poll
+# takes over. Followers hand ad-hoc job runs to the leader through a spool
+# directory, and read job state from the snapshot the leader publishes.
+
+def _try_lock(file) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def _write_json(path: Path, data):
+    # Readers never see a half-written file
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(data, default=str))
+    os.replace(tmp, path)
+
+class Leadership:
+    def __init__(self, directory: Path = LEADER_DIR, poll: float = LEADER_POLL):
+        self.directory = directory
+        self.poll = poll
+        self.queue_dir = directory / "queue"
+        self.status_path = directory / "status.json"
+        self.is_leader = False
+        self.since: Optional[float] = None
+        self._file = None
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.dequeued = 0
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.queue_dir.mkdir(exist_ok=True)
+        file = open(self.directory / "leader.lock", "a+b")
+        if not _try_lock(file):
+            file.close()
+            return False
+        self._file = file
+        self.is_leader = True
+        self.since = time.time()
+        return True
+
+    def enqueue(self, job: str) -> str:
+        """Ask whichever worker leads (now or after a failover) to run `job`."""
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        request_id = f"{time.time():.6f}-{uuid.uuid4().hex[:8]}"
+        _write_json(self.queue_dir / f"{request_id}.json", {"job": job, "from_pid": os.getpid(), "at": time.time()})
+        self.enqueued += 1
+        return request_id
+
+    def drain(self, run_job: Callable[[str], None]):
+        for path in sorted(self.queue_dir.glob("*.json")):
+            try:
+                request = json.loads(path.read_text())
+                path.unlink()
+            except (OSError, ValueError):
+                continue
+            self.dequeued += 1
+            try:
+                run_job(request["job"])
+            except KeyError:
+                print(f"Ignoring queued run of unknown job {request.get('job')!r}")
+
+    def publish(self, jobs: dict):
+        _write_json(self.status_path, {"pid": os.getpid(), "since": self.since, "updated": time.time(), "jobs": jobs})
+
+    def status(self) -> Optional[dict]:
+        """The leader's last published snapshot, or None before any leader has published."""
+        try:
+            return json.loads(self.status_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    async def run(self, on_elected: Callable[[], None], run_job: Callable[[str], None], jobs: Callable[[], dict]):
+        while True:
+            try:
+                if not self.is_leader and self.try_acquire():
+                    print(f"Worker {os.getpid()} is now the scheduler leader.")
+                    on_elected()
+                if self.is_leader:
+                    self.drain(run_job)
+                    self.publish(jobs())
+            except Exception as e:
+                print(f"Leader election tick failed: {e}")
+            await asyncio.sleep(self.poll)
+
+    def start(self, on_elected: Callable[[], None], run_job: Callable[[str], None], jobs: Callable[[], dict]):
+        self._task = asyncio.ensure_future(self.run(on_elected, run_job, jobs))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._file is not None:
+            # Closing releases the lock; a follower takes over on its next poll
+            self._file.close()
+            self._file = None
+        self.is_leader = False
+
+    def stats(self) -> dict:
+        status = self.status()
+        return {
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "since": self.since,
+            "leader_pid": status["pid"] if status else None,
+            "leader_updated": status["updated"] if status else None,
+            "queued": len(list(self.queue_dir.glob("*.json"))) if self.queue_dir.exists() else 0,
+            "enqueued": self.enqueued,
+            "dequeued": self.dequeued,
+        }
+
+leadership = Leadership()
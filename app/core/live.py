@@ -0,0 +1,156 @@
+import asyncio
+import json
+import weakref
+from collections import defaultdict
+from datetime import date
+from typing import AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import LIVE_MAX_SUBSCRIBERS, LIVE_MAX_PER_SHOP, LIVE_QUEUE_SIZE, LIVE_HEARTBEAT
+from app.core.rollups import STATUSES
+
+class SubscriberLimit(Exception):
+    """Raised when a shop or the process has no room for another live subscriber."""
+
+def _frame(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n".encode()
+
+# Sent in place of whatever a slow client missed: refetch /summary and /data
+RESYNC = _frame("resync", {})
+HEARTBEAT = b": ping\n\n"
+
+def summary_delta(orders: Iterable[Tuple[date, float, str]]) -> list:
+    """Per-day changes to the /summary figures, in the shape fetch_summary returns."""
+    days = defaultdict(lambda: {
+        "total_orders": 0, "total_income": 0.0,
+        "completed_orders": 0, "pending_orders": 0, "cancelled_orders": 0,
+    })
+    for day, amount, status in orders:
+        delta = days[day]
+        delta["total_orders"] += 1
+        delta["total_income"] += amount
+        delta[f"{status}_orders"] += 1
+    return [{"day": day, **delta} for day, delta in sorted(days.items())]
+
+class _Subscriber:
+    __slots__ = ("queue", "lagging", "release")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(LIVE_QUEUE_SIZE)
+        self.lagging = False
+        self.release = None
+
+class LiveHub:
+    """
+    In-process fan-out of per-shop change events to Server-Sent Events
+    subscribers. A write publishes once: the event is encoded a single time
+    and the same bytes are queued for every subscriber of the shop.
+
+    Each subscriber has a bounded queue. A client that falls LIVE_QUEUE_SIZE
+    events behind has its backlog dropped and gets one `resync` event
+    instead, telling it to refetch /summary and /data; the writer never
+    waits on a slow reader. Only used from the event loop.
+    """
+
+    def __init__(self, max_subscribers: int = LIVE_MAX_SUBSCRIBERS, max_per_shop: int = LIVE_MAX_PER_SHOP):
+        self.max_subscribers = max_subscribers
+        self.max_per_shop = max_per_shop
+        self._shops: Dict[str, Set[_Subscriber]] = defaultdict(set)
+        self._count = 0
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+        self.rejected = 0
+
+    def has_subscribers(self, db_name: str) -> bool:
+        return bool(self._shops.get(db_name))
+
+    def publish(self, db_name: str, event: str, data) -> int:
+        subscribers = self._shops.get(db_name)
+        if not subscribers:
+            return 0
+        frame = _frame(event, data)
+        self.published += 1
+        for subscriber in subscribers:
+            if subscriber.lagging:
+                continue
+            try:
+                subscriber.queue.put_nowait(frame)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # Drop the backlog rather than block the writer or grow memory
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(RESYNC)
+                subscriber.lagging = True
+                self.resyncs += 1
+        return len(subscribers)
+
+    def publish_orders(self, db_name: str, orders: list, single: Optional[dict] = None):
+        """One change event per committed write: the new order (single inserts) and summary deltas."""
+        if not self.has_subscribers(db_name):
+            return
+        if single is not None:
+            self.publish(db_name, "order", single)
+        self.publish(db_name, "summary", summary_delta(orders))
+
+    def subscribe(self, db_name: str) -> AsyncIterator[bytes]:
+        """SSE byte stream for one client; raises SubscriberLimit before the first byte."""
+        # No await between the check and the registration, so a burst of
+        # requests can't all pass the check before any of them is counted
+        if self._count >= self.max_subscribers or len(self._shops.get(db_name, ())) >= self.max_per_shop:
+            self.rejected += 1
+            raise SubscriberLimit(f"Too many live subscribers for {db_name}")
+        subscriber = _Subscriber()
+        self._shops[db_name].add(subscriber)
+        self._count += 1
+        stream = self._stream(db_name, subscriber)
+        # The stream's finally frees the slot; a response that is dropped
+        # before it starts iterating never gets there, so collecting the
+        # stream frees it too. Runs at most once either way.
+        subscriber.release = weakref.finalize(stream, self._remove, db_name, subscriber)
+        return stream
+
+    def _remove(self, db_name: str, subscriber: _Subscriber):
+        subscribers = self._shops.get(db_name)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._shops[db_name]
+        self._count -= 1
+
+    async def _stream(self, db_name: str, subscriber: _Subscriber):
+        try:
+            yield _frame("ready", {"shop": db_name, "statuses": STATUSES})
+            while True:
+                try:
+                    # wait_for costs a task per call; skip it while there's a backlog
+                    frame = subscriber.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    frame = None
+                try:
+                    if frame is None:
+                        frame = await asyncio.wait_for(subscriber.queue.get(), LIVE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from idling the stream out and surfaces dead clients
+                    yield HEARTBEAT
+                    continue
+                if frame is RESYNC:
+                    subscriber.lagging = False
+                yield frame
+        finally:
+            subscriber.release()
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "max_subscribers": self.max_subscribers,
+            "max_per_shop": self.max_per_shop,
+            "shops": {name: len(subs) for name, subs in self._shops.items()},
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+            "rejected": self.rejected,
+        }
+
+live_hub = LiveHub()
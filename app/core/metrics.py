@@ -0,0 +1,331 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, Sequence, Tuple
+
+from app.core.config import METRICS_ENABLED, SLOW_QUERY_MS, SLOW_QUERY_SQL_CHARS
+
+# Small in-process metrics registry rendered in the Prometheus text format.
+# Everything is plain counters/histograms behind one lock per metric, so an
+# observation costs a dict lookup and a bisect.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+slow_query_log = logging.getLogger("smart_ledger.slow_query")
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_labels(self.labels, values)} {total}"
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple, list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(values, list(series)) for values, series in self._series.items()]
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []  # (name, help, label names, callback -> {label values: value})
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, help: str, labels: Sequence[str], callback: Callable[[], Dict[Tuple, float]]):
+        # Read at scrape time from the component's own stats()
+        self._gauges.append((name, help, tuple(labels), callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help, labels, callback in self._gauges:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                values = callback()
+            except Exception:
+                continue
+            for label_values, value in values.items():
+                lines.append(f"{name}{_labels(labels, label_values)} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "smart_ledger_http_request_seconds", "Request latency until the last body byte is sent",
+    ("method", "route", "status", "shop")
+)
+db_checkout_seconds = registry.histogram(
+    "smart_ledger_db_checkout_seconds", "Time to get a pooled connection, including waiting", ("shop",)
+)
+db_connect_seconds = registry.histogram(
+    "smart_ledger_db_connect_seconds", "Time to open a new database connection", ("shop",)
+)
+db_execute_seconds = registry.histogram(
+    "smart_ledger_db_execute_seconds", "cursor.execute/executemany time", ("shop", "op")
+)
+db_fetch_seconds = registry.histogram(
+    "smart_ledger_db_fetch_seconds", "Time spent fetching result rows, per statement", ("shop", "op")
+)
+db_rows = registry.counter("smart_ledger_db_rows_total", "Rows fetched from the database", ("shop", "op"))
+db_slow_queries = registry.counter("smart_ledger_db_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ("shop",))
+render_seconds = registry.histogram(
+    "smart_ledger_report_render_seconds", "Time spent producing a report/export body (fetch + render)",
+    ("shop", "format")
+)
+render_bytes = registry.counter("smart_ledger_report_bytes_total", "Report/export bytes produced", ("shop", "format"))
+
+# ---------- DB-call wrapper ----------
+
+_ops: Dict[str, str] = {}
+
+def _op(sql: str) -> str:
+    # Statements repeat, so the leading keyword is looked up rather than re-parsed
+    op = _ops.get(sql)
+    if op is None:
+        words = sql.lstrip().split(None, 1)
+        op = words[0].upper() if words else "?"
+        if len(_ops) > 4096:
+            _ops.clear()
+        _ops[sql] = op
+    return op
+
+class InstrumentedCursor:
+    """
+    Cursor proxy timing execute and fetch separately. Fetch time and rows are
+    accumulated per statement and recorded when the result is exhausted, the
+    next statement runs or the cursor is closed.
+    """
+
+    def __init__(self, cursor, db_name: str):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_db_name", db_name)
+        object.__setattr__(self, "_statement", None)  # [sql, op, execute seconds, fetch seconds, rows]
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def _finish(self):
+        statement = self._statement
+        if statement is None:
+            return
+        object.__setattr__(self, "_statement", None)
+        sql, op, execute_time, fetch_time, rows = statement
+        db_fetch_seconds.observe(fetch_time, self._db_name, op)
+        if rows:
+            db_rows.inc(rows, self._db_name, op)
+        total_ms = (execute_time + fetch_time) * 1000
+        if SLOW_QUERY_MS and total_ms >= SLOW_QUERY_MS:
+            db_slow_queries.inc(1, self._db_name)
+            slow_query_log.warning(
+                "slow query on %s: %.1f ms (execute %.1f ms, fetch %.1f ms, %d rows): %s",
+                self._db_name, total_ms, execute_time * 1000, fetch_time * 1000, rows,
+                " ".join(sql.split())[:SLOW_QUERY_SQL_CHARS]
+            )
+
+    def _run(self, method, sql, *args):
+        self._finish()
+        start = time.perf_counter()
+        method(sql, *args)
+        elapsed = time.perf_counter() - start
+        op = _op(sql)
+        db_execute_seconds.observe(elapsed, self._db_name, op)
+        object.__setattr__(self, "_statement", [sql, op, elapsed, 0.0, 0])
+        if self._cursor.description is None:
+            # No result set (DML/DDL), so there is nothing left to fetch
+            self._finish()
+        return self
+
+    def execute(self, sql, *args):
+        return self._run(self._cursor.execute, sql, *args)
+
+    def executemany(self, sql, *args):
+        return self._run(self._cursor.executemany, sql, *args)
+
+    def _fetched(self, start: float, rows: int, exhausted: bool):
+        statement = self._statement
+        if statement is not None:
+            statement[3] += time.perf_counter() - start
+            statement[4] += rows
+            if exhausted:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, *args):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def nextset(self):
+        self._finish()
+        return self._cursor.nextset()
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are InstrumentedCursors tagged with the shop."""
+
+    def __init__(self, conn, db_name: str):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_db_name", db_name)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._db_name)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+def instrument_connection(conn, db_name: str):
+    return InstrumentedConnection(conn, db_name) if METRICS_ENABLED else conn
+
+# ---------- Streams ----------
+
+def measure_stream(chunks: Iterator[bytes], db_name: str, fmt: str) -> Iterator[bytes]:
+    """Pass chunks through, recording time spent producing them and bytes out."""
+    if not METRICS_ENABLED:
+        yield from chunks
+        return
+    elapsed = 0.0
+    size = 0
+    iterator = iter(chunks)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            size += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            close()
+        render_seconds.observe(elapsed, db_name, fmt)
+        render_bytes.inc(size, db_name, fmt)
+
+# ---------- HTTP ----------
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency by route template, status and
+    shop. Timing ends with the last body chunk, so streamed exports are
+    measured in full rather than up to the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Routing fills in "route" and get_selected_db the shop once it
+            # is validated. Never the raw path: any client could mint labels
+            route = scope.get("route")
+            shop = scope.get("state", {}).get("shop") or "-"
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status[0],
+                shop,
+            )
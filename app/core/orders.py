@@ -0,0 +1,129 @@
+import base64
+from datetime import date, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from app.core.backends import backend
+from app.core.config import DB_DATABASE_PRACTICE
+from app.core.database import list_shop_databases, pool
+
+# Shared SQL for the per-shop orders table
+
+ORDERS_COLUMNS = """
+    id {identity},
+    user_id INT NOT NULL,
+    amount FLOAT NOT NULL,
+    status {text}(20) NOT NULL,
+    order_date {datetime} NOT NULL DEFAULT CURRENT_TIMESTAMP
+"""
+
+ORDERS_TABLE_SQL = backend.create_table_sql("orders", ORDERS_COLUMNS)
+
+ORDER_FIELDS = ("id", "user_id", "amount", "status", "order_date")
+
+# name -> (key columns, included columns); order_date serves range reports
+# and summaries, status the per-status filters and id DESC the newest-first listing
+ORDER_INDEXES = {
+    "ix_orders_order_date": ("order_date", ("amount", "status", "user_id")),
+    "ix_orders_status": ("status, order_date", ()),
+    "ix_orders_id_desc": ("id DESC", ()),
+}
+
+def order_date_filter(from_date: Optional[date], to_date: Optional[date]) -> Tuple[List[str], list]:
+    """
+    Half-open, parameterized range on order_date for the inclusive days
+    [from_date, to_date]; either side may be None. Comparing the bare
+    column (instead of CAST(order_date AS DATE)) lets the index seek.
+    """
+    clauses, params = [], []
+    if from_date:
+        clauses.append("order_date >= ?")
+        params.append(from_date)
+    if to_date:
+        clauses.append("order_date < ?")
+        params.append(to_date + timedelta(days=1))
+    return clauses, params
+
+def where_sql(clauses: List[str]) -> str:
+    return f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> int:
+    padded = token + "=" * (-len(token) % 4)
+    return int(base64.urlsafe_b64decode(padded.encode()).decode())
+
+def list_orders(
+    conn,
+    columns: Sequence[str] = ORDER_FIELDS,
+    limit: int = 5,
+    before_id: Optional[int] = None,
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+):
+    """
+    One page of orders, newest first. Pages are keyed on id (id < before_id)
+    rather than OFFSET, so every page is an index seek plus `limit` rows no
+    matter how deep the caller has scrolled. Returns (rows, next_cursor).
+    """
+    clauses, params = order_date_filter(from_date, to_date)
+    for sql, value in (
+        ("id < ?", before_id),
+        ("status = ?", status),
+        ("user_id = ?", user_id),
+        ("amount >= ?", min_amount),
+        ("amount <= ?", max_amount),
+    ):
+        if value is not None:
+            clauses.append(sql)
+            params.append(value)
+
+    # id is always fetched since the next cursor is built from it
+    selected = ["id", *[c for c in columns if c != "id"]]
+    cursor = conn.cursor()
+    cursor.execute(*backend.select_limit(
+        ", ".join(selected), f"FROM orders {where_sql(clauses)} ORDER BY id DESC", params, limit + 1
+    ))
+    rows = cursor.fetchall()
+    names = [column[0] for column in cursor.description]
+    next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    keep = [i for i, name in enumerate(names) if name in columns]
+    data = [{names[i]: row[i] for i in keep} for row in rows[:limit]]
+    return data, next_cursor
+
+def ensure_order_schema(conn):
+    # Idempotent: safe to run at startup and after every shop creation
+    cursor = conn.cursor()
+    cursor.execute(ORDERS_TABLE_SQL)
+    for name, (columns, include) in ORDER_INDEXES.items():
+        cursor.execute(backend.create_index_sql(name, "orders", columns, include))
+    conn.commit()
+
+def ensure_all_order_schemas():
+    # Startup pass over every shop; one broken database must not stop the rest
+    for db_name in [DB_DATABASE_PRACTICE, *list_shop_databases()]:
+        try:
+            with pool.connection(db_name) as conn:
+                ensure_order_schema(conn)
+        except Exception as e:
+            print(f"Order schema maintenance failed for {db_name}: {e}")
+
+def orders_committed(db_name: str, orders: List[Tuple[date, float, str]], single: Optional[dict] = None):
+    """
+    After (day, amount, status) orders commit: drop cached reads that could
+    include them and push the change to /live subscribers. Event loop only.
+    """
+    from app.core.live import live_hub
+    from app.core.report_cache import report_cache
+    from app.core.result_cache import result_cache
+
+    if not orders:
+        return
+    days = [day for day, _, _ in orders]
+    report_cache.invalidate(db_name, min(days), max(days))
+    result_cache.invalidate(db_name)
+    live_hub.publish_orders(db_name, orders, single)
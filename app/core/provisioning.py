@@ -0,0 +1,253 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.core.config import (
+    PROVISION_CONCURRENCY, PROVISION_MAX_ATTEMPTS, PROVISION_RETRY_BACKOFF, PROVISION_JOB_HISTORY
+)
+from app.core.backends import backend
+from app.core.database import create_database, pool, shop_registry
+from app.core.hasher import password_hasher
+from app.core.orders import ORDERS_TABLE_SQL, ensure_order_schema
+
+SHOP_DB_NAME = re.compile(r"^shop_[a-z0-9_]+$")
+
+USERS_TABLE_SQL = backend.create_table_sql("users", """
+    id {identity},
+    username {text}(100) UNIQUE NOT NULL,
+    password_hash {text}(255) NOT NULL
+""")
+
+# Portable insert-if-missing: (username, password_hash, username)
+INSERT_USER_SQL = """
+    INSERT INTO users (username, password_hash)
+    SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM users WHERE username = ?)
+"""
+
+STANDARD_TABLES = {
+    "sales": backend.create_table_sql("sales", """
+        id {identity},
+        item_name {text}(100),
+        quantity INT,
+        price FLOAT,
+        total FLOAT,
+        sale_date DATE DEFAULT {today}
+    """),
+    "income": backend.create_table_sql("income", """
+        id {identity},
+        source {text}(100),
+        amount FLOAT,
+        received_on DATE DEFAULT {today}
+    """),
+    "expense": backend.create_table_sql("expense", """
+        id {identity},
+        category {text}(100),
+        amount FLOAT,
+        spent_on DATE DEFAULT {today},
+        remarks {text}(255)
+    """),
+    "orders": ORDERS_TABLE_SQL,
+    "users": USERS_TABLE_SQL,
+}
+
+class ShopExists(Exception):
+    pass
+
+def shop_db_name(name: str) -> str:
+    db_name = f"shop_{name.lower().replace(' ', '_')}"
+    if not SHOP_DB_NAME.match(db_name):
+        raise ValueError("Shop names may only contain letters, digits, spaces and underscores")
+    return db_name
+
+@dataclass
+class ProvisionStep:
+    name: str
+    status: str = "pending"
+    attempts: int = 0
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+@dataclass
+class ProvisionJob:
+    id: str
+    db_name: str
+    username: str
+    status: str = "queued"
+    steps: List[ProvisionStep] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    password: Optional[str] = field(default=None, repr=False)
+    password_hash: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        done = sum(step.status == "done" for step in self.steps)
+        return {
+            "job_id": self.id,
+            "database": self.db_name,
+            "username": self.username,
+            "status": self.status,
+            "progress": f"{done}/{len(self.steps)}",
+            "steps": [vars(step) for step in self.steps],
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+# Every step is idempotent, so a retry picks up where a failed attempt left
+# off. Only the job's own earlier attempts count: a shop that already
+# existed, or an admin user someone else created, fails the job.
+
+def _step_create_database(job: ProvisionJob):
+    # Fresh list rather than the cached one: the name may have been taken
+    # since submit. A retry may find the database its own attempt created.
+    if job.steps[0].attempts == 1 and job.db_name in shop_registry.refresh():
+        raise ShopExists(f"Shop {job.db_name} already exists")
+    create_database(job.db_name, if_missing=True)
+
+def _step_create_tables(job: ProvisionJob):
+    with pool.connection(job.db_name) as conn:
+        cursor = conn.cursor()
+        for sql in STANDARD_TABLES.values():
+            cursor.execute(sql)
+        conn.commit()
+
+def _step_create_indexes(job: ProvisionJob):
+    with pool.connection(job.db_name) as conn:
+        ensure_order_schema(conn)
+
+def _step_create_admin(job: ProvisionJob):
+    if job.password is not None:
+        job.password_hash = password_hasher.hash_blocking(job.password, job.db_name)
+        job.password = None
+    with pool.connection(job.db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            INSERT_USER_SQL,
+            (job.username, job.password_hash, job.username)
+        )
+        if cursor.rowcount != 1:
+            cursor.execute("SELECT password_hash FROM users WHERE username = ?", (job.username,))
+            row = cursor.fetchone()
+            if row is None or row[0] != job.password_hash:
+                raise ShopExists(f"User {job.username} already exists in {job.db_name}")
+        conn.commit()
+
+def _step_register(job: ProvisionJob):
+    shop_registry.add(job.db_name)
+
+STEPS = [
+    ("create_database", _step_create_database),
+    ("create_tables", _step_create_tables),
+    ("create_indexes", _step_create_indexes),
+    ("create_admin_user", _step_create_admin),
+    ("register_shop", _step_register),
+]
+
+class Provisioner:
+    """
+    Runs shop provisioning jobs on a worker pool, at most `concurrency` at a
+    time. Each step is retried with exponential backoff before the job is
+    marked failed. Finished jobs are kept for status polling up to `history`.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = PROVISION_CONCURRENCY,
+        max_attempts: int = PROVISION_MAX_ATTEMPTS,
+        retry_backoff: float = PROVISION_RETRY_BACKOFF,
+        history: int = PROVISION_JOB_HISTORY,
+    ):
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.history = history
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="provision")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # job id -> ProvisionJob
+        self._active = {}           # db_name -> ProvisionJob
+
+    def submit(self, db_name: str, username: str, password: str) -> ProvisionJob:
+        """Queue provisioning of a new shop; raises ShopExists if it exists or is being provisioned."""
+        # Blocking: may reload the shop registry
+        if shop_registry.contains(db_name):
+            raise ShopExists(f"Shop {db_name} already exists")
+        with self._lock:
+            if db_name in self._active:
+                raise ShopExists(f"Shop {db_name} is already being provisioned")
+            job = ProvisionJob(
+                id=uuid.uuid4().hex, db_name=db_name, username=username, password=password,
+                steps=[ProvisionStep(name) for name, _ in STEPS]
+            )
+            self._jobs[job.id] = job
+            self._active[db_name] = job
+            self._trim_locked()
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ProvisionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _trim_locked(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(self._jobs) - self.history, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: ProvisionJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            for step, (_, fn) in zip(job.steps, STEPS):
+                self._run_step(job, step, fn)
+            job.status = "succeeded"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.password = None
+            job.finished_at = time.time()
+            with self._lock:
+                self._active.pop(job.db_name, None)
+
+    def _run_step(self, job: ProvisionJob, step: ProvisionStep, fn):
+        step.status = "running"
+        start = time.monotonic()
+        while True:
+            step.attempts += 1
+            try:
+                fn(job)
+                step.status = "done"
+                step.error = None
+                step.duration = time.monotonic() - start
+                return
+            except Exception as e:
+                step.error = str(e)
+                # A taken name won't free up on retry
+                if isinstance(e, ShopExists) or step.attempts >= self.max_attempts:
+                    step.status = "failed"
+                    step.duration = time.monotonic() - start
+                    raise
+                time.sleep(self.retry_backoff * 2 ** (step.attempts - 1))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"active": len(self._active), "jobs": counts}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+provisioner = Provisioner()
@@ -0,0 +1,162 @@
+import datetime
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from app.core.config import REPORT_ARCHIVE_DIR, REPORT_BATCH_WORKERS, REPORT_BATCH_TYPES, REPORT_FETCH_SIZE
+
+# Nightly report batch: every shop's daily and month-to-date PDFs, rendered
+# on a process pool so shops render in parallel on all cores instead of
+# sharing one GIL. Each worker process opens its own connection and streams
+# its shop's rows straight into the renderer; only the per-shop result
+# crosses back to the parent.
+#
+# Archive layout, every file written to a temp name and renamed into place:
+#
+#   REPORT_ARCHIVE_DIR/<shop>/<date>/daily.pdf, monthly.pdf, manifest.json
+#   REPORT_ARCHIVE_DIR/batches/<date>.json   (per-shop time and size, totals)
+
+def _write_atomic(path: Path, chunks) -> int:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    size = 0
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return size
+
+def _write_json(path: Path, data):
+    _write_atomic(path, [json.dumps(data, indent=2, default=str).encode()])
+
+def render_shop(db_name: str, day: datetime.date, report_types: Sequence[str], archive_dir: str) -> dict:
+    """Runs in a pool process: render one shop's reports for `day` into its archive directory."""
+    from app.core.database import connect
+    from app.core.orders import order_date_filter, where_sql
+    from app.utils.pdf_report import render_table_pdf, report_range
+
+    started = time.perf_counter()
+    shop_dir = Path(archive_dir) / db_name / day.isoformat()
+    reports = []
+    conn = connect(db_name)
+    try:
+        for report_type in report_types:
+            _, from_date, to_date = report_range(report_type, day)
+            # Month to date as of `day`, not as of when the batch runs
+            clauses, params = order_date_filter(from_date, to_date or day)
+            cursor = conn.cursor()
+            report_started = time.perf_counter()
+            cursor.execute(f"SELECT * FROM orders {where_sql(clauses)} ORDER BY id", params)
+            headers = [d[0] for d in cursor.description]
+            fetch_seconds = 0.0
+            rows = 0
+
+            def chunks():
+                nonlocal fetch_seconds, rows
+                while True:
+                    fetch_started = time.perf_counter()
+                    chunk = cursor.fetchmany(REPORT_FETCH_SIZE)
+                    fetch_seconds += time.perf_counter() - fetch_started
+                    if not chunk:
+                        return
+                    rows += len(chunk)
+                    yield chunk
+
+            title = f"Smart Ledger {report_type.title()} Report - {db_name} - {day}"
+            shop_dir.mkdir(parents=True, exist_ok=True)
+            path = shop_dir / f"{report_type}.pdf"
+            size = _write_atomic(path, render_table_pdf(title, headers, chunks()))
+            seconds = time.perf_counter() - report_started
+            reports.append({
+                "type": report_type,
+                "file": path.name,
+                "from_date": from_date,
+                "to_date": to_date or day,
+                "rows": rows,
+                "bytes": size,
+                "seconds": round(seconds, 4),
+                "fetch_seconds": round(fetch_seconds, 4),
+                "render_seconds": round(seconds - fetch_seconds, 4),
+            })
+    finally:
+        conn.close()
+
+    result = {
+        "shop": db_name,
+        "date": day,
+        "reports": reports,
+        "bytes": sum(r["bytes"] for r in reports),
+        "seconds": round(time.perf_counter() - started, 4),
+        "pid": os.getpid(),
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    # Last, so a manifest always describes complete files
+    _write_json(shop_dir / "manifest.json", result)
+    return result
+
+def run_report_batch(
+    databases: Optional[List[str]] = None,
+    day: Optional[datetime.date] = None,
+    workers: int = REPORT_BATCH_WORKERS,
+    report_types: Sequence[str] = REPORT_BATCH_TYPES,
+    archive_dir: Path = REPORT_ARCHIVE_DIR,
+) -> dict:
+    """
+    Render reports for every shop (default: the practice DB and all shops)
+    for `day` (default: yesterday, the last complete day when this runs at
+    night). One shop failing doesn't stop the rest.
+    """
+    from app.core.jobs import all_databases
+
+    databases = all_databases() if databases is None else databases
+    day = day or datetime.date.today() - datetime.timedelta(days=1)
+    archive_dir = Path(archive_dir)
+    started = time.perf_counter()
+    shops, errors = [], {}
+
+    # spawn, not fork: the server process has live threads and connections
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(databases) or 1)), mp_context=context) as executor:
+        futures = {
+            executor.submit(render_shop, db_name, day, list(report_types), str(archive_dir)): db_name
+            for db_name in databases
+        }
+        for future in as_completed(futures):
+            try:
+                shops.append(future.result())
+            except Exception as e:
+                errors[futures[future]] = str(e)
+
+    shops.sort(key=lambda s: s["seconds"], reverse=True)
+    summary = {
+        "date": day,
+        "workers": workers,
+        "shops_ok": len(shops),
+        "shops_failed": len(errors),
+        "errors": errors,
+        "seconds": round(time.perf_counter() - started, 4),
+        "bytes": sum(s["bytes"] for s in shops),
+        "shop_seconds": round(sum(s["seconds"] for s in shops), 4),
+        "shops": [
+            {"shop": s["shop"], "seconds": s["seconds"], "bytes": s["bytes"], "rows": sum(r["rows"] for r in s["reports"])}
+            for s in shops
+        ],
+    }
+    batch_dir = archive_dir / "batches"
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    _write_json(batch_dir / f"{day.isoformat()}.json", summary)
+    slowest = ", ".join(f"{s['shop']} {s['seconds']:.2f}s" for s in shops[:3])
+    print(
+        f"[{datetime.datetime.now()}] Report batch for {day}: {len(shops)} shops ok, {len(errors)} failed, "
+        f"{summary['bytes'] / 1e6:.1f} MB in {summary['seconds']:.1f}s; slowest: {slowest or '-'}"
+    )
+    return summary
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.core.config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES, REPORT_CACHE_MAX_AGE
+
+@dataclass
+class CacheEntry:
+    path: Path
+    db_name: str
+    from_date: Optional[date]
+    to_date: Optional[date]
+    size: int
+    last_access: float
+
+    def overlaps(self, from_date: Optional[date], to_date: Optional[date]) -> bool:
+        # None on either side means unbounded
+        return (
+            (self.from_date is None or to_date is None or self.from_date <= to_date)
+            and (self.to_date is None or from_date is None or from_date <= self.to_date)
+        )
+
+def _parse_date(value: str) -> Optional[date]:
+    return None if value == "-" else date.fromisoformat(value)
+
+class ReportCache:
+    """
+    Disk cache for rendered reports.
+
+    Entries are named after a hash of (db_name, report type, date range,
+    order fingerprint), so a changed fingerprint simply misses and the
+    stale file is left for invalidation or the size/age budget to remove.
+    Files are written to a temp name and renamed into place, so concurrent
+    requests never see a half-written report.
+    """
+
+    def __init__(self, root: Path = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_BYTES, max_age: float = REPORT_CACHE_MAX_AGE):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = {}  # path -> CacheEntry
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _load_locked(self):
+        # Pick up files left by a previous process: <db>/<type>_<from>_<to>_<hash>.<ext>
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*/*.*"):
+            if path.name.startswith("."):
+                continue  # unfinished temp file
+            try:
+                _, from_str, to_str, _ = path.stem.rsplit("_", 3)
+                stat = path.stat()
+                self._entries[path] = CacheEntry(
+                    path, path.parent.name, _parse_date(from_str), _parse_date(to_str),
+                    stat.st_size, stat.st_mtime
+                )
+            except (ValueError, OSError):
+                continue
+
+    def path_for(self, db_name: str, report_type: str, from_date: Optional[date], to_date: Optional[date], fingerprint, ext: str = "pdf") -> Path:
+        digest = hashlib.sha256(
+            repr((db_name, report_type, from_date, to_date, fingerprint)).encode()
+        ).hexdigest()[:32]
+        return self.root / db_name / f"{report_type}_{from_date or '-'}_{to_date or '-'}_{digest}.{ext}"
+
+    def get(self, path: Path) -> Optional[Path]:
+        with self._lock:
+            self._load_locked()
+            entry = self._entries.get(path)
+            if entry and path.exists():
+                entry.last_access = time.time()
+                self.hits += 1
+                return path
+            self._entries.pop(path, None)
+            self.misses += 1
+            return None
+
+    def store(self, path: Path, db_name: str, from_date: Optional[date], to_date: Optional[date], chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Pass chunks through while writing them to the cache; commit only if the stream completes."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            size = 0
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            os.replace(tmp, path)
+            with self._lock:
+                self._entries[path] = CacheEntry(path, db_name, from_date, to_date, size, time.time())
+            self.enforce_budget()
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _remove_locked(self, entry: CacheEntry):
+        self._entries.pop(entry.path, None)
+        try:
+            entry.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, db_name: str, from_date: Optional[date] = None, to_date: Optional[date] = None) -> int:
+        """Drop the shop's entries whose range overlaps [from_date, to_date] (unbounded if None)."""
+        with self._lock:
+            self._load_locked()
+            stale = [e for e in self._entries.values() if e.db_name == db_name and e.overlaps(from_date, to_date)]
+            for entry in stale:
+                self._remove_locked(entry)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def enforce_budget(self):
+        with self._lock:
+            self._load_locked()
+            now = time.time()
+            by_age = sorted(self._entries.values(), key=lambda e: e.last_access)
+            total = sum(e.size for e in by_age)
+            for entry in by_age:
+                if now - entry.last_access <= self.max_age and total <= self.max_bytes:
+                    break
+                self._remove_locked(entry)
+                total -= entry.size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e.size for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+report_cache = ReportCache()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from app.core.config import RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES
+
+def _size(value) -> int:
+    # Serialized size is what the response costs anyway and close enough for a budget
+    return len(json.dumps(value, default=str))
+
+class ResultCache:
+    """
+    Read-through cache for hot read endpoints, keyed by (db_name, endpoint,
+    normalized params), with single-flight loading: concurrent identical
+    requests share one in-flight query instead of each running it.
+
+    Entries live `ttl` seconds (0 still coalesces, but caches nothing) and
+    are evicted LRU beyond `max_entries` / `max_bytes`. invalidate(db_name)
+    drops a shop's entries and bumps its generation, so a load that started
+    before the write is handed to its waiters but not stored. Cached values
+    are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any, int]]" = OrderedDict()  # key -> (expires, value, size)
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(db_name: str, endpoint: str, params: dict) -> Tuple:
+        return (db_name, endpoint, tuple(sorted((k, str(v)) for k, v in params.items() if v is not None)))
+
+    def _drop_locked(self, key: Tuple):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _get_locked(self, key: Tuple, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._drop_locked(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Tuple, value, generation: int):
+        size = _size(value)
+        with self._lock:
+            if self._generations[key[0]] != generation or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop_locked(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop_locked(next(iter(self._entries)))
+                self.evictions += 1
+
+    async def get_or_load(self, db_name: str, endpoint: str, params: dict, loader: Callable[[], Awaitable]):
+        key = self.key(db_name, endpoint, params)
+        with self._lock:
+            entry = self._get_locked(key, time.monotonic())
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            generation = self._generations[db_name]
+
+        # Only ever touched from the event loop. Requests only join a load
+        # of the same generation, so nobody reads past their own write.
+        flight = (key, generation)
+        task = self._inflight.get(flight)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A task of its own, so the first caller disconnecting doesn't
+            # cancel the load everyone else is waiting on
+            task = asyncio.ensure_future(self._load(key, loader, generation))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[flight] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Tuple, loader: Callable[[], Awaitable], generation: int):
+        self.loads += 1
+        try:
+            value = await loader()
+        except BaseException:
+            self.load_errors += 1
+            raise
+        finally:
+            self._inflight.pop((key, generation), None)
+        if self.ttl > 0:
+            self._store(key, value, generation)
+        return value
+
+    def invalidate(self, db_name: str):
+        with self._lock:
+            self._generations[db_name] += 1
+            for key in [k for k in self._entries if k[0] == db_name]:
+                self._drop_locked(key)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                # Requests answered without a query of their own
+                "saved_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "in_flight": len(self._inflight),
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+result_cache = ResultCache()
@@ -0,0 +1,222 @@
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+
+from app.core.backends import backend
+from app.core.config import ROLLUP_RECONCILE_DAYS
+from app.core.database import pool
+
+# Per-shop, per-day order aggregates so /summary never scans orders.
+# Writers apply deltas in the same transaction as the insert; the
+# reconciler recomputes recent days from orders to repair any drift.
+
+STATUSES = ("pending", "completed", "cancelled")
+
+ROLLUP_TABLE_SQL = """
+    CREATE TABLE order_daily_rollups (
+        order_day DATE PRIMARY KEY,
+        order_count INT NOT NULL,
+        total_amount FLOAT NOT NULL,
+        pending_count INT NOT NULL,
+        completed_count INT NOT NULL,
+        cancelled_count INT NOT NULL
+    )
+"""
+
+UPSERT_SQL = """
+    INSERT INTO order_daily_rollups VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (order_day) DO UPDATE SET
+        order_count = order_daily_rollups.order_count + excluded.order_count,
+        total_amount = order_daily_rollups.total_amount + excluded.total_amount,
+        pending_count = order_daily_rollups.pending_count + excluded.pending_count,
+        completed_count = order_daily_rollups.completed_count + excluded.completed_count,
+        cancelled_count = order_daily_rollups.cancelled_count + excluded.cancelled_count
+"""
+
+_ready = set()
+_ready_lock = threading.Lock()
+_db_locks = defaultdict(threading.Lock)
+
+def rollups_ready(db_name: str) -> bool:
+    return db_name in _ready
+
+def known_databases():
+    with _ready_lock:
+        return list(_ready)
+
+def _create_rollups(conn):
+    cursor = conn.cursor()
+    if not backend.table_exists(cursor, "order_daily_rollups"):
+        cursor.execute(ROLLUP_TABLE_SQL)
+        _recompute(cursor)
+        conn.commit()
+
+def ensure_rollups(db_name: str, conn=None):
+    # Create the rollup table on first use and backfill it from history.
+    # Routes pass their own connection so this never waits on the pool.
+    if db_name in _ready:
+        return
+    with _ready_lock:
+        db_lock = _db_locks[db_name]
+    with db_lock:
+        if db_name in _ready:
+            return
+        if conn is not None:
+            _create_rollups(conn)
+        else:
+            with pool.connection(db_name) as own_conn:
+                _create_rollups(own_conn)
+        with _ready_lock:
+            _ready.add(db_name)
+
+def apply_deltas(cursor, orders: Iterable[Tuple[date, float, str]]):
+    """Fold (day, amount, status) tuples into the rollups; caller commits."""
+    deltas = defaultdict(lambda: [0, 0.0, 0, 0, 0])
+    for day, amount, status in orders:
+        delta = deltas[day]
+        delta[0] += 1
+        delta[1] += amount
+        delta[2 + STATUSES.index(status)] += 1
+
+    if backend.on_conflict:
+        cursor.executemany(UPSERT_SQL, [(day, *delta) for day, delta in deltas.items()])
+        return
+
+    update_sql = """
+        UPDATE order_daily_rollups SET
+            order_count = order_count + ?,
+            total_amount = total_amount + ?,
+            pending_count = pending_count + ?,
+            completed_count = completed_count + ?,
+            cancelled_count = cancelled_count + ?
+        WHERE order_day = ?
+    """
+    for day, delta in deltas.items():
+        cursor.execute(update_sql, (*delta, day))
+        if cursor.rowcount:
+            continue
+        try:
+            cursor.execute(
+                "INSERT INTO order_daily_rollups VALUES (?, ?, ?, ?, ?, ?)",
+                (day, *delta)
+            )
+        except Exception:
+            # Another writer created the day first
+            cursor.execute(update_sql, (*delta, day))
+
+def _recompute(cursor, from_date: Optional[date] = None):
+    # Delete and re-insert in one transaction with orders locked, so an
+    # order committed mid-rebuild can't be counted twice or dropped. Writers
+    # lock orders before the rollups too, so the two can't deadlock.
+    backend.lock_table(cursor, "orders")
+    where = "WHERE order_date >= ?" if from_date else ""
+    day = backend.date_of("order_date")
+    params = (from_date,) if from_date else ()
+    cursor.execute(
+        f"DELETE FROM order_daily_rollups {'WHERE order_day >= ?' if from_date else ''}", params
+    )
+    cursor.execute(f"""
+        INSERT INTO order_daily_rollups
+        SELECT
+            {day},
+            COUNT(*),
+            SUM(amount),
+            SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status = 'cancelled' THEN 1 ELSE 0 END)
+        FROM orders
+        {where}
+        GROUP BY {day}
+    """, params)
+
+def reconcile(db_name: str, from_date: Optional[date] = None):
+    """Rebuild rollups from orders for days >= from_date (all days if None)."""
+    ensure_rollups(db_name)
+    with pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        _recompute(cursor, from_date)
+        conn.commit()
+
+def reconcile_recent():
+    from_date = date.today() - timedelta(days=ROLLUP_RECONCILE_DAYS)
+    for db_name in known_databases():
+        try:
+            reconcile(db_name, from_date)
+        except Exception as e:
+            print(f"Rollup reconcile failed for {db_name}: {e}")
+
+def fetch_summary(conn, from_date: date, to_date: Optional[date] = None):
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT
+            SUM(order_count),
+            SUM(total_amount),
+            SUM(pending_count),
+            SUM(completed_count),
+            SUM(cancelled_count)
+        FROM order_daily_rollups
+        WHERE order_day >= ? {'AND order_day <= ?' if to_date else ''}
+    """, (from_date, to_date) if to_date else (from_date,))
+    total_orders, total_income, pending, completed, cancelled = cursor.fetchone()
+    # PostgreSQL sums integers as NUMERIC
+    return {
+        "total_orders": int(total_orders or 0),
+        "total_income": float(total_income or 0),
+        "completed_orders": int(completed or 0),
+        "pending_orders": int(pending or 0),
+        "cancelled_orders": int(cancelled or 0),
+    }
+
+def range_fingerprint(conn, from_date: Optional[date], to_date: Optional[date]) -> tuple:
+    """
+    Changes whenever orders in the inclusive day range are added, removed or
+    change status or amount: reads at most one rollup row per day, plus the
+    newest order id off the primary key, instead of scanning orders.
+    """
+    clauses, params = [], []
+    if from_date:
+        clauses.append("order_day >= ?")
+        params.append(from_date)
+    if to_date:
+        clauses.append("order_day <= ?")
+        params.append(to_date)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT
+            SUM(order_count),
+            SUM(total_amount),
+            SUM(pending_count),
+            SUM(completed_count),
+            SUM(cancelled_count)
+        FROM order_daily_rollups
+        {'WHERE ' + ' AND '.join(clauses) if clauses else ''}
+    """, params)
+    sums = tuple(cursor.fetchone())
+    cursor.execute("SELECT MAX(id) FROM orders")
+    return sums + (cursor.fetchone()[0],)
+
+def summary_dates(range_name: str, from_date: Optional[date], to_date: Optional[date], today: date):
+    """Resolve a /summary range to (from_date, to_date); to_date None means up to today."""
+    if range_name == "custom":
+        if not from_date or not to_date or from_date > to_date:
+            raise ValueError("Custom range needs from_date <= to_date")
+        return from_date, to_date
+    if range_name == "weekly":
+        return today - timedelta(days=7), None
+    if range_name == "monthly":
+        return today.replace(day=1), None
+    return today.replace(month=1, day=1), None
+
+def merge_summaries(summaries: Iterable[dict]) -> dict:
+    merged = {
+        "total_orders": 0,
+        "total_income": 0.0,
+        "completed_orders": 0,
+        "pending_orders": 0,
+        "cancelled_orders": 0,
+    }
+    for summary in summaries:
+        for key in merged:
+            merged[key] += summary[key]
+    return merged
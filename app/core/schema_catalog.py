@@ -0,0 +1,287 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Per-shop cache of table -> columns, so generic row access never has to
+# hit INFORMATION_SCHEMA on the request path. SQL Server only (see
+# Backend.dynamic_tables); the routes answer 501 on other backends.
+
+# Core tables keep their own endpoints (and users holds password hashes)
+PROTECTED_TABLES = {"users", "orders", "order_daily_rollups", "write_behind_checkpoints"}
+
+COLUMNS_SQL = """
+    SELECT
+        c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE,
+        c.CHARACTER_MAXIMUM_LENGTH, c.COLUMN_DEFAULT,
+        COLUMNPROPERTY(OBJECT_ID(c.TABLE_SCHEMA + '.' + c.TABLE_NAME), c.COLUMN_NAME, 'IsIdentity')
+    FROM INFORMATION_SCHEMA.COLUMNS c
+    JOIN INFORMATION_SCHEMA.TABLES t
+        ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+    WHERE t.TABLE_TYPE = 'BASE TABLE' AND c.TABLE_SCHEMA = 'dbo' {table_filter}
+    ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+"""
+
+def _to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.lower() in ("true", "false", "1", "0"):
+        return value.lower() in ("true", "1")
+    raise ValueError("expected a boolean")
+
+def _to_int(value) -> int:
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError("expected an integer")
+    return int(value)
+
+def _to_float(value) -> float:
+    if isinstance(value, bool):
+        raise ValueError("expected a number")
+    return float(value)
+
+def _to_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def _to_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+CONVERTERS = {
+    "int": _to_int, "bigint": _to_int, "smallint": _to_int, "tinyint": _to_int,
+    "float": _to_float, "real": _to_float, "decimal": _to_float, "numeric": _to_float, "money": _to_float,
+    "bit": _to_bool,
+    "date": _to_date,
+    "datetime": _to_datetime, "datetime2": _to_datetime, "smalldatetime": _to_datetime,
+}
+
+def quote_name(name: str) -> str:
+    return "[" + name.replace("]", "]]") + "]"
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    name: str
+    data_type: str
+    nullable: bool
+    max_length: Optional[int] = None
+    has_default: bool = False
+    identity: bool = False
+
+    @property
+    def required(self) -> bool:
+        return not (self.nullable or self.has_default or self.identity)
+
+    def convert(self, value):
+        if value is None:
+            if not self.nullable:
+                raise ValueError("may not be null")
+            return None
+        converter = CONVERTERS.get(self.data_type)
+        if converter:
+            return converter(value)
+        text = str(value)
+        # -1 is (N)VARCHAR(MAX)
+        if self.max_length and self.max_length > 0 and len(text) > self.max_length:
+            raise ValueError(f"longer than {self.max_length} characters")
+        return text
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: Tuple[ColumnInfo, ...]
+    _by_name: Dict[str, ColumnInfo] = field(init=False, repr=False)
+    _statements: Dict[tuple, str] = field(init=False, repr=False, default_factory=dict)
+
+    def __post_init__(self):
+        self._by_name = {c.name.lower(): c for c in self.columns}
+
+    @property
+    def identity(self) -> Optional[ColumnInfo]:
+        return next((c for c in self.columns if c.identity), None)
+
+    def column(self, name: str) -> Optional[ColumnInfo]:
+        return self._by_name.get(name.lower())
+
+    def coerce_row(self, row: dict) -> Tuple[Tuple[str, ...], tuple]:
+        """Validate and convert one row; returns (column names, values)."""
+        names, values = [], []
+        for key, value in row.items():
+            col = self.column(key)
+            if col is None:
+                raise ValueError(f"unknown column '{key}'")
+            if col.identity:
+                raise ValueError(f"'{col.name}' is generated by the database")
+            try:
+                values.append(col.convert(value))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"'{col.name}': {e}")
+            names.append(col.name)
+        given = {n.lower() for n in names}
+        missing = [c.name for c in self.columns if c.required and c.name.lower() not in given]
+        if missing:
+            raise ValueError(f"missing required column(s): {', '.join(missing)}")
+        if not names:
+            raise ValueError("row has no columns")
+        return tuple(names), tuple(values)
+
+    def _statement(self, key: tuple, build) -> str:
+        # dict reads/writes are atomic; a race just builds the same string twice
+        sql = self._statements.get(key)
+        if sql is None:
+            sql = self._statements[key] = build()
+        return sql
+
+    def insert_sql(self, names: Tuple[str, ...]) -> str:
+        return self._statement(("insert", names), lambda: (
+            f"INSERT INTO {quote_name(self.name)} ({', '.join(map(quote_name, names))}) "
+            f"VALUES ({', '.join('?' * len(names))})"
+        ))
+
+    def select_sql(self, names: Tuple[str, ...], keyset: bool, after: bool) -> str:
+        """
+        With an identity column, pages are keyed on it (newest first);
+        otherwise they fall back to OFFSET over the first column.
+        """
+        def build():
+            cols = ", ".join(map(quote_name, names))
+            table = quote_name(self.name)
+            if keyset:
+                key = quote_name(self.identity.name)
+                where = f"WHERE {key} < ? " if after else ""
+                return f"SELECT TOP (?) {cols} FROM {table} {where}ORDER BY {key} DESC"
+            return (
+                f"SELECT {cols} FROM {table} ORDER BY {quote_name(self.columns[0].name)} "
+                f"OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+            )
+        return self._statement(("select", names, keyset, after), build)
+
+def load_columns(conn, table_name: Optional[str] = None) -> Dict[str, TableSchema]:
+    cursor = conn.cursor()
+    if table_name:
+        cursor.execute(COLUMNS_SQL.format(table_filter="AND c.TABLE_NAME = ?"), (table_name,))
+    else:
+        cursor.execute(COLUMNS_SQL.format(table_filter=""))
+    columns: Dict[str, List[ColumnInfo]] = {}
+    for table, name, data_type, nullable, max_length, default, identity in cursor.fetchall():
+        columns.setdefault(table, []).append(ColumnInfo(
+            name, data_type.lower(), nullable == "YES", max_length, default is not None, bool(identity)
+        ))
+    return {table: TableSchema(table, tuple(cols)) for table, cols in columns.items()}
+
+class SchemaCatalog:
+    """
+    Table definitions per shop database, loaded with one INFORMATION_SCHEMA
+    query on first use. A lookup for a table the cache doesn't know loads
+    just that table (it may have been created by another worker); DDL run
+    through the API calls invalidate() so changed tables are re-read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables: Dict[str, Dict[str, TableSchema]] = {}  # db -> table (lowercase) -> schema
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def get(self, db_name: str, conn, table_name: str) -> Optional[TableSchema]:
+        key = table_name.lower()
+        if key in PROTECTED_TABLES:
+            return None
+        with self._lock:
+            tables = self._tables.get(db_name)
+            schema = tables.get(key) if tables is not None else None
+            if schema is not None:
+                self.hits += 1
+                return schema
+            self.misses += 1
+            self.loads += 1
+        if tables is None:
+            loaded = load_columns(conn)
+        else:
+            loaded = load_columns(conn, table_name)
+        loaded = {name.lower(): schema for name, schema in loaded.items()}
+        with self._lock:
+            self._tables.setdefault(db_name, {}).update(loaded)
+        return loaded.get(key)
+
+    def tables(self, db_name: str, conn) -> List[str]:
+        with self._lock:
+            tables = self._tables.get(db_name)
+        if tables is None:
+            loaded = {name.lower(): schema for name, schema in load_columns(conn).items()}
+            with self._lock:
+                self.loads += 1
+                tables = self._tables.setdefault(db_name, {})
+                tables.update(loaded)
+        return sorted(s.name for k, s in tables.items() if k not in PROTECTED_TABLES)
+
+    def invalidate(self, db_name: str, table_name: Optional[str] = None):
+        with self._lock:
+            if table_name is None:
+                self._tables.pop(db_name, None)
+            elif db_name in self._tables:
+                self._tables[db_name].pop(table_name.lower(), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "databases": len(self._tables),
+                "tables": sum(len(t) for t in self._tables.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "loads": self.loads,
+            }
+
+schema_catalog = SchemaCatalog()
+
+def insert_rows(conn, schema: TableSchema, rows: Sequence[dict]) -> int:
+    """Validate and insert rows in one transaction, one executemany per distinct column set."""
+    shapes: Dict[Tuple[str, ...], list] = {}
+    for i, row in enumerate(rows):
+        try:
+            names, values = schema.coerce_row(row)
+        except ValueError as e:
+            raise ValueError(f"row {i}: {e}")
+        shapes.setdefault(names, []).append(values)
+    cursor = conn.cursor()
+    if hasattr(cursor, "fast_executemany"):
+        cursor.fast_executemany = True
+    try:
+        for names, values in shapes.items():
+            cursor.executemany(schema.insert_sql(names), values)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+def list_rows(conn, schema: TableSchema, columns: Sequence[str], limit: int, cursor_value: Optional[int]):
+    """One page of rows; returns (rows, next cursor value or None)."""
+    names = tuple(schema.column(c).name for c in columns)
+    cursor = conn.cursor()
+    identity = schema.identity
+    if identity is not None:
+        # Fetch the key alongside so the next cursor can be computed
+        select_names = names if identity.name in names else names + (identity.name,)
+        sql = schema.select_sql(select_names, keyset=True, after=cursor_value is not None)
+        params = (limit + 1,) + ((cursor_value,) if cursor_value is not None else ())
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        key_index = select_names.index(identity.name)
+        next_value = rows[-1][key_index] if has_more else None
+        data = [dict(zip(select_names, row)) for row in rows]
+        if identity.name not in names:
+            for row in data:
+                row.pop(identity.name)
+        return data, next_value
+
+    offset = cursor_value or 0
+    cursor.execute(schema.select_sql(names, keyset=False, after=False), (offset, limit + 1))
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    data = [dict(zip(names, row)) for row in rows[:limit]]
+    return data, offset + limit if has_more else None
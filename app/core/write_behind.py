@@ -0,0 +1,483 @@
+import asyncio
+import json
+import os
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.backends import backend
+from app.core.config import (
+    WRITE_BEHIND_ENABLED, WRITE_BEHIND_DIR, WRITE_BEHIND_BATCH, WRITE_BEHIND_INTERVAL,
+    WRITE_BEHIND_MAX_PENDING, WRITE_BEHIND_SEGMENT_BYTES, EXECUTOR_RETRY_AFTER
+)
+from app.core.database import pool
+from app.core.executor import run_query
+from app.core.metrics import registry, LATENCY_BUCKETS
+from app.core.orders import orders_committed
+from app.core.rollups import apply_deltas, ensure_rollups, rollups_ready
+
+try:
+    import fcntl
+except ImportError:  # Windows: no journal locking, run a single worker
+    fcntl = None
+
+# Optional write-behind mode for /add-order. Orders are appended to a
+# per-shop, per-process journal file and acknowledged once fsync'd (appends
+# arriving during an fsync share the next one). A flusher commits them to
+# the shop database in multi-row transactions, WRITE_BEHIND_BATCH rows or
+# WRITE_BEHIND_INTERVAL seconds at a time.
+#
+# Every journal record has a sequence number, and each batch advances the
+# journal's row in write_behind_checkpoints in the same transaction as its
+# inserts. Replaying a journal after a crash skips everything at or below
+# the checkpoint, so a record is applied exactly once.
+#
+# A batch the database rejects is retried row by row. Rows it still refuses
+# (already acknowledged, so they can't be bounced back to the client) go to
+# DIR/dead_letter/<shop>.jsonl with the error, and the checkpoint moves past
+# them so one bad record can't hold up the shop's journal.
+
+CHECKPOINT_COLUMNS = """
+    journal {text}(200) PRIMARY KEY,
+    last_seq BIGINT NOT NULL
+"""
+
+CHECKPOINT_TABLE_SQL = backend.create_table_sql("write_behind_checkpoints", CHECKPOINT_COLUMNS)
+
+INSERT_SQL = "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)"
+
+flush_batch_rows = registry.histogram(
+    "smart_ledger_write_behind_batch_rows", "Orders committed per write-behind batch", ("shop",),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+flush_lag_seconds = registry.histogram(
+    "smart_ledger_write_behind_flush_lag_seconds", "Time from acknowledging an order to committing it", ("shop",),
+    buckets=LATENCY_BUCKETS
+)
+fsync_seconds = registry.histogram("smart_ledger_write_behind_fsync_seconds", "Journal append + fsync time")
+dead_letters = registry.counter(
+    "smart_ledger_write_behind_dead_letters_total", "Journaled orders the database rejected", ("shop",)
+)
+
+_checkpoint_tables = set()
+
+def _encode(record: dict) -> bytes:
+    payload = json.dumps(record, separators=(",", ":")).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+def _decode(line: bytes) -> Optional[dict]:
+    # None for a torn or corrupt line
+    crc, _, payload = line.rstrip(b"\n").partition(b" ")
+    try:
+        if int(crc, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+def _ensure_checkpoints(db_name: str, conn):
+    # Committed on its own so a failed batch can't roll the table back
+    if db_name in _checkpoint_tables:
+        return
+    conn.cursor().execute(CHECKPOINT_TABLE_SQL)
+    conn.commit()
+    _checkpoint_tables.add(db_name)
+
+def _read_checkpoint(db_name: str, journal: str) -> int:
+    with pool.connection(db_name) as conn:
+        _ensure_checkpoints(db_name, conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT last_seq FROM write_behind_checkpoints WHERE journal = ?", (journal,))
+        row = cursor.fetchone()
+        conn.commit()
+        return int(row[0]) if row else 0
+
+def _commit_batch(db_name: str, journal: str, records: List[dict]):
+    """Insert a batch, fold it into the rollups and advance the checkpoint, all in one transaction."""
+    with pool.connection(db_name) as conn:
+        if not rollups_ready(db_name):
+            ensure_rollups(db_name, conn)
+        _ensure_checkpoints(db_name, conn)
+        cursor = conn.cursor()
+        if hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = True
+        try:
+            rows = [(r["user_id"], r["amount"], r["status"], datetime.fromisoformat(r["order_date"])) for r in records]
+            cursor.executemany(INSERT_SQL, rows)
+            apply_deltas(cursor, [(order_date.date(), amount, status) for _, amount, status, order_date in rows])
+            _set_checkpoint(cursor, journal, records[-1]["seq"])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return rows
+
+def _set_checkpoint(cursor, journal: str, last_seq: int):
+    cursor.execute("UPDATE write_behind_checkpoints SET last_seq = ? WHERE journal = ?", (last_seq, journal))
+    if not cursor.rowcount:
+        cursor.execute("INSERT INTO write_behind_checkpoints (journal, last_seq) VALUES (?, ?)", (journal, last_seq))
+
+def _commit_rows(db_name: str, journal: str, records: List[dict], dead_letter: Path):
+    """
+    Fallback for a rejected batch: insert row by row, dead-letter the rows
+    the database refuses and advance the checkpoint past all of them.
+    Returns (inserted rows, rejected count).
+    """
+    with pool.connection(db_name) as conn:
+        _ensure_checkpoints(db_name, conn)
+        cursor = conn.cursor()
+        rows, rejected = [], []
+        try:
+            for record in records:
+                backend.savepoint(cursor)
+                try:
+                    row = (record["user_id"], record["amount"], record["status"], datetime.fromisoformat(record["order_date"]))
+                    cursor.execute(INSERT_SQL, row)
+                    backend.release_savepoint(cursor)
+                    rows.append(row)
+                except Exception as e:
+                    backend.rollback_to_savepoint(cursor)
+                    rejected.append({**record, "journal": journal, "error": str(e)})
+            apply_deltas(cursor, [(order_date.date(), amount, status) for _, amount, status, order_date in rows])
+            _set_checkpoint(cursor, journal, records[-1]["seq"])
+            if rejected:
+                # Durable before the checkpoint skips them; a crash in between
+                # dead-letters them twice (same journal and seq), never zero times
+                dead_letter.parent.mkdir(parents=True, exist_ok=True)
+                with open(dead_letter, "ab") as f:
+                    _append(f, b"".join(json.dumps(r, default=str).encode() + b"\n" for r in rejected))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return rows, len(rejected)
+
+def _append(file, data: bytes):
+    start = time.perf_counter()
+    size = os.fstat(file.fileno()).st_size
+    try:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    except BaseException:
+        # The callers are told it failed, so it must not be replayed either
+        file.truncate(size)
+        raise
+    fsync_seconds.observe(time.perf_counter() - start)
+
+class _Journal:
+    def __init__(self, db_name: str, name: str, path: Path, owned: bool):
+        self.db_name = db_name
+        self.name = name
+        self.path = path
+        # Journals of dead processes are replayed and then deleted
+        self.owned = owned
+        self.file = None
+        self.next_seq = 1
+        self.flushed_seq = 0
+        self.pending: List[tuple] = []  # (line, record, future) waiting for the next fsync
+        self.syncing = False
+        self.unflushed: Deque[dict] = deque()  # durable, not yet in the database
+        self.verify = False
+        self.flush_errors = 0
+        self.dead_letters = 0
+        self.last_error = None
+
+    def lock(self) -> bool:
+        """Open and lock the file; False if another process holds it."""
+        file = open(self.path, "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                return False
+        self.file = file
+        return True
+
+    def load(self, checkpoint: int):
+        """Queue the records past `checkpoint`; only call with the lock held."""
+        file = self.file
+        file.seek(0)
+        last_seq, offset = checkpoint, 0
+        for line in file:
+            record = _decode(line)
+            if record is None:
+                break
+            offset += len(line)
+            last_seq = max(last_seq, record["seq"])
+            if record["seq"] > checkpoint:
+                self.unflushed.append(record)
+        # Drop a torn tail so new appends don't follow garbage
+        file.truncate(offset)
+        self.flushed_seq = checkpoint
+        self.next_seq = last_seq + 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def idle(self) -> bool:
+        return not self.pending and not self.syncing and not self.unflushed
+
+class WriteBehind:
+    def __init__(self, enabled: bool = WRITE_BEHIND_ENABLED, directory: Path = WRITE_BEHIND_DIR):
+        self.enabled = enabled
+        self.directory = directory
+        self._journals: Dict[str, _Journal] = {}  # journal name -> journal
+        self._owned: Dict[str, _Journal] = {}  # db_name -> this process's journal
+        self._open_lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._pending_total = 0
+        self.appended = 0
+        self.fsyncs = 0
+        self.flushed = 0
+        self.batches = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+
+    def _journal_name(self, db_name: str) -> str:
+        return f"{db_name}.{os.getpid()}"
+
+    async def _open(self, db_name: str, name: str, owned: bool) -> Optional[_Journal]:
+        journal = _Journal(db_name, name, self.directory / f"{name}.journal", owned)
+        if not await run_query(journal.lock):
+            return None
+        # Read under the lock: the previous holder may have flushed up to
+        # the moment it let go
+        try:
+            checkpoint = await run_query(_read_checkpoint, db_name, name)
+            await run_query(journal.load, checkpoint)
+        except BaseException:
+            journal.close()
+            raise
+        self._journals[name] = journal
+        self._pending_total += len(journal.unflushed)
+        self.replayed += len(journal.unflushed)
+        return journal
+
+    async def _owned_journal(self, db_name: str) -> _Journal:
+        journal = self._owned.get(db_name)
+        if journal is not None:
+            return journal
+        async with self._open_lock:
+            if db_name not in self._owned:
+                journal = await self._open(db_name, self._journal_name(db_name), owned=True)
+                if journal is None:
+                    raise RuntimeError(f"Write-behind journal for {db_name} is locked by another process")
+                self._owned[db_name] = journal
+            return self._owned[db_name]
+
+    async def start(self):
+        """Replay journals left by earlier or crashed processes and start the flusher."""
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._open_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        for path in sorted(self.directory.glob("*.journal")):
+            name = path.stem
+            db_name = name.rsplit(".", 1)[0]
+            try:
+                journal = await self._open(db_name, name, owned=name == self._journal_name(db_name))
+            except Exception as e:
+                print(f"Write-behind recovery failed for {name}: {e}")
+                continue
+            if journal is not None and journal.owned:
+                self._owned[db_name] = journal
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # Not cancelled: a batch cut off mid-commit could be applied twice.
+        # The flusher makes a last pass; anything left is replayed on start.
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        for journal in self._journals.values():
+            journal.close()
+
+    async def submit(self, db_name: str, order) -> int:
+        """Journal one order and return its sequence number once it is durable."""
+        if self._pending_total >= WRITE_BEHIND_MAX_PENDING:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503, detail="Write-behind backlog is full",
+                headers={"Retry-After": str(EXECUTOR_RETRY_AFTER)}
+            )
+        journal = await self._owned_journal(db_name)
+        record = {
+            "seq": journal.next_seq,
+            "user_id": order.user_id,
+            "amount": order.amount,
+            "status": order.status,
+            "order_date": order.order_date.isoformat(),
+            "t": time.time(),
+        }
+        journal.next_seq += 1
+        future = asyncio.get_running_loop().create_future()
+        journal.pending.append((_encode(record), record, future))
+        self._pending_total += 1
+        if not journal.syncing:
+            journal.syncing = True
+            asyncio.ensure_future(self._sync(journal))
+        await future
+        if len(journal.unflushed) >= WRITE_BEHIND_BATCH:
+            self._wake.set()
+        return record["seq"]
+
+    async def _sync(self, journal: _Journal):
+        # Group commit on the journal: whatever queued up during one fsync
+        # goes out in the next
+        try:
+            while journal.pending:
+                batch, journal.pending = journal.pending, []
+                try:
+                    await run_query(_append, journal.file, b"".join(line for line, _, _ in batch))
+                except BaseException as e:
+                    self._pending_total -= len(batch)
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e if isinstance(e, Exception) else RuntimeError("Journal write cancelled"))
+                    continue
+                self.fsyncs += 1
+                self.appended += len(batch)
+                for _, record, future in batch:
+                    journal.unflushed.append(record)
+                    if not future.done():
+                        future.set_result(None)
+        finally:
+            journal.syncing = False
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), WRITE_BEHIND_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+    async def flush(self):
+        journals = [j for j in self._journals.values() if j.unflushed]
+        if journals:
+            await asyncio.gather(*(self._flush_journal(j) for j in journals))
+
+    def _dead_letter_path(self, journal: _Journal) -> Path:
+        return self.directory / "dead_letter" / f"{journal.db_name}.jsonl"
+
+    async def _skip_committed(self, journal: _Journal):
+        # After a commit failed without a clear outcome; trust the checkpoint
+        checkpoint = await run_query(_read_checkpoint, journal.db_name, journal.name)
+        while journal.unflushed and journal.unflushed[0]["seq"] <= checkpoint:
+            journal.unflushed.popleft()
+            self._pending_total -= 1
+        journal.flushed_seq = max(journal.flushed_seq, checkpoint)
+
+    async def _flush_journal(self, journal: _Journal):
+        if journal.verify:
+            try:
+                await self._skip_committed(journal)
+            except Exception as e:
+                journal.last_error = str(e)
+                return
+            journal.verify = False
+
+        while journal.unflushed:
+            records = list(islice(journal.unflushed, WRITE_BEHIND_BATCH))
+            rejected = 0
+            try:
+                rows = await run_query(_commit_batch, journal.db_name, journal.name, records)
+            except Exception as e:
+                journal.flush_errors += 1
+                journal.last_error = str(e)
+                try:
+                    await self._skip_committed(journal)
+                    records = list(islice(journal.unflushed, WRITE_BEHIND_BATCH))
+                    if not records:
+                        break
+                    # Not committed: find the rows the database won't take
+                    rows, rejected = await run_query(
+                        _commit_rows, journal.db_name, journal.name, records, self._dead_letter_path(journal)
+                    )
+                except Exception as e:
+                    # Database unreachable rather than a bad row; retry later
+                    journal.last_error = str(e)
+                    journal.verify = True
+                    return
+            if rejected:
+                self.dead_lettered += rejected
+                journal.dead_letters += rejected
+                dead_letters.inc(rejected, journal.db_name)
+                print(f"Write-behind: {rejected} order(s) for {journal.db_name} rejected by the database, see {self._dead_letter_path(journal)}")
+            for _ in records:
+                journal.unflushed.popleft()
+            self._pending_total -= len(records)
+            journal.flushed_seq = records[-1]["seq"]
+            self.flushed += len(rows)
+            self.batches += 1
+
+            now = time.time()
+            flush_batch_rows.observe(len(rows), journal.db_name)
+            for record in records:
+                flush_lag_seconds.observe(now - record["t"], journal.db_name)
+            if rows:
+                orders_committed(journal.db_name, [(order_date.date(), amount, status) for _, amount, status, order_date in rows])
+
+        self._compact(journal)
+
+    def _compact(self, journal: _Journal):
+        if not journal.idle():
+            return
+        if not journal.owned:
+            journal.close()
+            journal.path.unlink(missing_ok=True)
+            del self._journals[journal.name]
+        elif os.fstat(journal.file.fileno()).st_size > WRITE_BEHIND_SEGMENT_BYTES:
+            # Everything in it is committed; sequence numbers carry on
+            journal.file.truncate(0)
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "enabled": self.enabled,
+            "pending": self._pending_total,
+            "max_pending": WRITE_BEHIND_MAX_PENDING,
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "orders_per_fsync": self.appended / self.fsyncs if self.fsyncs else 0.0,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "avg_batch": self.flushed / self.batches if self.batches else 0.0,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+            "dead_lettered": self.dead_lettered,
+            "journals": {
+                name: {
+                    "owned": j.owned,
+                    "unflushed": len(j.unflushed),
+                    "next_seq": j.next_seq,
+                    "flushed_seq": j.flushed_seq,
+                    "oldest_age": now - j.unflushed[0]["t"] if j.unflushed else 0.0,
+                    "flush_errors": j.flush_errors,
+                    "dead_letters": j.dead_letters,
+                    "last_error": j.last_error,
+                }
+                for name, j in self._journals.items()
+            },
+        }
+
+write_behind = WriteBehind()
@@ -1,12 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pathlib import Path
 
-from app.core.config import lifespan
-from app.api import routes_auth, routes_shop, routes_dynamic_table, routes_report
+from app.core.config import lifespan, METRICS_ENABLED
+from app.core.metrics import MetricsMiddleware
+from app.api import routes_auth, routes_shop, routes_dynamic_table, routes_report, routes_analytics, routes_consolidated, routes_admin
 
 app = FastAPI(lifespan=lifespan)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Serve static frontend
 app.mount("/static", StaticFiles(directory="smart-ledger-frontend", html=True), name="static")
@@ -34,11 +38,19 @@ async def login_page():
     return FileResponse(Path("smart-ledger-frontend/login.html"))
 
 @app.exception_handler(404)
-async def custom_404_handler(_, __):
-    return FileResponse("smart-ledger-frontend/select-db.html")
+async def custom_404_handler(request: Request, exc):
+    # Unknown URLs land on the frontend; a 404 from a matched API route
+    # (unknown job, table, database) stays a JSON 404
+    if request.scope.get("route") is None:
+        return FileResponse("smart-ledger-frontend/select-db.html")
+    return await http_exception_handler(request, exc)
 
 # Include routers
 app.include_router(routes_auth.router)
 app.include_router(routes_shop.router)
 app.include_router(routes_dynamic_table.router)
 app.include_router(routes_report.router)
+app.include_router(routes_analytics.router)
+app.include_router(routes_consolidated.router)
+app.include_router(routes_admin.router)
+app.include_router(routes_admin.metrics_router)
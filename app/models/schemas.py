@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Literal
+from datetime import datetime, timezone
 from enum import Enum
 
 # ---------- User & Auth ----------
@@ -14,7 +15,9 @@ class UserLogin(BaseModel):
 # ---------- Shops ----------
 class ShopCreate(BaseModel):
     name: str
+    # The shop's first admin user
     owner: str
+    password: str
 
 # ---------- Tables ----------
 class TableCreate(BaseModel):
@@ -30,13 +33,30 @@ class TableCreateRequest(BaseModel):
     columns: List[ColumnDefinition]
 
 # ---------- Orders ----------
+# What every backend can store: orders.user_id is INT, and SQL Server's
+# DATETIME starts in 1753
+MAX_INT = 2**31 - 1
+MIN_ORDER_DATE = datetime(1753, 1, 1)
+
 class OrderRequest(BaseModel):
-    user_id: int = Field(..., gt=0)
-    amount: float = Field(..., gt=0)
+    user_id: int = Field(..., gt=0, le=MAX_INT)
+    amount: float = Field(..., gt=0, allow_inf_nan=False)
     status: Literal["pending", "completed", "cancelled"]
-    order_date: str
+    order_date: datetime
+
+    @field_validator("order_date")
+    @classmethod
+    def naive_utc(cls, value: datetime) -> datetime:
+        # Order dates are stored naive; an offset is converted to UTC first
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        if value < MIN_ORDER_DATE:
+            raise ValueError(f"order_date must be on or after {MIN_ORDER_DATE.date()}")
+        return value
 
 # ---------- Summary ----------
 class SummaryRange(str, Enum):
     weekly = "weekly"
     monthly = "monthly"
+    yearly = "yearly"
+    custom = "custom"
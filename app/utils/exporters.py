@@ -0,0 +1,165 @@
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
+from typing import Iterable, Iterator, Sequence
+
+from app.core.database import pool
+from app.core.metrics import measure_stream
+from app.utils.pdf_report import iter_row_chunks, render_table_pdf
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow exports are optional
+    pa = None
+    pq = None
+
+# format -> (media type, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    "pdf": ("application/pdf", "pdf", False),
+    "csv": ("text/csv", "csv", False),
+    "ndjson": ("application/x-ndjson", "ndjson", False),
+    "parquet": ("application/vnd.apache.parquet", "parquet", True),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", True),
+}
+
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+
+def format_available(fmt: str) -> bool:
+    return fmt in EXPORT_FORMATS and (pa is not None or not EXPORT_FORMATS[fmt][2])
+
+# Every renderer takes a DB-API cursor.description and an iterable of row
+# chunks (as fetchmany returns them) and yields encoded bytes per chunk, so
+# memory stays at one chunk no matter how many rows are exported.
+
+def render_csv(description: Sequence, row_chunks: Iterable[Sequence]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([d[0] for d in description])
+    for chunk in row_chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def render_ndjson(description: Sequence, row_chunks: Iterable[Sequence]) -> Iterator[bytes]:
+    keys = [d[0] for d in description]
+    encode = json.JSONEncoder(default=_json_default, ensure_ascii=False, separators=(",", ":")).encode
+    for chunk in row_chunks:
+        # One short-lived dict per row; nothing outlives the chunk
+        yield "".join(encode(dict(zip(keys, row))) + "\n" for row in chunk).encode()
+
+def arrow_type(type_code, precision=None, scale=None):
+    if type_code is bool:
+        return pa.bool_()
+    if type_code is int:
+        return pa.int64()
+    if type_code is float:
+        return pa.float64()
+    if type_code is Decimal:
+        return pa.decimal128(min(precision or 38, 38), scale or 0)
+    if type_code is datetime.datetime:
+        return pa.timestamp("us")
+    if type_code is datetime.date:
+        return pa.date32()
+    if type_code in (bytes, bytearray):
+        return pa.binary()
+    return pa.string()
+
+def arrow_schema(description: Sequence):
+    return pa.schema([
+        pa.field(d[0], arrow_type(d[1], d[4] if len(d) > 4 else None, d[5] if len(d) > 5 else None))
+        for d in description
+    ])
+
+def _record_batch(schema, chunk: Sequence):
+    columns = list(zip(*chunk)) if chunk else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.type == pa.string():
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file that hands back whatever was written since the last drain
+    def __init__(self):
+        self._parts = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def render_arrow(description: Sequence, row_chunks: Iterable[Sequence]) -> Iterator[bytes]:
+    schema = arrow_schema(description)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in row_chunks:
+            writer.write_batch(_record_batch(schema, chunk))
+            yield sink.drain()
+    data = sink.drain()
+    if data:
+        yield data
+
+def render_parquet(description: Sequence, row_chunks: Iterable[Sequence]) -> Iterator[bytes]:
+    # Fetch chunks are small, so batches are grouped up to PARQUET_ROW_GROUP_ROWS
+    # before writing; readers do badly with thousands of tiny row groups.
+    # The footer goes out when the writer closes.
+    schema = arrow_schema(description)
+    sink = _ChunkSink()
+    pending, pending_rows = [], 0
+    with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+        for chunk in row_chunks:
+            pending.append(_record_batch(schema, chunk))
+            pending_rows += len(chunk)
+            if pending_rows >= PARQUET_ROW_GROUP_ROWS:
+                writer.write_table(pa.Table.from_batches(pending, schema))
+                pending, pending_rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema))
+    yield sink.drain()
+
+RENDERERS = {
+    "csv": render_csv,
+    "ndjson": render_ndjson,
+    "parquet": render_parquet,
+    "arrow": render_arrow,
+}
+
+def render_export(fmt: str, description: Sequence, row_chunks: Iterable[Sequence], title: str = "Smart Ledger Report") -> Iterator[bytes]:
+    if fmt == "pdf":
+        return render_table_pdf(title, [d[0] for d in description], row_chunks)
+    return RENDERERS[fmt](description, row_chunks)
+
+def stream_orders_export(db_name: str, query: str, params: Sequence = (), fmt: str = "pdf", title: str = "Smart Ledger Report") -> Iterator[bytes]:
+    with pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        yield from measure_stream(render_export(fmt, cursor.description, iter_row_chunks(cursor), title), db_name, fmt)
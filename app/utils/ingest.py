@@ -0,0 +1,111 @@
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.core.backends import backend
+from app.core.config import INGEST_MAX_LINE_BYTES
+from app.core.rollups import apply_deltas
+from app.models.schemas import OrderRequest
+
+ORDER_COLUMNS = ("user_id", "amount", "status", "order_date")
+
+async def iter_lines(stream: AsyncIterator[bytes], max_line: int = INGEST_MAX_LINE_BYTES) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a byte stream into raw lines without buffering the whole body.
+    Lines stay undecoded so a bad byte fails only its own row. A line longer
+    than `max_line` is dropped as it arrives and comes out as None.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if oversized or len(line) > max_line:
+                oversized = False
+                yield None
+            else:
+                yield line.rstrip(b"\r")
+        if len(buffer) > max_line:
+            oversized = True
+            buffer = b""
+    if oversized:
+        yield None
+    elif buffer:
+        yield buffer.rstrip(b"\r")
+
+def decode_line(line: Optional[bytes]) -> str:
+    if line is None:
+        raise ValueError(f"line is longer than {INGEST_MAX_LINE_BYTES} bytes")
+    # UnicodeDecodeError is a ValueError, reported like any other bad row
+    return line.decode("utf-8")
+
+def parse_csv_header(line: str) -> List[str]:
+    return [name.strip() for name in next(csv.reader([line]))]
+
+def _error(row: int, e: Exception) -> dict:
+    if isinstance(e, ValidationError):
+        message = "; ".join(
+            f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+        )
+    else:
+        message = str(e)
+    return {"row": row, "error": message}
+
+def parse_order_chunk(
+    lines: List[Tuple[int, Optional[bytes]]], fmt: str, header: Optional[List[str]] = None
+) -> Tuple[List[Tuple[int, OrderRequest]], List[dict]]:
+    """Parse and validate a chunk of (row number, raw line) pairs."""
+    valid, errors = [], []
+    for row, raw in lines:
+        try:
+            line = decode_line(raw)
+            if fmt == "csv":
+                values = next(csv.reader([line]))
+                if len(values) != len(header):
+                    raise ValueError(f"expected {len(header)} fields, got {len(values)}")
+                record = dict(zip(header, values))
+            else:
+                record = json.loads(line)
+            valid.append((row, OrderRequest.model_validate(record)))
+        except Exception as e:
+            errors.append(_error(row, e))
+    return valid, errors
+
+def insert_order_batch(conn, orders: List[Tuple[int, OrderRequest]]) -> List[dict]:
+    """
+    Insert a batch in one transaction using a parameter array. If the batch
+    is rejected, fall back to row-by-row inserts so that only the offending
+    rows are reported and the rest still land. Daily rollups are updated
+    in the same transaction.
+    """
+    sql = "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)"
+    params = [(o.user_id, o.amount, o.status, o.order_date) for _, o in orders]
+    cursor = conn.cursor()
+    if hasattr(cursor, "fast_executemany"):
+        cursor.fast_executemany = True
+    try:
+        cursor.executemany(sql, params)
+        apply_deltas(cursor, [(o.order_date.date(), o.amount, o.status) for _, o in orders])
+        conn.commit()
+        return []
+    except Exception:
+        conn.rollback()
+
+    errors = []
+    inserted = []
+    cursor = conn.cursor()
+    for (row, order), values in zip(orders, params):
+        backend.savepoint(cursor)
+        try:
+            cursor.execute(sql, values)
+            backend.release_savepoint(cursor)
+            inserted.append((order.order_date.date(), order.amount, order.status))
+        except Exception as e:
+            backend.rollback_to_savepoint(cursor)
+            errors.append(_error(row, e))
+    apply_deltas(cursor, inserted)
+    conn.commit()
+    return errors
@@ -1,13 +1,100 @@
-from fastapi import Header, HTTPException
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException
 import jwt
-from app.core.config import SECRET_KEY, JWT_ALGORITHM
+from app.core.config import SECRET_KEY, JWT_ALGORITHM, JWT_CACHE_SIZE
+
+@dataclass(frozen=True)
+class TokenClaims:
+    shop_name: str
+    username: str
+    exp: float
+    # "admin" for ADMIN_USERS logins; tokens issued before roles are plain shop tokens
+    role: str = "shop"
+
+class TokenCache:
+    """
+    LRU of verified tokens' claims, keyed by a hash of the token so raw
+    tokens aren't kept in memory. Entries are only served until their `exp`.
+    """
+
+    def __init__(self, max_size: int = JWT_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # sha256(token) -> TokenClaims
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[TokenClaims]:
+        key = self._key(token)
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is None or claims.exp <= time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
 
-def verify_token(authorization: str = Header(...)):
+    def put(self, token: str, claims: TokenClaims):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+token_cache = TokenCache()
+
+def decode_token(token: str) -> TokenClaims:
+    claims = token_cache.get(token)
+    if claims is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM], options={"require": ["exp"]})
+        claims = TokenClaims(payload["shop_name"], payload["username"], float(payload["exp"]), payload.get("role", "shop"))
+        token_cache.put(token, claims)
+    return claims
+
+def verify_token_optional(authorization: Optional[str] = Header(None)) -> Optional[TokenClaims]:
+    if authorization is None:
+        return None
     try:
         scheme, token = authorization.split()
         if scheme.lower() != "bearer":
             raise ValueError("Invalid scheme")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload  # contains shop_name, username, exp
+        return decode_token(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+def verify_token(claims: Optional[TokenClaims] = Depends(verify_token_optional)) -> TokenClaims:
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Missing token")
+    return claims
+
+def require_admin(claims: TokenClaims = Depends(verify_token)) -> TokenClaims:
+    if claims.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return claims
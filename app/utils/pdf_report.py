@@ -0,0 +1,179 @@
+import datetime
+import zlib
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Sequence
+
+from app.core.config import REPORT_FETCH_SIZE
+from app.core.database import pool
+from app.core.metrics import measure_stream
+
+# A4 portrait, in points
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 36
+FONT_SIZE = 9
+TITLE_SIZE = 14
+ROW_HEIGHT = 14
+CELL_PADDING = 3
+
+# Fixed widths for the known orders columns; anything else shares the rest
+COLUMN_WIDTHS = {"id": 55, "user_id": 65, "amount": 85, "status": 85, "order_date": 130}
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _fit(text: str, width: float, size: float) -> str:
+    # Helvetica averages ~0.5em per glyph; good enough to keep cells from overlapping
+    max_chars = max(int((width - 2 * CELL_PADDING) / (size * 0.5)), 1)
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "~"
+
+def format_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (float, Decimal)):
+        return f"{value:.2f}"
+    if isinstance(value, datetime.datetime):
+        return value.replace(microsecond=0).isoformat(sep=" ")
+    return str(value)
+
+def column_widths(headers: Sequence[str]) -> List[float]:
+    usable = PAGE_WIDTH - 2 * MARGIN
+    fixed = {h: COLUMN_WIDTHS[h] for h in headers if h in COLUMN_WIDTHS}
+    rest = [h for h in headers if h not in fixed]
+    remaining = usable - sum(fixed.values())
+    if rest and remaining > 0:
+        share = remaining / len(rest)
+        return [fixed.get(h, share) for h in headers]
+    # Too many columns for the fixed layout; split evenly
+    return [usable / len(headers)] * len(headers)
+
+class PdfStreamWriter:
+    """
+    Minimal PDF writer that emits each page as soon as it is complete.
+
+    Only the page object ids are kept in memory, so output size does not
+    affect memory use. Object 1 is the catalog and 2 the page tree; both
+    are written last since the page tree lists every page.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 5
+
+    def _object(self, obj_id: int, body: bytes) -> bytes:
+        self.offsets[obj_id] = self.offset
+        data = f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n"
+        self.offset += len(data)
+        return data
+
+    def _raw(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def begin(self) -> bytes:
+        return (
+            self._raw(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            + self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+            + self._object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        )
+
+    def page(self, content: str) -> bytes:
+        stream = zlib.compress(content.encode("latin-1", errors="replace"))
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        return (
+            self._object(content_id, f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode() + stream + b"\nendstream")
+            + self._object(page_id, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>"
+            ).encode())
+        )
+
+    def end(self) -> bytes:
+        kids = " ".join(f"{i} 0 R" for i in self.page_ids)
+        data = (
+            self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+            + self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        )
+        xref_offset = self.offset
+        size = self.next_id
+        entries = ["0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            entries.append(f"{self.offsets.get(obj_id, 0):010d} 00000 n \n")
+        return data + self._raw((
+            f"xref\n0 {size}\n" + "".join(entries)
+            + f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+        ).encode())
+
+def _text(x: float, y: float, text: str, font: str = "F1", size: float = FONT_SIZE) -> str:
+    return f"BT /{font} {size} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm ({_escape(text)}) Tj ET\n"
+
+def render_table_pdf(title: str, headers: Sequence[str], row_chunks: Iterable[Sequence]) -> Iterator[bytes]:
+    """Render rows as a table, yielding the PDF one page at a time."""
+    writer = PdfStreamWriter()
+    widths = column_widths(headers)
+    xs = [MARGIN + sum(widths[:i]) for i in range(len(widths))]
+    top = PAGE_HEIGHT - MARGIN
+    page_no = 0
+    lines = []
+    y = 0.0
+
+    def start_page():
+        nonlocal y, page_no
+        page_no += 1
+        lines.clear()
+        y = top
+        if page_no == 1:
+            y -= TITLE_SIZE
+            lines.append(_text(MARGIN, y, title, "F2", TITLE_SIZE))
+            y -= ROW_HEIGHT
+        y -= ROW_HEIGHT
+        for x, w, h in zip(xs, widths, headers):
+            lines.append(_text(x + CELL_PADDING, y + 4, _fit(str(h), w, FONT_SIZE), "F2"))
+        lines.append(f"0.5 w {MARGIN} {y:.2f} m {PAGE_WIDTH - MARGIN:.2f} {y:.2f} l S\n")
+
+    def finish_page() -> bytes:
+        lines.append(_text(PAGE_WIDTH - MARGIN - 40, MARGIN / 2, f"Page {page_no}", size=8))
+        return writer.page("".join(lines))
+
+    yield writer.begin()
+    start_page()
+    row_count = 0
+    for chunk in row_chunks:
+        for row in chunk:
+            if y - ROW_HEIGHT < MARGIN:
+                yield finish_page()
+                start_page()
+            y -= ROW_HEIGHT
+            row_count += 1
+            for x, w, value in zip(xs, widths, row):
+                lines.append(_text(x + CELL_PADDING, y + 4, _fit(format_value(value), w, FONT_SIZE)))
+    if page_no == 1 and row_count == 0:
+        lines.append(_text(MARGIN + CELL_PADDING, y - ROW_HEIGHT + 4, "No orders found."))
+    yield finish_page()
+    yield writer.end()
+
+def report_range(report_type: str, today: datetime.date):
+    """Normalize a report type to (type, from_date, to_date); None means unbounded."""
+    if report_type == "daily":
+        return "daily", today, today
+    if report_type == "monthly":
+        return "monthly", today.replace(day=1), None
+    return "all", None, None
+
+def iter_row_chunks(cursor, size: int = REPORT_FETCH_SIZE) -> Iterator[Sequence]:
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield rows
+
+def stream_orders_report(db_name: str, query: str, params: Sequence = (), title: str = "Smart Ledger Report") -> Iterator[bytes]:
+    with pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        headers = [desc[0] for desc in cursor.description]
+        yield from measure_stream(render_table_pdf(title, headers, iter_row_chunks(cursor)), db_name, "pdf")
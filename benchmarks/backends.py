@@ -0,0 +1,144 @@
+"""
+Run the same order workload against each database backend: schema setup,
+single-order inserts (the /add-order path), a bulk load, /data pages,
+/summary and a CSV export of the last 30 days.
+
+Each backend runs in its own process with DB_BACKEND set, so connection
+settings come from .env / the environment as for the app:
+
+    python benchmarks/backends.py --backends sqlite,postgres,mssql --rows 200000
+
+    # One backend only, printing JSON (what the parent runs per backend)
+    DB_BACKEND=sqlite python benchmarks/backends.py --single --rows 50000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+STATUSES = ("pending", "completed", "cancelled")
+
+def random_orders(rng: random.Random, n: int, days: int):
+    now = datetime.now().replace(microsecond=0)
+    return [
+        (rng.randint(1, 5000), round(rng.uniform(1, 500), 2), rng.choice(STATUSES),
+         now - timedelta(seconds=int(rng.random() * days * 86400)))
+        for _ in range(n)
+    ]
+
+def run_single(args) -> dict:
+    from app.core.backends import backend
+    from app.core.database import create_database, pool
+    from app.core.orders import ensure_order_schema, list_orders, order_date_filter, where_sql
+    from app.core.rollups import apply_deltas, ensure_rollups, fetch_summary
+    from app.utils.exporters import stream_orders_export
+
+    insert_sql = "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)"
+    rng = random.Random(args.seed)
+    timings = {}
+
+    def timed(name, fn, repeat=1):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+
+    def setup():
+        create_database(args.db, if_missing=True)
+        with pool.connection(args.db) as conn:
+            cursor = conn.cursor()
+            ensure_order_schema(conn)
+            cursor.execute("DELETE FROM orders")
+            conn.commit()
+            ensure_rollups(args.db, conn)
+            cursor.execute("DELETE FROM order_daily_rollups")
+            conn.commit()
+
+    def bulk_load():
+        rows = random_orders(rng, args.rows, 365)
+        with pool.connection(args.db) as conn:
+            cursor = conn.cursor()
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            for i in range(0, len(rows), 5000):
+                batch = rows[i:i + 5000]
+                cursor.executemany(insert_sql, batch)
+                apply_deltas(cursor, [(r[3].date(), r[1], r[2]) for r in batch])
+                conn.commit()
+
+    singles = random_orders(rng, args.ops, 1)
+    single_iter = iter(singles)
+
+    def add_order():
+        row = next(single_iter)
+        with pool.connection(args.db) as conn:
+            cursor = conn.cursor()
+            cursor.execute(insert_sql, row)
+            apply_deltas(cursor, [(row[3].date(), row[1], row[2])])
+            conn.commit()
+
+    def data_page():
+        with pool.connection(args.db) as conn:
+            list_orders(conn, limit=50, status=rng.choice(STATUSES))
+
+    def summary():
+        with pool.connection(args.db) as conn:
+            fetch_summary(conn, date.today().replace(day=1))
+
+    def export():
+        clauses, params = order_date_filter(date.today() - timedelta(days=30), date.today())
+        query = f"SELECT id, user_id, amount, status, order_date FROM orders {where_sql(clauses)} ORDER BY id"
+        for _ in stream_orders_export(args.db, query, params, "csv"):
+            pass
+
+    timed("setup", setup)
+    timed("bulk_load", bulk_load)
+    timed("add_order", add_order, args.ops)
+    timed("data_page", data_page, args.ops)
+    timed("summary", summary, args.ops)
+    timed("export_csv_30d", export, 3)
+    pool.close_all()
+    return {"backend": backend.name, "rows": args.rows, "ms": timings}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", default="sqlite")
+    parser.add_argument("--db", default="shop_bench_backends")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=500, help="repetitions of the per-request operations")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args)))
+        return
+
+    results = []
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        command = [
+            sys.executable, __file__, "--single", "--db", args.db,
+            "--rows", str(args.rows), "--ops", str(args.ops), "--seed", str(args.seed)
+        ]
+        proc = subprocess.run(command, env={**os.environ, "DB_BACKEND": name}, capture_output=True, text=True)
+        if proc.returncode:
+            print(f"{name}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr else ''}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if not results:
+        return
+    steps = list(results[0]["ms"])
+    print(f"{'ms per op':16s}" + "".join(f"{r['backend']:>12s}" for r in results))
+    for step in steps:
+        print(f"{step:16s}" + "".join(f"{r['ms'][step]:12.2f}" for r in results))
+
+if __name__ == "__main__":
+    main()
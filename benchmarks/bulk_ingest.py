@@ -0,0 +1,61 @@
+"""
+Stream generated orders into /add-orders/bulk and report throughput.
+
+    python benchmarks/bulk_ingest.py --db shop_demo --rows 100000 --format ndjson
+"""
+import argparse
+import json
+import random
+import time
+import urllib.request
+from datetime import date, timedelta
+
+STATUSES = ("pending", "completed", "cancelled")
+
+def generate(rows: int, fmt: str, chunk_rows: int = 1000):
+    start = date.today() - timedelta(days=365)
+    if fmt == "csv":
+        yield b"user_id,amount,status,order_date\n"
+    buffer = []
+    for i in range(rows):
+        order = {
+            "user_id": random.randint(1, 500),
+            "amount": round(random.uniform(1, 500), 2),
+            "status": random.choice(STATUSES),
+            "order_date": str(start + timedelta(days=i % 365)),
+        }
+        if fmt == "csv":
+            buffer.append(",".join(str(v) for v in order.values()))
+        else:
+            buffer.append(json.dumps(order))
+        if len(buffer) >= chunk_rows:
+            yield ("\n".join(buffer) + "\n").encode()
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--db", default="Practice")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    req = urllib.request.Request(
+        f"{args.base_url}/add-orders/bulk?format={args.format}&batch_size={args.batch_size}",
+        data=generate(args.rows, args.format),
+        headers={"X-Database-Name": args.db, "Content-Type": f"text/{args.format}"},
+        method="POST",
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(req) as resp:
+        result = json.loads(resp.read())
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.rows} rows ({args.format}, batch {args.batch_size}) in {elapsed:.2f}s")
+    print(f"  {result['inserted'] / elapsed:,.0f} rows/s  inserted={result['inserted']} failed={result['failed']}")
+
+if __name__ == "__main__":
+    main()
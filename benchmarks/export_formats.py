@@ -0,0 +1,119 @@
+"""
+Rows/sec, output size and peak RSS of each /export-report format.
+
+Each format and size runs in a fresh process so peak RSS is not carried over
+(parquet and arrow are skipped when pyarrow isn't installed):
+
+    python benchmarks/export_formats.py --sizes 100000 1000000 --formats csv ndjson parquet arrow pdf
+
+--route seeds the practice database and goes through the real /export-report
+handler instead (fingerprint query, report cache miss, cpu executor stream,
+pooled connection), failing loudly if the handler errors:
+
+    DB_BACKEND=sqlite DB_DATABASE_PRACTICE=practice python benchmarks/export_formats.py --route --sizes 100000
+"""
+import argparse
+import asyncio
+import datetime
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# What pyodbc reports for the orders table
+DESCRIPTION = [
+    ("id", int, None, 10, 10, 0, False),
+    ("user_id", int, None, 10, 10, 0, False),
+    ("amount", float, None, 53, 53, 0, False),
+    ("status", str, None, 20, 20, 0, False),
+    ("order_date", datetime.datetime, None, 23, 23, 3, False),
+]
+
+def fake_cursor_chunks(rows: int, chunk: int = 1000):
+    ts = datetime.datetime(2024, 1, 1, 12, 30)
+    for start in range(0, rows, chunk):
+        yield [
+            (i, i % 500 + 1, 10.0 + i % 1000, "completed", ts)
+            for i in range(start, min(rows, start + chunk))
+        ]
+
+def run_one(fmt: str, rows: int):
+    from app.utils.exporters import format_available, render_export
+
+    if not format_available(fmt):
+        print(f"{fmt:>8}  skipped (pyarrow not installed)")
+        return
+    start = time.perf_counter()
+    size = 0
+    for part in render_export(fmt, DESCRIPTION, fake_cursor_chunks(rows)):
+        size += len(part)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{fmt:>8}  {rows:>10,} rows  {rows / elapsed:>10,.0f} rows/s  {size / 2**20:8.1f} MiB  peak RSS {peak_mb:6.1f} MiB")
+
+def seed_practice(rows: int) -> str:
+    from app.core.config import DB_DATABASE_PRACTICE
+    from app.core.database import create_database, pool
+    from app.core.orders import ensure_order_schema
+
+    create_database(DB_DATABASE_PRACTICE, if_missing=True)
+    with pool.connection(DB_DATABASE_PRACTICE) as conn:
+        ensure_order_schema(conn)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM orders")
+        for chunk in fake_cursor_chunks(rows):
+            cursor.executemany(
+                "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)",
+                [row[1:] for row in chunk]
+            )
+        conn.commit()
+    return DB_DATABASE_PRACTICE
+
+async def _drain_route(fmt: str, db_name: str) -> int:
+    from app.api.routes_report import export_report
+    from app.core.report_cache import report_cache
+
+    # Always measure the uncached path
+    report_cache.invalidate(db_name)
+    response = await export_report(type="custom", format=fmt, columns=None,
+                                   from_date=datetime.date(2000, 1, 1), to_date=None, db_name=db_name)
+    if not hasattr(response, "body_iterator"):
+        raise RuntimeError(f"expected a streamed export, got {type(response).__name__}")
+    size = 0
+    async for part in response.body_iterator:
+        size += len(part)
+    return size
+
+def run_route(fmt: str, rows: int):
+    from app.utils.exporters import format_available
+
+    if not format_available(fmt):
+        print(f"{fmt:>8}  skipped (pyarrow not installed)")
+        return
+    db_name = seed_practice(rows)
+    start = time.perf_counter()
+    size = asyncio.run(_drain_route(fmt, db_name))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{fmt:>8}  {rows:>10,} rows  {rows / elapsed:>10,.0f} rows/s  {size / 2**20:8.1f} MiB  peak RSS {peak_mb:6.1f} MiB  (route)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "parquet", "arrow", "pdf"])
+    parser.add_argument("--route", action="store_true", help="go through the /export-report handler")
+    parser.add_argument("--single", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        (run_route if args.route else run_one)(args.single[0], int(args.single[1]))
+        return
+    for rows in args.sizes:
+        for fmt in args.formats:
+            subprocess.run([sys.executable, __file__, "--single", fmt, str(rows)] + (["--route"] if args.route else []), check=True)
+
+if __name__ == "__main__":
+    main()
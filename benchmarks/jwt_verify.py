@@ -0,0 +1,46 @@
+"""
+Per-request cost of the auth dependency with and without the claims cache.
+
+    python benchmarks/jwt_verify.py --requests 100000 --tokens 1000
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct signed-in users")
+    args = parser.parse_args()
+
+    import jwt
+    from app.core.config import SECRET_KEY, JWT_ALGORITHM
+    from app.utils.jwt_auth import TokenCache, verify_token_optional
+    import app.utils.jwt_auth as jwt_auth
+
+    exp = datetime.utcnow() + timedelta(minutes=30)
+    headers = [
+        "Bearer " + jwt.encode(
+            {"shop_name": f"shop_{i}", "username": "admin", "exp": exp}, SECRET_KEY, algorithm=JWT_ALGORITHM
+        )
+        for i in range(args.tokens)
+    ]
+
+    for label, size in (("uncached", 0), ("cached", args.tokens)):
+        jwt_auth.token_cache = TokenCache(max_size=size)
+        start = time.perf_counter()
+        for i in range(args.requests):
+            verify_token_optional(headers[i % len(headers)])
+        elapsed = time.perf_counter() - start
+        stats = jwt_auth.token_cache.stats()
+        print(
+            f"{label:>9}: {elapsed / args.requests * 1e6:7.2f} us/request  "
+            f"{args.requests / elapsed:>10,.0f} req/s  hit rate {stats['hit_rate']:.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
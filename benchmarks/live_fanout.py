@@ -0,0 +1,89 @@
+"""
+Cost of pushing one write to every /live subscriber of a shop: publish time
+per event as the subscriber count grows, end-to-end delivery latency, and
+what happens to a client that stops reading (its backlog is dropped and it
+gets a single resync instead of stalling the writer).
+
+    python benchmarks/live_fanout.py --subscribers 10,100,1000 --events 2000
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+async def fanout(subscribers: int, events: int):
+    from app.core.live import LiveHub
+
+    hub = LiveHub(max_subscribers=subscribers + 1, max_per_shop=subscribers + 1)
+    latencies = []
+    resyncs = 0
+
+    async def reader(stream):
+        nonlocal resyncs
+        async for frame in stream:
+            if frame.startswith(b"event: summary"):
+                latencies.append(time.perf_counter() - sent)
+            elif frame.startswith(b"event: resync"):
+                resyncs += 1
+            elif frame.startswith(b"event: end"):
+                break
+        await stream.aclose()
+
+    streams = [hub.subscribe("shop_bench") for _ in range(subscribers)]
+    for stream in streams:
+        await stream.__anext__()  # ready
+    readers = [asyncio.ensure_future(reader(stream)) for stream in streams]
+
+    publish = 0.0
+    for i in range(events):
+        sent = time.perf_counter()
+        hub.publish_orders("shop_bench", [(date.today(), 10.0 + i, "completed")])
+        publish += time.perf_counter() - sent
+        await asyncio.sleep(0)
+    # Let every reader drain (and clear any resync) before the end marker
+    while any(not s.queue.empty() for s in hub._shops["shop_bench"]):
+        await asyncio.sleep(0)
+    hub.publish("shop_bench", "end", {})
+    await asyncio.gather(*readers)
+    return publish / events, latencies, resyncs
+
+async def slow_client(events: int):
+    from app.core.live import LiveHub
+
+    hub = LiveHub()
+    stream = hub.subscribe("shop_bench")
+    await stream.__anext__()
+    start = time.perf_counter()
+    for i in range(events):
+        hub.publish_orders("shop_bench", [(date.today(), 1.0, "pending")])
+    elapsed = time.perf_counter() - start
+    first = await stream.__anext__()
+    await stream.aclose()
+    return elapsed / events, first.split(b"\n")[0].decode(), hub.stats()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", default="10,100,1000")
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    for n in [int(x) for x in args.subscribers.split(",")]:
+        per_publish, latencies, resyncs = asyncio.run(fanout(n, args.events))
+        latencies.sort()
+        print(
+            f"{n:6d} subscribers  publish {per_publish * 1e6:8.1f} us/event  "
+            f"delivery p50 {statistics.median(latencies) * 1000:7.2f}ms  "
+            f"p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:7.2f}ms  "
+            f"received {len(latencies)}/{n * args.events}  resyncs {resyncs}"
+        )
+
+    per_publish, first, stats = asyncio.run(slow_client(args.events))
+    print(f"stalled client: publish {per_publish * 1e6:.1f} us/event, next frame '{first}', resyncs {stats['resyncs']}")
+
+if __name__ == "__main__":
+    main()
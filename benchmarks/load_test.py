@@ -0,0 +1,391 @@
+"""
+End-to-end load test: boots (or targets) the API, seeds shops with orders
+and drives the main endpoints at a fixed concurrency, reporting throughput,
+p50/p95/p99 latency and peak server RSS per scenario.
+
+    # Start uvicorn against whatever .env / --env points at, seed and run
+    python benchmarks/load_test.py --boot --shops 4 --orders 20000 --concurrency 16
+
+    # No database server needed: one SQLite file per shop
+    python benchmarks/load_test.py --boot --env DB_BACKEND=sqlite --env DB_DATABASE_PRACTICE=practice
+
+    # Local SQL Server stand-in (docker run -e ACCEPT_EULA=Y -e MSSQL_SA_PASSWORD=... -p 1433:1433
+    # mcr.microsoft.com/mssql/server:2022-latest)
+    python benchmarks/load_test.py --boot --env DB_SERVER=localhost --env DB_USER=sa --env DB_PASSWORD=...
+
+    # Record a baseline, then fail (exit 1) when a later run regresses by >15%
+    python benchmarks/load_test.py --boot --save-baseline baseline.json
+    python benchmarks/load_test.py --boot --baseline baseline.json --max-regression 0.15
+
+Use --url to run against a server that is already up (no RSS numbers then)
+and --skip-seed to reuse shops seeded by an earlier run.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SCENARIOS = ("add-order", "data", "summary", "export-report", "login")
+STATUSES = ("pending", "completed", "cancelled")
+
+# ---------- HTTP ----------
+
+class Client:
+    """One keep-alive connection per thread."""
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            conn.connect()
+            # Headers and body go out as separate writes; without this, Nagle
+            # plus delayed ACKs add ~40ms to every request with a body
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None and not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+            headers.setdefault("Content-Type", "application/json")
+        conn = self._conn()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def json(self, method: str, path: str, body=None, headers=None):
+        status, data = self.request(method, path, body, headers)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}: {data[:200]!r}")
+        return json.loads(data) if data else None
+
+# ---------- Server ----------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def boot_server(port: int, env_overrides: dict, workers: int) -> subprocess.Popen:
+    env = {**os.environ, **env_overrides}
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+def admin_headers() -> dict:
+    # /admin/* and bulk registration need the admin role; sign one with the
+    # server's key rather than requiring an ADMIN_USERS login
+    import jwt
+    from app.core.config import SECRET_KEY, JWT_ALGORITHM
+
+    payload = {"shop_name": "loadtest", "username": "loadtest", "role": "admin", "exp": time.time() + 3600}
+    return {"Authorization": f"Bearer {jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)}"}
+
+def wait_ready(client: Client, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"server exited with code {process.returncode}")
+        try:
+            if client.request("GET", "/admin/pool-stats", headers=admin_headers())[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("server did not become ready")
+
+def _children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(c) for c in f.read().split()]
+    except OSError:
+        return []
+
+def tree_rss(pid: int) -> int:
+    """Resident bytes of a process and its children (uvicorn --workers), Linux only."""
+    total = 0
+    for p in [pid] + _children(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+class RssSampler:
+    def __init__(self, pid, interval: float = 0.1):
+        self.pid, self.interval = pid, interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.pid:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss(self.pid))
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+# ---------- Seeding ----------
+
+def shop_names(args):
+    return [f"{args.prefix}{i}" for i in range(args.shops)]
+
+def random_order(rng: random.Random, days: int) -> dict:
+    when = datetime.now() - timedelta(days=rng.random() * days)
+    return {
+        "user_id": rng.randint(1, 5000),
+        "amount": round(rng.uniform(1, 500), 2),
+        "status": rng.choice(STATUSES),
+        "order_date": when.replace(microsecond=0).isoformat(),
+    }
+
+def seed(client: Client, args, rng: random.Random):
+    users = [{"username": name, "password": args.password} for name in shop_names(args)]
+    status, data = client.request("POST", "/register-shops/bulk", users, admin_headers())
+    if status == 409:
+        raise SystemExit(f"{json.loads(data)['detail']}; rerun with --skip-seed or another --prefix")
+    if status >= 400:
+        raise SystemExit(f"bulk registration -> {status}: {data[:200]!r}")
+    jobs = json.loads(data)["jobs"]
+    pending = {job["job_id"] for job in jobs}
+    deadline = time.monotonic() + 300
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            job = client.json("GET", f"/register-shop/{job_id}")
+            if job["status"] == "failed":
+                raise SystemExit(f"provisioning {job['database']} failed: {job['error']}")
+            if job["status"] == "succeeded":
+                pending.discard(job_id)
+        time.sleep(0.5)
+    if pending:
+        raise SystemExit("provisioning did not finish")
+
+    tokens = login_all(client, args)
+    for name in shop_names(args):
+        headers = {"Authorization": f"Bearer {tokens[name]}", "Content-Type": "application/x-ndjson"}
+        remaining = args.orders
+        while remaining > 0:
+            n = min(remaining, 5000)
+            body = "\n".join(json.dumps(random_order(rng, args.days)) for _ in range(n))
+            result = client.json("POST", "/add-orders/bulk", body, headers)
+            if result["failed"]:
+                raise SystemExit(f"seeding {name}: {result['errors'][:3]}")
+            remaining -= n
+        print(f"seeded shop_{name} with {args.orders} orders")
+    return tokens
+
+def login_all(client: Client, args) -> dict:
+    return {
+        name: client.json(
+            "POST", "/login?" + urlencode({"shop_name": f"shop_{name}"}),
+            {"username": name, "password": args.password}
+        )["access_token"]
+        for name in shop_names(args)
+    }
+
+# ---------- Scenarios ----------
+
+def build_request(scenario: str, name: str, token: str, args, rng: random.Random):
+    auth = {"Authorization": f"Bearer {token}"}
+    if scenario == "add-order":
+        return "POST", "/add-order", random_order(rng, 1), auth
+    if scenario == "data":
+        return "GET", "/data?" + urlencode({"limit": 50}), None, auth
+    if scenario == "summary":
+        return "GET", "/summary?" + urlencode({"range": rng.choice(("weekly", "monthly", "yearly"))}), None, auth
+    if scenario == "export-report":
+        return "GET", "/export-report?" + urlencode({"type": "monthly", "format": args.export_format}), None, auth
+    if scenario == "login":
+        return "POST", "/login?" + urlencode({"shop_name": f"shop_{name}"}), {"username": name, "password": args.password}, {}
+    raise ValueError(scenario)
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+def run_scenario(client: Client, scenario: str, tokens: dict, args, pid):
+    names = list(tokens)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(index: int, deadline: float, record: bool):
+        rng = random.Random(args.seed * 1000 + index)
+        local, local_errors = [], []
+        while time.monotonic() < deadline:
+            name = names[rng.randrange(len(names))]
+            method, path, body, headers = build_request(scenario, name, tokens[name], args, rng)
+            start = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body, headers)
+                if status >= 400:
+                    local_errors.append(status)
+            except Exception as e:
+                local_errors.append(type(e).__name__)
+            local.append(time.perf_counter() - start)
+        if record:
+            with lock:
+                latencies.extend(local)
+                errors.extend(local_errors)
+
+    def phase(seconds: float, record: bool):
+        deadline = time.monotonic() + seconds
+        threads = [threading.Thread(target=worker, args=(i, deadline, record)) for i in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    if args.warmup:
+        phase(args.warmup, record=False)
+    with RssSampler(pid) as sampler:
+        start = time.monotonic()
+        phase(args.duration, record=True)
+        elapsed = time.monotonic() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_kinds": sorted({str(e) for e in errors}),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": sampler.peak / 2**20 if pid else None,
+    }
+
+# ---------- Baselines ----------
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for scenario, now in results.items():
+        before = baseline.get("results", {}).get(scenario)
+        if not before:
+            continue
+        if now["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{scenario}: throughput {before['throughput']:.1f} -> {now['throughput']:.1f} req/s")
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{scenario}: p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms")
+        if now["errors"] > before["errors"]:
+            regressions.append(f"{scenario}: errors {before['errors']} -> {now['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="running server, e.g. http://127.0.0.1:8000")
+    target.add_argument("--boot", action="store_true", help="start uvicorn app.main:app for the run")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra env for --boot")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--shops", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=20_000, help="orders seeded per shop")
+    parser.add_argument("--days", type=int, default=365, help="seeded orders spread over this many days")
+    parser.add_argument("--prefix", default="loadtest_")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--export-format", default="csv")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    process = None
+    if args.boot:
+        port = free_port()
+        env = dict(item.split("=", 1) for item in args.env)
+        process = boot_server(port, env, args.workers)
+        base_url = f"http://127.0.0.1:{port}"
+    else:
+        base_url = args.url
+    client = Client(base_url)
+    try:
+        wait_ready(client, process)
+        rng = random.Random(args.seed)
+        tokens = login_all(client, args) if args.skip_seed else seed(client, args, rng)
+
+        results = {}
+        print(f"{'scenario':14s} {'req/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>7s} {'peak MB':>8s}")
+        for scenario in scenarios:
+            r = results[scenario] = run_scenario(client, scenario, tokens, args, process.pid if process else None)
+            rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+            print(
+                f"{scenario:14s} {r['throughput']:9.1f} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+                f"{r['p99_ms']:8.1f} {r['errors']:7d} {rss:>8s}"
+            )
+            if r["error_kinds"]:
+                print(f"{'':14s} errors: {', '.join(r['error_kinds'])}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "settings": {k: getattr(args, k) for k in ("workers", "shops", "orders", "concurrency", "duration", "export_format")},
+        "results": results,
+    }
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against baseline")
+
+if __name__ == "__main__":
+    main()
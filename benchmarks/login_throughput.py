@@ -0,0 +1,133 @@
+"""
+Login (bcrypt verify) throughput as the password hasher's process pool grows,
+plus event loop lag while it runs -- the lag is what /summary would feel.
+
+    python benchmarks/login_throughput.py --workers 1 2 4 8 --logins 400
+
+With --base-url, instead drive a running app: concurrent /login loops while
+timing /summary (the shop needs an existing admin user):
+
+    python benchmarks/login_throughput.py --base-url http://127.0.0.1:8000 \\
+        --shop shop_demo --username admin --password secret --loggers 16
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def probe_lag(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    # How late the loop wakes us up; a blocked loop shows up directly here
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+async def run_in_process(workers: int, logins: int, shops: int, password_hash: str):
+    from app.core.hasher import PasswordHasher
+
+    hasher = PasswordHasher(max_workers=workers, max_queue=logins, per_shop=logins)
+    # Warm the workers so process start-up isn't counted
+    await asyncio.gather(*(hasher.check("secret", password_hash, "warmup") for _ in range(workers)))
+
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(probe_lag(stop, lags))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        hasher.check("secret", password_hash, f"shop_{i % shops}") for i in range(logins)
+    ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    hasher.shutdown()
+
+    stats = hasher.stats()
+    assert all(results)
+    print(
+        f"{workers:>3} workers  {logins / elapsed:8.1f} logins/s  "
+        f"avg hash {stats['avg_hash_time'] * 1000:6.1f} ms  "
+        f"avg queue wait {stats['avg_queue_wait'] * 1000:7.1f} ms  "
+        f"loop lag p99 {percentile(lags, 99):5.1f} ms"
+    )
+
+def request(url: str, data: dict = None, db_name: str = None) -> int:
+    headers = {"Content-Type": "application/json"}
+    if db_name:
+        headers["X-Database-Name"] = db_name
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def run_http(args):
+    stop = threading.Event()
+    login_statuses = []
+    creds = {"username": args.username, "password": args.password}
+
+    def logger():
+        while not stop.is_set():
+            login_statuses.append(request(f"{args.base_url}/login?shop_name={args.shop}", creds))
+
+    threads = [threading.Thread(target=logger, daemon=True) for _ in range(args.loggers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        request(f"{args.base_url}/summary", db_name=args.shop)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"/summary under {args.loggers} concurrent /login loops")
+    print(f"  p50: {statistics.median(latencies):.1f} ms")
+    print(f"  p95: {percentile(latencies, 95):.1f} ms")
+    print(f"  p99: {percentile(latencies, 99):.1f} ms")
+    print(f"  logins: {len(login_statuses)} ({len(login_statuses) / elapsed:.1f}/s)  "
+          f"429s: {login_statuses.count(429)}  503s: {login_statuses.count(503)}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--shops", type=int, default=20)
+    parser.add_argument("--base-url")
+    parser.add_argument("--shop", default="Practice")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--loggers", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.base_url:
+        run_http(args)
+        return
+
+    from app.utils.passwords import hash_password
+
+    password_hash = hash_password("secret")
+    for workers in args.workers:
+        asyncio.run(run_in_process(workers, args.logins, args.shops, password_hash))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost of the metrics instrumentation: raw vs instrumented cursor on an
+in-memory SQLite database (point lookups and a chunked scan), the ASGI
+middleware around a no-op app, and a bare histogram observe.
+
+    python benchmarks/metrics_overhead.py --queries 50000 --rows 200000
+"""
+import argparse
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def point_queries(conn, n: int):
+    for i in range(n):
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, amount FROM orders WHERE id = ?", (i,))
+        cursor.fetchall()
+
+def chunked_scan(conn, size: int = 1000):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM orders")
+    while cursor.fetchmany(size):
+        pass
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=50_000)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    from app.core.metrics import InstrumentedConnection, MetricsMiddleware, Histogram
+
+    raw = sqlite3.connect(":memory:")
+    raw.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount REAL, status TEXT)")
+    raw.executemany("INSERT INTO orders VALUES (?, ?, 'Paid')", ((i, i * 1.5) for i in range(args.rows)))
+    instrumented = InstrumentedConnection(raw, "bench")
+
+    for label, fn, n in (("point query", point_queries, args.queries), ("scan", chunked_scan, None)):
+        extra = (n,) if n else ()
+        base = min(timed(fn, raw, *extra) for _ in range(3))
+        inst = min(timed(fn, instrumented, *extra) for _ in range(3))
+        per = f", {(inst - base) / n * 1e6:.2f} us/query" if n else ""
+        print(f"{label:12s} raw {base:.3f}s  instrumented {inst:.3f}s  (+{(inst / base - 1) * 100:.1f}%{per})")
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def serve(handler, n):
+        scope = {"type": "http", "method": "GET", "path": "/", "state": {"shop": "bench"}}
+        for _ in range(n):
+            await handler(dict(scope), None, send)
+
+    base = timed(asyncio.run, serve(app, args.requests))
+    wrapped = timed(asyncio.run, serve(MetricsMiddleware(app), args.requests))
+    print(f"middleware   {(wrapped - base) / args.requests * 1e6:.2f} us/request")
+
+    histogram = Histogram("bench", "bench", ("shop",))
+    n = 1_000_000
+    elapsed = timed(lambda: [histogram.observe(0.012, "bench") for _ in range(n)])
+    print(f"observe      {elapsed / n * 1e9:.0f} ns")
+
+if __name__ == "__main__":
+    main()
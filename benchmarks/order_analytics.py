@@ -0,0 +1,102 @@
+"""
+Compare the SQL (GROUP BY / PERCENTILE_CONT) and NumPy engines behind
+/analytics/orders over a year of orders, for each bucket size.
+
+Against SQL Server, with a scratch shop whose orders table gets seeded:
+
+    python benchmarks/order_analytics.py --db shop_bench --rows 1000000
+
+Without a database, time only the vectorized aggregation on synthetic arrays:
+
+    python benchmarks/order_analytics.py --offline --rows 1000000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.analytics import BUCKETS, aggregate_arrays, load_order_arrays, series_sql
+
+PERCENTILES = (50, 90, 99)
+
+def seed(conn, rows: int, start: datetime):
+    from app.core.orders import ensure_order_schema
+
+    ensure_order_schema(conn)
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    sql = "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)"
+    batch = []
+    for _ in range(rows):
+        batch.append((
+            random.randint(1, 500), random.uniform(1, 500),
+            random.choice(("pending", "completed", "cancelled")),
+            start + timedelta(minutes=random.randint(0, 365 * 24 * 60)),
+        ))
+        if len(batch) == 10_000:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+    conn.commit()
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def run_offline(rows: int, repeat: int):
+    rng = np.random.default_rng(0)
+    base = int((datetime(2024, 1, 1) - datetime(1970, 1, 1)).total_seconds() // 60)
+    minutes = rng.integers(base, base + 365 * 24 * 60, rows)
+    amounts = rng.uniform(1, 500, rows)
+    codes = rng.integers(0, 3, rows)
+    print(f"numpy aggregation over {rows:,} in-memory orders")
+    for bucket in BUCKETS:
+        ms = best_of(lambda: aggregate_arrays(minutes, amounts, codes, bucket, PERCENTILES), repeat)
+        print(f"  {bucket:6} {ms:8.1f} ms")
+
+def run_db(db_name: str, rows: int, repeat: int, skip_seed: bool):
+    from app.core.database import connect
+
+    conn = connect(db_name)
+    to_date = date.today()
+    from_date = to_date - timedelta(days=364)
+    if not skip_seed:
+        print(f"Seeding {rows:,} orders into {db_name}.orders...")
+        seed(conn, rows, datetime.combine(from_date, datetime.min.time()))
+
+    print(f"{'bucket':6} {'sql':>10} {'numpy':>10} {'(fetch':>10} {'+ agg)':>9}")
+    for bucket in BUCKETS:
+        sql_ms = best_of(lambda: series_sql(conn, bucket, from_date, to_date, PERCENTILES), repeat)
+        arrays = []
+        fetch_ms = best_of(lambda: arrays.append(load_order_arrays(conn, from_date, to_date)), repeat)
+        agg_ms = best_of(lambda: aggregate_arrays(*arrays[-1], bucket, PERCENTILES), repeat)
+        print(f"{bucket:6} {sql_ms:8.1f}ms {fetch_ms + agg_ms:8.1f}ms {fetch_ms:8.1f}ms {agg_ms:7.1f}ms")
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="shop_bench")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--offline", action="store_true")
+    args = parser.parse_args()
+
+    if args.offline:
+        run_offline(args.rows, args.repeat)
+    else:
+        run_db(args.db, args.rows, args.repeat, args.skip_seed)
+
+if __name__ == "__main__":
+    main()
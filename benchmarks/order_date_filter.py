@@ -0,0 +1,94 @@
+"""
+Compare CAST(order_date AS DATE) = ? against a half-open range on a seeded
+table in SQL Server, with the same index the app maintains on orders.
+
+    python benchmarks/order_date_filter.py --db Practice --rows 500000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import connect
+
+QUERIES = {
+    "cast (scan)": "SELECT COUNT(*), SUM(amount) FROM bench_orders WHERE CAST(order_date AS DATE) = ?",
+    "range (seek)": "SELECT COUNT(*), SUM(amount) FROM bench_orders WHERE order_date >= ? AND order_date < ?",
+}
+
+def seed(conn, rows: int):
+    cursor = conn.cursor()
+    cursor.execute("IF OBJECT_ID('bench_orders', 'U') IS NOT NULL DROP TABLE bench_orders")
+    cursor.execute("""
+        CREATE TABLE bench_orders (
+            id INT PRIMARY KEY IDENTITY(1,1),
+            user_id INT NOT NULL,
+            amount FLOAT NOT NULL,
+            status NVARCHAR(20) NOT NULL,
+            order_date DATETIME NOT NULL
+        )
+    """)
+    cursor.fast_executemany = True
+    start = datetime.now() - timedelta(days=730)
+    batch = []
+    for _ in range(rows):
+        batch.append((
+            random.randint(1, 500), random.uniform(1, 500),
+            random.choice(("pending", "completed", "cancelled")),
+            start + timedelta(minutes=random.randint(0, 730 * 24 * 60)),
+        ))
+        if len(batch) == 10_000:
+            cursor.executemany("INSERT INTO bench_orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        cursor.executemany("INSERT INTO bench_orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)", batch)
+    cursor.execute("CREATE INDEX ix_bench_orders_order_date ON bench_orders (order_date) INCLUDE (amount, status, user_id)")
+    conn.commit()
+
+def plan(conn, sql: str, params) -> str:
+    cursor = conn.cursor()
+    cursor.execute("SET SHOWPLAN_TEXT ON")
+    try:
+        # SHOWPLAN does not accept parameters; inline the literal dates
+        literal = sql
+        for p in params:
+            literal = literal.replace("?", f"'{p}'", 1)
+        cursor.execute(literal)
+        cursor.nextset()
+        text = " ".join(str(row[0]) for row in cursor.fetchall())
+    finally:
+        cursor.execute("SET SHOWPLAN_TEXT OFF")
+    return "Index Seek" if "Index Seek" in text else "Scan"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="Practice")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if not args.skip_seed:
+        print(f"Seeding {args.rows:,} rows into bench_orders...")
+        seed(conn, args.rows)
+
+    day = date.today() - timedelta(days=30)
+    params = {"cast (scan)": (day,), "range (seek)": (day, day + timedelta(days=1))}
+    cursor = conn.cursor()
+    for name, sql in QUERIES.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            cursor.execute(sql, params[name]).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{name:14} plan={plan(conn, sql, params[name]):10} median={timings[len(timings) // 2]:8.2f} ms  min={timings[0]:8.2f} ms")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Rows/sec and peak RSS of the streaming PDF renderer for growing row counts.
+
+Each size runs in a fresh process so peak RSS is not carried over:
+
+    python benchmarks/pdf_report.py --sizes 10000 100000 1000000
+"""
+import argparse
+import datetime
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+HEADERS = ["id", "user_id", "amount", "status", "order_date"]
+
+def fake_cursor_chunks(rows: int, chunk: int = 1000):
+    # Same shape a fetchmany loop yields, without holding more than one chunk
+    ts = datetime.datetime(2024, 1, 1, 12, 30)
+    for start in range(0, rows, chunk):
+        yield [
+            (i, i % 500 + 1, 10.0 + i % 1000, "completed", ts)
+            for i in range(start, min(rows, start + chunk))
+        ]
+
+def run_one(rows: int):
+    from app.utils.pdf_report import render_table_pdf
+
+    start = time.perf_counter()
+    size = 0
+    for part in render_table_pdf("Benchmark", HEADERS, fake_cursor_chunks(rows)):
+        size += len(part)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{rows:>10,} rows  {rows / elapsed:>10,.0f} rows/s  {size / 2**20:8.1f} MiB pdf  peak RSS {peak_mb:6.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        run_one(args.single)
+        return
+    for rows in args.sizes:
+        subprocess.run([sys.executable, __file__, "--single", str(rows)], check=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Nightly report batch scaling: seeds `--shops` shop databases with
+`--orders` orders each (all on the reported day), then renders the batch
+with each worker count and prints wall time, speedup and per-shop render
+time and size. Uses DB_BACKEND / connection settings from .env:
+
+    DB_BACKEND=sqlite python benchmarks/report_batch.py --shops 200 --orders 2000 --workers 1,2,4,8
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def seed(databases, orders: int, day: datetime.date, rng: random.Random):
+    from app.core.database import create_database, pool
+    from app.core.orders import ensure_order_schema
+
+    start = datetime.datetime.combine(day, datetime.time())
+    for db_name in databases:
+        create_database(db_name, if_missing=True)
+        with pool.connection(db_name) as conn:
+            ensure_order_schema(conn)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM orders")
+            cursor.executemany(
+                "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)",
+                [
+                    (rng.randint(1, 5000), round(rng.uniform(1, 500), 2),
+                     rng.choice(("pending", "completed", "cancelled")),
+                     start + datetime.timedelta(seconds=rng.randint(0, 86399)))
+                    for _ in range(orders)
+                ]
+            )
+            conn.commit()
+    pool.close_all()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shops", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 4}")
+    parser.add_argument("--prefix", default="shop_bench_batch_")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from app.core.report_batch import run_report_batch
+
+    day = datetime.date.today() - datetime.timedelta(days=1)
+    databases = [f"{args.prefix}{i:04d}" for i in range(args.shops)]
+    if not args.skip_seed:
+        seed(databases, args.orders, day, random.Random(args.seed))
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with tempfile.TemporaryDirectory() as archive:
+            summary = run_report_batch(databases, day, workers=workers, archive_dir=Path(archive))
+        if summary["shops_failed"]:
+            print(f"{workers} workers: {summary['shops_failed']} shops failed, e.g. {next(iter(summary['errors'].values()))}")
+        baseline = baseline or summary["seconds"]
+        per_shop = [s["seconds"] for s in summary["shops"]]
+        print(
+            f"workers {workers:3d}  wall {summary['seconds']:7.2f}s  speedup {baseline / summary['seconds']:5.2f}x  "
+            f"per shop p50 {statistics.median(per_shop) * 1000:7.1f}ms  max {max(per_shop) * 1000:7.1f}ms  "
+            f"{summary['bytes'] / summary['shops_ok'] / 1024:.0f} KiB/shop"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Burst of identical /summary-style requests against a slow loader, with and
+without the result cache: number of queries actually run, wall time and
+latency percentiles. The loader sleeps on the db executor like a real query,
+so an uncached burst also shows requests rejected as saturated (503s).
+
+    python benchmarks/result_cache.py --requests 2000 --concurrency 200 --query-ms 40
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+async def burst(args, cache):
+    from app.core.executor import run_query
+
+    queries = rejected = 0
+
+    def query():
+        nonlocal queries
+        queries += 1
+        time.sleep(args.query_ms / 1000)
+        return {"total_orders": 1, "total_revenue": 2.0}
+
+    async def request(i):
+        nonlocal rejected
+        start = time.perf_counter()
+        try:
+            if cache is None:
+                await run_query(query)
+            else:
+                params = {"from_date": "2026-01-01", "variant": i % args.distinct}
+                await cache.get_or_load("shop_bench", "summary", params, lambda: run_query(query))
+        except Exception:
+            rejected += 1
+        return time.perf_counter() - start
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            return await request(i)
+
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(limited(i) for i in range(args.requests))))
+    wall = time.perf_counter() - start
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return queries, rejected, wall, statistics.median(latencies) * 1000, pct(0.99)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--query-ms", type=float, default=40)
+    parser.add_argument("--distinct", type=int, default=1, help="distinct parameter sets in the burst")
+    parser.add_argument("--ttl", type=float, default=3)
+    args = parser.parse_args()
+
+    from app.core.result_cache import ResultCache
+
+    for label, cache in (("uncached", None), ("ttl=0", ResultCache(ttl=0)), (f"ttl={args.ttl:g}", ResultCache(ttl=args.ttl))):
+        queries, rejected, wall, p50, p99 = asyncio.run(burst(args, cache))
+        print(f"{label:10s} queries {queries:6d}  rejected {rejected:6d}  wall {wall:7.2f}s  p50 {p50:8.1f}ms  p99 {p99:8.1f}ms")
+        if cache is not None:
+            stats = cache.stats()
+            print(f"{'':10s} hits {stats['hits']}  coalesced {stats['coalesced']}  bytes {stats['bytes']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Measure /summary latency while /export-report calls run concurrently.
+
+Start the app first (`uvicorn app.main:app`), then:
+
+    python benchmarks/summary_under_export.py --db shop_demo --exporters 4
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+def request(url: str, db_name: str) -> int:
+    req = urllib.request.Request(url, headers={"X-Database-Name": db_name})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--db", default="Practice")
+    parser.add_argument("--exporters", type=int, default=4)
+    parser.add_argument("--export-type", default="all")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    export_statuses = []
+
+    def exporter():
+        while not stop.is_set():
+            export_statuses.append(
+                request(f"{args.base_url}/export-report?type={args.export_type}", args.db)
+            )
+
+    threads = [threading.Thread(target=exporter, daemon=True) for _ in range(args.exporters)]
+    for t in threads:
+        t.start()
+
+    latencies, statuses = [], []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        statuses.append(request(f"{args.base_url}/summary", args.db))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"/summary under {args.exporters} concurrent /export-report loops")
+    print(f"  requests: {len(latencies)}  non-200: {sum(s != 200 for s in statuses)}")
+    print(f"  p50: {statistics.median(latencies):.1f} ms")
+    print(f"  p95: {percentile(latencies, 95):.1f} ms")
+    print(f"  p99: {percentile(latencies, 99):.1f} ms")
+    print(f"  exports completed: {len(export_statuses)}  503s: {export_statuses.count(503)}")
+
+if __name__ == "__main__":
+    main()
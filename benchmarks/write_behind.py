@@ -0,0 +1,119 @@
+"""
+/add-order throughput with a commit per request vs the write-behind group
+commit: orders/s and acknowledgement latency at a given concurrency, and
+for write-behind the time until every order is in the database, mean
+batch size and orders per journal fsync.
+
+Runs against DB_BACKEND / connection settings from .env like the app:
+
+    python benchmarks/write_behind.py --orders 20000 --concurrency 64
+    DB_BACKEND=sqlite python benchmarks/write_behind.py --journal-dir /tmp/journal
+"""
+import argparse
+import asyncio
+import random
+import shutil
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+STATUSES = ("pending", "completed", "cancelled")
+
+def make_orders(n: int, seed: int):
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    return [
+        SimpleNamespace(
+            user_id=rng.randint(1, 5000), amount=round(rng.uniform(1, 500), 2),
+            status=rng.choice(STATUSES), order_date=now - timedelta(seconds=rng.randint(0, 86400))
+        )
+        for _ in range(n)
+    ]
+
+async def drive(orders, concurrency: int, submit):
+    latencies = []
+    queue = iter(orders)
+
+    async def worker():
+        for order in queue:
+            start = time.perf_counter()
+            await submit(order)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, sorted(latencies)
+
+def report(label: str, n: int, wall: float, latencies, extra: str = ""):
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(
+        f"{label:14s} {n / wall:9.0f} orders/s  ack p50 {statistics.median(latencies) * 1000:7.2f}ms  "
+        f"p99 {p99 * 1000:7.2f}ms{extra}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="shop_bench_write_behind")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--journal-dir", default="temp_reports/bench_journal")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from app.core.database import create_database, pool
+    from app.core.executor import run_query
+    from app.core.orders import ensure_order_schema
+    from app.core.rollups import apply_deltas, ensure_rollups
+    from app.core.write_behind import WriteBehind
+
+    create_database(args.db, if_missing=True)
+    with pool.connection(args.db) as conn:
+        ensure_order_schema(conn)
+        ensure_rollups(args.db, conn)
+
+    def insert_one(order):
+        # What /add-order does without write-behind
+        with pool.connection(args.db) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)",
+                (order.user_id, order.amount, order.status, order.order_date)
+            )
+            apply_deltas(cursor, [(order.order_date.date(), order.amount, order.status)])
+            conn.commit()
+
+    async def direct():
+        orders = make_orders(args.orders, args.seed)
+        wall, latencies = await drive(orders, args.concurrency, lambda o: run_query(insert_one, o))
+        report("per-request", len(orders), wall, latencies)
+
+    async def grouped():
+        journal_dir = Path(args.journal_dir)
+        shutil.rmtree(journal_dir, ignore_errors=True)
+        writer = WriteBehind(enabled=True, directory=journal_dir)
+        await writer.start()
+        orders = make_orders(args.orders, args.seed + 1)
+        wall, latencies = await drive(orders, args.concurrency, lambda o: writer.submit(args.db, o))
+        start = time.perf_counter()
+        while writer.stats()["pending"]:
+            await asyncio.sleep(0.01)
+        drained = wall + time.perf_counter() - start
+        stats = writer.stats()
+        await writer.stop()
+        report(
+            "write-behind", len(orders), wall, latencies,
+            f"  in db after {drained:.2f}s ({len(orders) / drained:.0f}/s)  "
+            f"batch {stats['avg_batch']:.0f}  orders/fsync {stats['orders_per_fsync']:.1f}"
+        )
+
+    asyncio.run(direct())
+    asyncio.run(grouped())
+    pool.close_all()
+
+if __name__ == "__main__":
+    main()
@@ -146,11 +146,82 @@ function handleShopDashboard() {
   };
 }
 
+// Live summary on shop.html: load /summary once, then apply the per-day
+// deltas pushed on /live instead of polling
+function handleLiveSummary() {
+  const panel = document.getElementById("live-summary");
+  if (!panel) return;
+
+  const fields = ["total_orders", "total_income", "completed_orders", "pending_orders", "cancelled_orders"];
+  let summary = null;
+  let fromDate = null;
+
+  function render() {
+    if (!summary) return;
+    panel.textContent = `Last 7 days: ${summary.total_orders} orders, ` +
+      `${summary.total_income.toFixed(2)} income, ${summary.pending_orders} pending`;
+  }
+
+  async function reload() {
+    const res = await fetch("/summary?range=weekly", { headers: getHeaders() });
+    if (res.ok) {
+      const data = await res.json();
+      fromDate = data.from_date;
+      summary = Object.fromEntries(fields.map(key => [key, data[key]]));
+      render();
+    }
+  }
+
+  function apply(deltas) {
+    if (!summary) return;
+    for (const delta of deltas) {
+      if (delta.day < fromDate) continue;
+      for (const key of fields) summary[key] += delta[key];
+    }
+    render();
+  }
+
+  async function listen() {
+    // fetch rather than EventSource, which can't send the auth headers
+    const res = await fetch("/live", { headers: getHeaders() });
+    if (!res.ok || !res.body) throw new Error(`live ${res.status}`);
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return;
+      buffer += value;
+      let end;
+      while ((end = buffer.indexOf("\n\n")) >= 0) {
+        const frame = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        const event = (frame.match(/^event: (.*)$/m) || [])[1];
+        const data = (frame.match(/^data: (.*)$/m) || [])[1];
+        if (event === "summary") apply(JSON.parse(data));
+        else if (event === "ready" || event === "resync") await reload();
+      }
+    }
+  }
+
+  (async function run() {
+    for (let delay = 1000; ; delay = Math.min(delay * 2, 30000)) {
+      try {
+        await listen();
+        delay = 1000;
+      } catch {
+        // reconnect with backoff
+      }
+      await new Promise(r => setTimeout(r, delay));
+    }
+  })();
+}
+
 // Auto-detect page type and invoke handler
 document.addEventListener("DOMContentLoaded", () => {
   handleDatabaseSelectionPage();
   handleCreateDbPage();
   handleShopDashboard();
+  handleLiveSummary();
 });
 
 // ===== Dynamic Table Creation Logic =====
@@ -351,6 +422,7 @@ function handleLoginPage() {
       const data = await res.json();
       if (res.ok) {
         localStorage.setItem("access_token", data.access_token);
+        localStorage.setItem("selectedDatabase", shopInput.value);
         status.textContent = "Login successful!";
         // Redirect to dashboard
         window.location.href = `/shop/${shopInput.value}`;
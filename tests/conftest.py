@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# The backend is picked when app.core.config is imported: run everything on
+# throwaway SQLite files, never against a configured server
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_DIR"] = tempfile.mkdtemp(prefix="smart-ledger-tests-")
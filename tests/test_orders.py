@@ -0,0 +1,56 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.orders import decode_cursor, encode_cursor, ensure_order_schema, list_orders
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
+    ensure_order_schema(conn)
+    start = datetime(2024, 1, 1, 12)
+    conn.executemany(
+        "INSERT INTO orders (user_id, amount, status, order_date) VALUES (?, ?, ?, ?)",
+        [(i % 3 + 1, 10.0 + i, "completed" if i % 2 else "pending", start + timedelta(days=i)) for i in range(11)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+@pytest.mark.parametrize("last_id", [1, 7, 10, 999, 2**31 - 1, 2**53])
+def test_cursor_round_trip(last_id):
+    token = encode_cursor(last_id)
+    assert "=" not in token
+    assert decode_cursor(token) == last_id
+
+def test_pages_cover_every_order_once(conn):
+    seen, cursor = [], None
+    while True:
+        before_id = decode_cursor(cursor) if cursor else None
+        rows, cursor = list_orders(conn, limit=4, before_id=before_id)
+        seen.extend(row["id"] for row in rows)
+        if cursor is None:
+            break
+    assert seen == list(range(11, 0, -1))
+
+def test_exact_last_page_has_no_cursor(conn):
+    rows, cursor = list_orders(conn, limit=11)
+    assert len(rows) == 11
+    assert cursor is None
+
+def test_pages_keep_filters(conn):
+    seen, cursor = [], None
+    while True:
+        before_id = decode_cursor(cursor) if cursor else None
+        rows, cursor = list_orders(conn, columns=("id", "status"), limit=2, before_id=before_id, status="completed")
+        assert all(row["status"] == "completed" for row in rows)
+        seen.extend(row["id"] for row in rows)
+        if cursor is None:
+            break
+    assert seen == [10, 8, 6, 4, 2]
+
+def test_id_is_only_returned_when_asked_for(conn):
+    rows, cursor = list_orders(conn, columns=("amount",), limit=3)
+    assert rows == [{"amount": 20.0}, {"amount": 19.0}, {"amount": 18.0}]
+    assert decode_cursor(cursor) == 9
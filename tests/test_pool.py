@@ -0,0 +1,162 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.core.database import ConnectionPool, PoolTimeout
+
+class SqliteConnect:
+    """In-memory SQLite connections, remembering every one opened."""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self, db_name: str):
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.opened.append((db_name, conn))
+        return conn
+
+def make_pool(**kwargs):
+    kwargs.setdefault("max_per_db", 2)
+    kwargs.setdefault("max_total", 10)
+    kwargs.setdefault("idle_timeout", 300)
+    kwargs.setdefault("checkout_timeout", 0.05)
+    return ConnectionPool(connect=SqliteConnect(), **kwargs)
+
+def is_closed(conn) -> bool:
+    try:
+        conn.execute("SELECT 1")
+        return False
+    except sqlite3.ProgrammingError:
+        return True
+
+def test_reuses_released_connection():
+    pool = make_pool()
+    conn = pool.acquire("shop_a")
+    pool.release("shop_a", conn)
+    assert pool.acquire("shop_a") is conn
+    stats = pool.stats()["databases"]["shop_a"]
+    assert (stats["misses"], stats["hits"], stats["open"]) == (1, 1, 1)
+
+def test_per_database_cap():
+    pool = make_pool(max_per_db=2)
+    held = [pool.acquire("shop_a"), pool.acquire("shop_a")]
+    with pytest.raises(PoolTimeout):
+        pool.acquire("shop_a")
+    # The cap is per shop; others still get connections
+    other = pool.acquire("shop_b")
+    stats = pool.stats()
+    assert stats["databases"]["shop_a"]["open"] == 2
+    assert stats["databases"]["shop_a"]["waits"] == 1
+    assert stats["total_open"] == 3
+    for conn in held:
+        pool.release("shop_a", conn)
+    pool.release("shop_b", other)
+
+def test_waiter_gets_released_connection():
+    pool = make_pool(max_per_db=1, checkout_timeout=5)
+    conn = pool.acquire("shop_a")
+    timer = threading.Timer(0.05, pool.release, ("shop_a", conn))
+    timer.start()
+    start = time.monotonic()
+    assert pool.acquire("shop_a") is conn
+    assert time.monotonic() - start < 5
+    timer.join()
+
+def test_global_cap_steals_idle_connection_of_another_shop():
+    pool = make_pool(max_per_db=2, max_total=2)
+    idle_a = pool.acquire("shop_a")
+    pool.release("shop_a", idle_a)
+    held_b = pool.acquire("shop_b")
+
+    # At the global cap: shop_a's idle connection gives up its slot
+    second_b = pool.acquire("shop_b")
+    assert is_closed(idle_a)
+    stats = pool.stats()
+    assert stats["total_open"] == 2
+    assert stats["databases"]["shop_a"]["open"] == 0
+    assert stats["databases"]["shop_a"]["evictions"] == 1
+    assert stats["databases"]["shop_b"]["open"] == 2
+    pool.release("shop_b", held_b)
+    pool.release("shop_b", second_b)
+
+def test_global_cap_times_out_when_nothing_is_idle():
+    pool = make_pool(max_per_db=2, max_total=2)
+    held = [pool.acquire("shop_a"), pool.acquire("shop_b")]
+    with pytest.raises(PoolTimeout):
+        pool.acquire("shop_c")
+    # A connection in use is never taken away
+    assert not any(is_closed(conn) for conn in held)
+    assert pool.stats()["databases"]["shop_c"]["open"] == 0
+
+def test_failed_connect_frees_its_slot():
+    pool = make_pool(max_per_db=1)
+    connect = pool.connect
+
+    def broken(db_name):
+        raise sqlite3.OperationalError("server unavailable")
+
+    pool.connect = broken
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire("shop_a")
+    pool.connect = connect
+    conn = pool.acquire("shop_a")
+    assert pool.stats()["databases"]["shop_a"]["open"] == 1
+    pool.release("shop_a", conn)
+
+def test_discard_on_error_when_connection_is_broken():
+    pool = make_pool()
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection("shop_a") as conn:
+            raw = pool.connect.opened[-1][1]
+            raw.close()
+            conn.execute("SELECT 1")
+    stats = pool.stats()["databases"]["shop_a"]
+    assert (stats["open"], stats["in_use"], stats["idle"]) == (0, 0, 0)
+    assert pool.stats()["total_open"] == 0
+
+def test_healthy_connection_survives_query_error():
+    pool = make_pool()
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection("shop_a") as conn:
+            conn.execute("SELECT * FROM missing_table")
+    stats = pool.stats()["databases"]["shop_a"]
+    assert (stats["open"], stats["in_use"], stats["idle"]) == (1, 0, 1)
+
+def test_release_rolls_back_open_transaction():
+    pool = make_pool()
+    conn = pool.acquire("shop_a")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release("shop_a", conn)
+    conn = pool.acquire("shop_a")
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release("shop_a", conn)
+
+def test_failed_health_check_opens_replacement():
+    pool = make_pool()
+    stale = pool.acquire("shop_a")
+    pool.release("shop_a", stale)
+    # The server dropped the idle connection behind the pool's back
+    stale.close()
+
+    fresh = pool.acquire("shop_a")
+    assert fresh is not stale
+    assert not is_closed(fresh)
+    stats = pool.stats()["databases"]["shop_a"]
+    assert stats["health_check_failures"] == 1
+    assert stats["misses"] == 2
+    assert stats["open"] == 1
+    pool.release("shop_a", fresh)
+
+def test_idle_timeout_closes_connections():
+    pool = make_pool(idle_timeout=0.01)
+    conn = pool.acquire("shop_a")
+    pool.release("shop_a", conn)
+    time.sleep(0.02)
+    pool.evict_idle()
+    assert is_closed(conn)
+    stats = pool.stats()["databases"]["shop_a"]
+    assert (stats["open"], stats["evictions"]) == (0, 1)
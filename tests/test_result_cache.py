@@ -0,0 +1,115 @@
+import asyncio
+
+from app.core.result_cache import ResultCache
+
+class Loader:
+    """Counts calls; each call blocks until `release` is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await self.release.wait()
+        return {"call": call}
+
+def test_concurrent_requests_share_one_load():
+    async def main():
+        cache = ResultCache(ttl=60)
+        loader = Loader()
+        waiters = [
+            asyncio.ensure_future(cache.get_or_load("shop_a", "summary", {"days": 7}, loader))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*waiters)
+        assert results == [{"call": 1}] * 5
+        assert loader.calls == 1
+        assert (cache.misses, cache.coalesced) == (1, 4)
+
+        # Now cached
+        assert await cache.get_or_load("shop_a", "summary", {"days": 7}, loader) == {"call": 1}
+        assert loader.calls == 1
+        assert cache.hits == 1
+        assert cache.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+def test_params_and_shops_are_separate_keys():
+    async def main():
+        cache = ResultCache(ttl=60)
+        loader = Loader()
+        loader.release.set()
+        await cache.get_or_load("shop_a", "summary", {"days": 7}, loader)
+        await cache.get_or_load("shop_a", "summary", {"days": 30}, loader)
+        await cache.get_or_load("shop_b", "summary", {"days": 7}, loader)
+        # None params are dropped from the key
+        await cache.get_or_load("shop_a", "summary", {"days": 7, "status": None}, loader)
+        assert loader.calls == 3
+
+    asyncio.run(main())
+
+def test_invalidate_drops_entries_of_that_shop_only():
+    async def main():
+        cache = ResultCache(ttl=60)
+        loader = Loader()
+        loader.release.set()
+        await cache.get_or_load("shop_a", "summary", {}, loader)
+        await cache.get_or_load("shop_b", "summary", {}, loader)
+
+        cache.invalidate("shop_a")
+        assert await cache.get_or_load("shop_a", "summary", {}, loader) == {"call": 3}
+        assert await cache.get_or_load("shop_b", "summary", {}, loader) == {"call": 2}
+        assert loader.calls == 3
+
+    asyncio.run(main())
+
+def test_load_started_before_invalidate_is_not_stored_or_joined():
+    async def main():
+        cache = ResultCache(ttl=60)
+        stale_loader, fresh_loader = Loader(), Loader()
+        stale = asyncio.ensure_future(cache.get_or_load("shop_a", "summary", {}, stale_loader))
+        await asyncio.sleep(0)
+
+        # A write lands while the first load is running
+        cache.invalidate("shop_a")
+        fresh = asyncio.ensure_future(cache.get_or_load("shop_a", "summary", {}, fresh_loader))
+        await asyncio.sleep(0)
+        # Started a load of its own rather than joining the stale one
+        assert (cache.misses, cache.coalesced) == (2, 0)
+
+        stale_loader.release.set()
+        fresh_loader.release.set()
+        assert await stale == {"call": 1}
+        assert await fresh == {"call": 1}
+        assert fresh_loader.calls == 1
+
+        # Only the load that started after the write was cached
+        assert await cache.get_or_load("shop_a", "summary", {}, stale_loader) is fresh.result()
+        assert stale_loader.calls == 1
+
+    asyncio.run(main())
+
+def test_failed_load_is_not_cached():
+    async def main():
+        cache = ResultCache(ttl=60)
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            raise RuntimeError("database down")
+
+        for _ in range(2):
+            try:
+                await cache.get_or_load("shop_a", "summary", {}, failing)
+            except RuntimeError:
+                pass
+        assert calls == 2
+        assert cache.load_errors == 2
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import asyncio
+import contextlib
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import write_behind as write_behind_module
+from app.core.database import create_database, pool
+from app.core.orders import ensure_order_schema
+from app.core.write_behind import WriteBehind
+
+@pytest.fixture
+def shop(request, monkeypatch):
+    # Flush only when the test says so
+    monkeypatch.setattr(write_behind_module, "WRITE_BEHIND_INTERVAL", 3600)
+    db_name = f"shop_wb_{request.node.name}"
+    create_database(db_name, if_missing=True)
+    with pool.connection(db_name) as conn:
+        ensure_order_schema(conn)
+    return db_name
+
+def order(amount: float):
+    return SimpleNamespace(user_id=1, amount=amount, status="completed", order_date=datetime(2024, 1, 2, 9, 30))
+
+def stored_amounts(db_name: str):
+    with pool.connection(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT amount FROM orders ORDER BY id")
+        return [row[0] for row in cursor.fetchall()]
+
+async def crash(wb: WriteBehind):
+    # Die without the final flush stop() would make
+    wb._task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await wb._task
+    for journal in wb._journals.values():
+        journal.close()
+
+def test_replay_applies_each_order_once(shop, tmp_path):
+    async def main():
+        wb = WriteBehind(enabled=True, directory=tmp_path)
+        await wb.start()
+        seqs = [await wb.submit(shop, order(amount)) for amount in (1.0, 2.0, 3.0)]
+        assert seqs == [1, 2, 3]
+        await crash(wb)
+        assert stored_amounts(shop) == []
+
+        # Acknowledged but never flushed: replayed on start
+        wb = WriteBehind(enabled=True, directory=tmp_path)
+        await wb.start()
+        assert wb.replayed == 3
+        await wb.flush()
+        assert stored_amounts(shop) == [1.0, 2.0, 3.0]
+        # Committed, but the journal still holds the records
+        await crash(wb)
+
+        # The checkpoint says they are in: nothing is applied twice
+        wb = WriteBehind(enabled=True, directory=tmp_path)
+        await wb.start()
+        assert wb.replayed == 0
+        assert await wb.submit(shop, order(4.0)) == 4
+        await wb.stop()
+        assert stored_amounts(shop) == [1.0, 2.0, 3.0, 4.0]
+
+    asyncio.run(main())
+
+def test_torn_tail_is_dropped_on_replay(shop, tmp_path):
+    async def main():
+        wb = WriteBehind(enabled=True, directory=tmp_path)
+        await wb.start()
+        for amount in (1.0, 2.0):
+            await wb.submit(shop, order(amount))
+        journal = wb._owned[shop]
+        await crash(wb)
+        # Power cut in the middle of an append
+        with open(journal.path, "ab") as file:
+            file.write(b"0badc0de {\"seq\": 3, \"amou")
+
+        wb = WriteBehind(enabled=True, directory=tmp_path)
+        await wb.start()
+        assert wb.replayed == 2
+        assert await wb.submit(shop, order(3.0)) == 3
+        await wb.stop()
+        assert stored_amounts(shop) == [1.0, 2.0, 3.0]
+
+    asyncio.run(main())